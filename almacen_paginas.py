@@ -0,0 +1,250 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import tarfile
+import threading
+import time
+
+# Directorio por defecto del almacén de páginas
+DIRECTORIO_ALMACEN = "paginas"
+NOMBRE_INDICE = "indice.json"
+DIRECTORIO_OBJETOS = "objetos"
+# Cada cuántas modificaciones se vuelca el índice a disco (además de al cerrar)
+GUARDAR_INDICE_CADA = 50
+# eliminar_huerfanos no toca los blobs más recientes que esto (segundos): entre que un
+# `guardar` concurrente escribe el blob y lo añade al índice, el blob parece huérfano
+MARGEN_HUERFANOS = 3600
+
+PATRON_ID_ANUNCIO = re.compile(r'/ocasion/(\d+)-es/?')
+
+
+def extraer_id_anuncio(url):
+    """
+    Obtiene el ID del anuncio a partir de una URL de detalle de motorflash.
+
+    Para URLs con otro formato se usa un hash corto de la URL, de modo que la
+    clave siga siendo estable entre ejecuciones.
+    """
+    coincidencia = PATRON_ID_ANUNCIO.search(url)
+    if coincidencia:
+        return coincidencia.group(1)
+    return "url-" + hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+
+
+class AlmacenPaginas:
+    """
+    Almacén de páginas direccionado por contenido y comprimido con gzip.
+
+    Cada página se guarda una sola vez en `objetos/<2 primeros caracteres>/<sha256>.html.gz`,
+    de modo que las páginas duplicadas comparten el mismo blob. Un índice JSON pequeño
+    relaciona cada ID de anuncio con su URL, el hash de su contenido y la fecha de la
+    última modificación.
+
+    Se puede usar como gestor de contexto para asegurar que el índice se guarda al final:
+
+        with AlmacenPaginas() as almacen:
+            almacen.guardar(id_anuncio, url, contenido)
+
+    Args:
+        directorio (str): Directorio raíz del almacén.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_ALMACEN):
+        self.directorio = directorio
+        self.ruta_indice = os.path.join(directorio, NOMBRE_INDICE)
+        self._lock = threading.Lock()
+        self._cambios_sin_guardar = 0
+        self._indice = {}
+        os.makedirs(os.path.join(directorio, DIRECTORIO_OBJETOS), exist_ok=True)
+        if os.path.exists(self.ruta_indice):
+            with open(self.ruta_indice, 'r', encoding='utf-8') as f:
+                self._indice = json.load(f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cerrar()
+
+    def __len__(self):
+        return len(self._indice)
+
+    def __iter__(self):
+        """Itera sobre (id_anuncio, entrada) en orden de ID sin recorrer el sistema de archivos."""
+        with self._lock:
+            entradas = sorted(self._indice.items())
+        return iter(entradas)
+
+    def _ruta_objeto(self, hash_contenido):
+        return os.path.join(self.directorio, DIRECTORIO_OBJETOS, hash_contenido[:2], f"{hash_contenido}.html.gz")
+
+    def contiene(self, id_anuncio):
+        """Indica si el almacén tiene una página para `id_anuncio`."""
+        return id_anuncio in self._indice
+
+    def entrada(self, id_anuncio):
+        """Devuelve la entrada del índice (url, hash, actualizado) o None."""
+        with self._lock:
+            entrada = self._indice.get(id_anuncio)
+            return dict(entrada) if entrada else None
+
+    def guardar(self, id_anuncio, url, contenido):
+        """
+        Guarda el contenido de la página de un anuncio.
+
+        Args:
+            id_anuncio (str): Clave del anuncio (ver `extraer_id_anuncio`).
+            url (str): URL de la que se descargó la página.
+            contenido (bytes): Contenido sin comprimir.
+
+        Returns:
+            bool: True si el contenido era nuevo o ha cambiado; False si ya estaba guardado igual.
+        """
+        hash_contenido = hashlib.sha256(contenido).hexdigest()
+        with self._lock:
+            anterior = self._indice.get(id_anuncio)
+            if anterior and anterior['hash'] == hash_contenido:
+                return False
+
+        ruta_objeto = self._ruta_objeto(hash_contenido)
+        if not os.path.exists(ruta_objeto):
+            os.makedirs(os.path.dirname(ruta_objeto), exist_ok=True)
+            ruta_temporal = f"{ruta_objeto}.{threading.get_ident()}.tmp"
+            with gzip.open(ruta_temporal, 'wb') as f:
+                f.write(contenido)
+            os.replace(ruta_temporal, ruta_objeto)
+
+        with self._lock:
+            self._indice[id_anuncio] = {
+                'url': url,
+                'hash': hash_contenido,
+                'actualizado': time.time(),
+            }
+            self._cambios_sin_guardar += 1
+            if self._cambios_sin_guardar >= GUARDAR_INDICE_CADA:
+                self._guardar_indice()
+        return True
+
+    def abrir(self, id_anuncio):
+        """Abre la página de un anuncio para lectura en streaming (bytes descomprimidos)."""
+        entrada = self.entrada(id_anuncio)
+        if entrada is None:
+            raise KeyError(id_anuncio)
+        return gzip.open(self._ruta_objeto(entrada['hash']), 'rb')
+
+    def leer(self, id_anuncio):
+        """Devuelve la página completa de un anuncio como bytes."""
+        with self.abrir(id_anuncio) as f:
+            return f.read()
+
+    def eliminar_huerfanos(self, margen=None):
+        """
+        Borra los blobs que ya no referencia ningún anuncio. Devuelve cuántos se borraron.
+
+        Se respetan los archivos temporales (.tmp) y los blobs modificados hace menos de
+        `margen` segundos (MARGEN_HUERFANOS por defecto), que pueden ser de un `guardar`
+        que todavía no ha terminado.
+        """
+        with self._lock:
+            en_uso = {entrada['hash'] for entrada in self._indice.values()}
+        borrados = 0
+        limite = time.time() - (MARGEN_HUERFANOS if margen is None else margen)
+        raiz_objetos = os.path.join(self.directorio, DIRECTORIO_OBJETOS)
+        for prefijo in os.listdir(raiz_objetos):
+            for nombre in os.listdir(os.path.join(raiz_objetos, prefijo)):
+                ruta = os.path.join(raiz_objetos, prefijo, nombre)
+                if nombre.endswith('.tmp') or nombre.split('.', 1)[0] in en_uso:
+                    continue
+                try:
+                    if os.path.getmtime(ruta) < limite:
+                        os.remove(ruta)
+                        borrados += 1
+                except FileNotFoundError:
+                    pass # Lo ha movido o borrado otro proceso mientras tanto
+        return borrados
+
+    def exportar(self, ruta_archivo):
+        """
+        Empaqueta el índice y todos los blobs en un único archivo .tar para transferirlo.
+
+        Los blobs ya van comprimidos, así que el tar no se vuelve a comprimir. Dentro del
+        archivo se conserva la misma estructura fragmentada por prefijo del hash.
+        """
+        self.guardar_indice()
+        with self._lock:
+            hashes = sorted({entrada['hash'] for entrada in self._indice.values()})
+            datos_indice = json.dumps(self._indice, ensure_ascii=False).encode('utf-8')
+        with tarfile.open(ruta_archivo, 'w') as tar:
+            info = tarfile.TarInfo(NOMBRE_INDICE)
+            info.size = len(datos_indice)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(datos_indice))
+            for hash_contenido in hashes:
+                ruta_objeto = self._ruta_objeto(hash_contenido)
+                tar.add(ruta_objeto, arcname=os.path.relpath(ruta_objeto, self.directorio))
+        return len(hashes)
+
+    def importar(self, ruta_archivo):
+        """
+        Incorpora al almacén un archivo generado con `exportar`.
+
+        Para cada anuncio se conserva la versión más reciente. Devuelve el número de
+        anuncios nuevos o actualizados.
+        """
+        actualizados = 0
+        with tarfile.open(ruta_archivo, 'r') as tar:
+            indice_importado = json.load(tar.extractfile(NOMBRE_INDICE))
+            for miembro in tar.getmembers():
+                if not miembro.isfile() or not miembro.name.startswith(DIRECTORIO_OBJETOS + "/"):
+                    continue
+                hash_contenido = os.path.basename(miembro.name).split('.', 1)[0]
+                ruta_objeto = self._ruta_objeto(hash_contenido)
+                if not os.path.exists(ruta_objeto):
+                    os.makedirs(os.path.dirname(ruta_objeto), exist_ok=True)
+                    with open(ruta_objeto, 'wb') as f:
+                        f.write(tar.extractfile(miembro).read())
+        with self._lock:
+            for id_anuncio, entrada in indice_importado.items():
+                actual = self._indice.get(id_anuncio)
+                if actual is None or entrada['actualizado'] > actual['actualizado']:
+                    self._indice[id_anuncio] = entrada
+                    actualizados += 1
+            self._guardar_indice()
+        return actualizados
+
+    def guardar_indice(self):
+        """Vuelca el índice a disco."""
+        with self._lock:
+            self._guardar_indice()
+
+    def cerrar(self):
+        """Guarda los cambios pendientes del índice."""
+        self.guardar_indice()
+
+    def _guardar_indice(self):
+        ruta_temporal = f"{self.ruta_indice}.tmp"
+        with open(ruta_temporal, 'w', encoding='utf-8') as f:
+            json.dump(self._indice, f, ensure_ascii=False)
+        os.replace(ruta_temporal, self.ruta_indice)
+        self._cambios_sin_guardar = 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Exporta o importa el almacén de páginas como un único archivo .tar.")
+    parser.add_argument("accion", choices=["exportar", "importar", "limpiar"])
+    parser.add_argument("archivo", nargs="?", help="Archivo .tar de origen o destino.")
+    parser.add_argument("--directorio", default=DIRECTORIO_ALMACEN, help="Directorio del almacén.")
+    args = parser.parse_args()
+
+    with AlmacenPaginas(args.directorio) as almacen:
+        if args.accion == "exportar":
+            print(f"Exportados {almacen.exportar(args.archivo)} blobs de {len(almacen)} anuncios a '{args.archivo}'.")
+        elif args.accion == "importar":
+            print(f"Importados {almacen.importar(args.archivo)} anuncios nuevos o actualizados desde '{args.archivo}'.")
+        else:
+            print(f"Eliminados {almacen.eliminar_huerfanos()} blobs sin referencias.")
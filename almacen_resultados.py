@@ -0,0 +1,324 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from esquema_analisis import analisis_desde_texto
+
+# Base de datos por defecto de los resultados
+ARCHIVO_RESULTADOS = "resultados.sqlite"
+
+# Campos por los que se pueden agrupar las consultas -> expresión SQL
+GRUPOS = {
+    "flota": "'flota'", # Un solo grupo con todas las imágenes
+    "modelo_ia": "i.modelo_ia",
+    "concesionario": "a.concesionario",
+    "marca": "a.marca",
+    "modelo": "a.modelo",
+    "dia": "i.dia",
+    "plano": "i.plano",
+    "anuncio": "i.id_anuncio",
+}
+
+
+class AlmacenResultados:
+    """
+    Almacén de resultados de análisis (SQLite) para consultas sobre toda la flota.
+
+    Guarda una fila por imagen con los campos del análisis estructurado (tipo de
+    plano, puntuación, puntos fuertes, áreas de mejora...) y una fila por anuncio con
+    su concesionario, marca y modelo. Los campos por los que se agrupa tienen índice,
+    así que los promedios y distribuciones sobre decenas de miles de imágenes tardan
+    milisegundos. Los informes .txt se generan a partir de este almacén.
+
+    Volver a guardar un anuncio sustituye sus resultados anteriores.
+
+    Args:
+        ruta (str): Archivo SQLite del almacén.
+    """
+
+    def __init__(self, ruta=ARCHIVO_RESULTADOS):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript(
+            "CREATE TABLE IF NOT EXISTS anuncios ("
+            " id_anuncio TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " hash_pagina TEXT,"
+            " concesionario TEXT,"
+            " marca TEXT,"
+            " modelo TEXT,"
+            " imagenes INTEGER NOT NULL,"
+            " puntuacion_media REAL,"
+            " fecha REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS imagenes ("
+            " id_anuncio TEXT NOT NULL,"
+            " indice INTEGER NOT NULL,"
+            " url TEXT NOT NULL,"
+            " modelo_ia TEXT,"
+            " version_prompt TEXT,"
+            " plano TEXT,"
+            " puntuacion REAL NOT NULL,"
+            " descargada INTEGER NOT NULL,"
+            " error TEXT,"
+            " datos TEXT NOT NULL,"
+            " texto TEXT NOT NULL,"
+            " fecha REAL NOT NULL,"
+            " dia TEXT NOT NULL,"
+            " PRIMARY KEY (id_anuncio, indice));"
+            "CREATE INDEX IF NOT EXISTS idx_anuncios_concesionario ON anuncios (concesionario);"
+            "CREATE INDEX IF NOT EXISTS idx_anuncios_modelo ON anuncios (marca, modelo);"
+            "CREATE INDEX IF NOT EXISTS idx_imagenes_modelo_ia ON imagenes (modelo_ia, puntuacion);"
+            "CREATE INDEX IF NOT EXISTS idx_imagenes_dia ON imagenes (dia, puntuacion);"
+            "CREATE INDEX IF NOT EXISTS idx_imagenes_plano ON imagenes (plano, puntuacion);"
+        )
+        self._conexion.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cerrar()
+
+    def guardar_anuncio(self, id_anuncio, url, imagenes, hash_pagina=None, metadatos=None,
+                        modelo_ia=None, version_prompt=None):
+        """
+        Guarda (o sustituye) los resultados de un anuncio en una sola transacción.
+
+        Args:
+            id_anuncio (str): Identificador del anuncio.
+            url (str): URL de la página del anuncio.
+            imagenes (list): Diccionarios con "indice", "url", "texto", "puntuacion",
+                "descargada" y, opcionalmente, "datos" (análisis estructurado), "error" y
+                "modelo_ia" (si la imagen la puntuó otro modelo). Si falta "datos", se
+                obtiene del texto.
+            hash_pagina (str, opcional): Versión de la página analizada.
+            metadatos (dict, opcional): "concesionario", "marca" y "modelo" del anuncio.
+            modelo_ia (str, opcional): Modelo que hizo los análisis.
+            version_prompt (str, opcional): Hash del prompt usado.
+        """
+        metadatos = metadatos or {}
+        ahora = time.time()
+        dia = time.strftime("%Y-%m-%d", time.localtime(ahora))
+        validas = [img["puntuacion"] for img in imagenes if not img.get("error")]
+        filas = []
+        for img in imagenes:
+            datos = img.get("datos") or analisis_desde_texto(img["texto"])
+            filas.append((
+                id_anuncio, img["indice"], img["url"], img.get("modelo_ia") or modelo_ia, version_prompt, datos["plano"],
+                img["puntuacion"], int(img["descargada"]), img.get("error"),
+                json.dumps(datos, ensure_ascii=False), img["texto"], ahora, dia,
+            ))
+        with self._lock, self._conexion:
+            self._conexion.execute("DELETE FROM imagenes WHERE id_anuncio = ?", (id_anuncio,))
+            self._conexion.executemany(
+                "INSERT INTO imagenes (id_anuncio, indice, url, modelo_ia, version_prompt, plano, puntuacion,"
+                " descargada, error, datos, texto, fecha, dia) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                filas,
+            )
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO anuncios (id_anuncio, url, hash_pagina, concesionario, marca, modelo,"
+                " imagenes, puntuacion_media, fecha) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (id_anuncio, url, hash_pagina, metadatos.get("concesionario"), metadatos.get("marca"),
+                 metadatos.get("modelo"), len(imagenes), sum(validas) / len(validas) if validas else None, ahora),
+            )
+
+    def anuncio(self, id_anuncio):
+        """Devuelve los datos guardados de un anuncio (o None si no está)."""
+        with self._lock:
+            cursor = self._conexion.execute("SELECT * FROM anuncios WHERE id_anuncio = ?", (id_anuncio,))
+            fila = cursor.fetchone()
+            nombres = [c[0] for c in cursor.description]
+        return dict(zip(nombres, fila)) if fila is not None else None
+
+    def imagenes_anuncio(self, id_anuncio):
+        """
+        Devuelve los resultados de las imágenes de un anuncio, en el orden original.
+
+        Returns:
+            list: Diccionarios con "indice", "url", "texto", "puntuacion", "descargada",
+                "error" y "datos".
+        """
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT indice, url, texto, puntuacion, descargada, error, datos FROM imagenes"
+                " WHERE id_anuncio = ? ORDER BY indice", (id_anuncio,)
+            ).fetchall()
+        return [
+            {"indice": f[0], "url": f[1], "texto": f[2], "puntuacion": f[3], "descargada": bool(f[4]),
+             "error": f[5], "datos": json.loads(f[6])}
+            for f in filas
+        ]
+
+    def ids_anuncios(self):
+        """Identificadores de todos los anuncios guardados, ordenados."""
+        with self._lock:
+            return [f[0] for f in self._conexion.execute("SELECT id_anuncio FROM anuncios ORDER BY id_anuncio")]
+
+    def fusionar(self, ruta):
+        """
+        Añade los resultados de otro almacén, por ejemplo el de un fragmento (ver fragmentos.py).
+
+        Si un anuncio está en los dos, se queda la versión guardada más recientemente, así
+        que fusionar varias veces los mismos archivos da siempre el mismo resultado.
+
+        Args:
+            ruta (str): Archivo SQLite del almacén de origen.
+
+        Returns:
+            int: Anuncios copiados desde el origen.
+        """
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(f"No existe el almacén de resultados '{ruta}'.")
+        with self._lock:
+            # ATTACH no se puede ejecutar dentro de una transacción
+            self._conexion.execute("ATTACH DATABASE ? AS origen", (ruta,))
+            try:
+                with self._conexion:
+                    self._conexion.execute(
+                        "CREATE TEMP TABLE fusion AS SELECT o.id_anuncio FROM origen.anuncios o"
+                        " LEFT JOIN anuncios a ON a.id_anuncio = o.id_anuncio"
+                        " WHERE a.id_anuncio IS NULL OR a.fecha < o.fecha"
+                    )
+                    self._conexion.execute("DELETE FROM imagenes WHERE id_anuncio IN (SELECT id_anuncio FROM temp.fusion)")
+                    self._conexion.execute(
+                        "INSERT OR REPLACE INTO anuncios SELECT * FROM origen.anuncios"
+                        " WHERE id_anuncio IN (SELECT id_anuncio FROM temp.fusion)"
+                    )
+                    self._conexion.execute(
+                        "INSERT INTO imagenes SELECT * FROM origen.imagenes"
+                        " WHERE id_anuncio IN (SELECT id_anuncio FROM temp.fusion)"
+                    )
+                    copiados = self._conexion.execute("SELECT COUNT(*) FROM temp.fusion").fetchone()[0]
+            finally:
+                # Aunque la fusión falle, la conexión queda lista para la siguiente
+                self._conexion.execute("DROP TABLE IF EXISTS temp.fusion")
+                self._conexion.execute("DETACH DATABASE origen")
+        return copiados
+
+    def _filtro(self, desde, hasta, incluir_errores):
+        condiciones, parametros = [], []
+        if not incluir_errores:
+            condiciones.append("i.error IS NULL")
+        if desde:
+            condiciones.append("i.dia >= ?")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("i.dia <= ?")
+            parametros.append(hasta)
+        return (" WHERE " + " AND ".join(condiciones) if condiciones else ""), parametros
+
+    def agregados(self, agrupar_por="modelo_ia", desde=None, hasta=None, incluir_errores=False, limite=None):
+        """
+        Puntuación media, mínima y máxima de las imágenes agrupadas por un campo.
+
+        Args:
+            agrupar_por (str): Una de las claves de GRUPOS.
+            desde, hasta (str, opcional): Rango de días "AAAA-MM-DD" (inclusive).
+            incluir_errores (bool): Contar también las imágenes que no se pudieron analizar.
+            limite (int, opcional): Número máximo de grupos (los de más imágenes).
+
+        Returns:
+            list: Diccionarios con "grupo", "imagenes", "anuncios", "media", "minima" y "maxima".
+        """
+        expresion = GRUPOS[agrupar_por]
+        where, parametros = self._filtro(desde, hasta, incluir_errores)
+        consulta = (
+            f"SELECT {expresion}, COUNT(*), COUNT(DISTINCT i.id_anuncio), AVG(i.puntuacion),"
+            f" MIN(i.puntuacion), MAX(i.puntuacion)"
+            f" FROM imagenes i JOIN anuncios a ON a.id_anuncio = i.id_anuncio{where}"
+            f" GROUP BY {expresion} ORDER BY COUNT(*) DESC"
+        )
+        if limite:
+            consulta += f" LIMIT {int(limite)}"
+        with self._lock:
+            filas = self._conexion.execute(consulta, parametros).fetchall()
+        return [
+            {"grupo": f[0], "imagenes": f[1], "anuncios": f[2], "media": f[3], "minima": f[4], "maxima": f[5]}
+            for f in filas
+        ]
+
+    def distribucion(self, agrupar_por="modelo_ia", desde=None, hasta=None, incluir_errores=False):
+        """
+        Histograma de puntuaciones (redondeadas a 0-10) por grupo.
+
+        Returns:
+            dict: grupo -> lista de 11 recuentos (índice = puntuación).
+        """
+        expresion = GRUPOS[agrupar_por]
+        where, parametros = self._filtro(desde, hasta, incluir_errores)
+        with self._lock:
+            filas = self._conexion.execute(
+                f"SELECT {expresion}, CAST(ROUND(i.puntuacion) AS INTEGER), COUNT(*)"
+                f" FROM imagenes i JOIN anuncios a ON a.id_anuncio = i.id_anuncio{where}"
+                f" GROUP BY 1, 2", parametros
+            ).fetchall()
+        histogramas = {}
+        for grupo, puntuacion, cuenta in filas:
+            histogramas.setdefault(grupo, [0] * 11)[puntuacion] += cuenta
+        return histogramas
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
+
+
+def _imprimir_agregados(filas, agrupar_por):
+    print(f"{agrupar_por:30s} {'imágenes':>9s} {'anuncios':>9s} {'media':>6s} {'mín':>5s} {'máx':>5s}")
+    for fila in filas:
+        grupo = "(desconocido)" if fila["grupo"] is None else str(fila["grupo"])
+        print(f"{grupo[:30]:30s} {fila['imagenes']:9d} {fila['anuncios']:9d} "
+              f"{fila['media']:6.2f} {fila['minima']:5.1f} {fila['maxima']:5.1f}")
+
+
+def _imprimir_distribucion(histogramas):
+    for grupo, cuentas in sorted(histogramas.items(), key=lambda g: -sum(g[1])):
+        total = sum(cuentas)
+        print(f"\n{'(desconocido)' if grupo is None else grupo} ({total} imágenes)")
+        for puntuacion, cuenta in enumerate(cuentas):
+            barra = "#" * round(40 * cuenta / total) if total else ""
+            print(f"  {puntuacion:2d} {cuenta:7d} {barra}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Consultas sobre el almacén de resultados de análisis.")
+    parser.add_argument("--archivo", default=ARCHIVO_RESULTADOS, help="Base de datos de resultados.")
+    subparsers = parser.add_subparsers(dest="orden", required=True)
+    for orden, ayuda in (("resumen", "Puntuación media, mínima y máxima por grupo."),
+                         ("distribucion", "Histograma de puntuaciones por grupo.")):
+        sub = subparsers.add_parser(orden, help=ayuda)
+        sub.add_argument("--por", choices=sorted(GRUPOS), default="modelo_ia", help="Campo por el que agrupar.")
+        sub.add_argument("--desde", help="Primer día (AAAA-MM-DD).")
+        sub.add_argument("--hasta", help="Último día (AAAA-MM-DD).")
+        sub.add_argument("--incluir-errores", action="store_true", help="Contar las imágenes que fallaron.")
+        if orden == "resumen":
+            sub.add_argument("--limite", type=int, help="Mostrar solo los N grupos con más imágenes.")
+            sub.add_argument("--json", action="store_true", help="Salida en JSON.")
+    sub = subparsers.add_parser("fusionar", help="Combina en --archivo los almacenes de varios fragmentos.")
+    sub.add_argument("origenes", nargs="+", help="Almacenes a fusionar (p. ej. resultados.fragmento-*.sqlite).")
+    args = parser.parse_args()
+
+    with AlmacenResultados(args.archivo) as almacen:
+        inicio = time.perf_counter()
+        if args.orden == "fusionar":
+            for origen in args.origenes:
+                print(f"{origen}: {almacen.fusionar(origen)} anuncios fusionados.")
+            print()
+            _imprimir_agregados(almacen.agregados("flota"), "flota")
+            print()
+            _imprimir_agregados(almacen.agregados("concesionario", limite=20), "concesionario")
+        elif args.orden == "resumen":
+            filas = almacen.agregados(args.por, args.desde, args.hasta, args.incluir_errores, args.limite)
+            if args.json:
+                print(json.dumps(filas, ensure_ascii=False, indent=2))
+            else:
+                _imprimir_agregados(filas, args.por)
+        else:
+            _imprimir_distribucion(almacen.distribucion(args.por, args.desde, args.hasta, args.incluir_errores))
+        if not getattr(args, "json", False):
+            print(f"\nConsulta resuelta en {1000 * (time.perf_counter() - inicio):.1f} ms.")
@@ -0,0 +1,502 @@
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from pipeline import percentil
+
+# --- Configuración por defecto ---
+ARCHIVO_RESULTADOS_BENCHMARK = "resultados_benchmark.jsonl" # Una línea JSON por ejecución
+TOLERANCIA_REGRESION = 0.10 # Caída relativa de rendimiento a partir de la cual se avisa
+ANUNCIOS = 40
+IMAGENES_POR_ANUNCIO = 8
+LADO_IMAGEN = 1024 # Lado largo de las imágenes sintéticas (las reales rondan 1024-1600 px)
+VARIANTES_IMAGEN = 16 # Imágenes distintas que sirve el sitio (se generan una vez al arrancar)
+RETARDO_MODELO = 0.5 # Segundos que tarda el modelo falso en responder (Gemini Flash tarda 1-3 s)
+# Espera entre reintentos de descargar_pagina durante el benchmark (5 s en uso real), para que
+# una tasa de errores alta no convierta la prueba en una espera
+RETARDO_REINTENTO_PAGINAS = 0.2
+
+
+def _imagen_sintetica(aleatorio, lado):
+    """JPEG de un "coche" sintético: degradado de fondo, formas y ruido (nítido y bien expuesto)."""
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    ancho, alto = lado, lado * 2 // 3
+    fondo = np.linspace(60, 190, alto, dtype=np.float32)[:, None, None] * np.ones((1, ancho, 3), np.float32)
+    fondo += np.array([aleatorio.uniform(-30, 30) for _ in range(3)], np.float32)
+    ruido = np.random.default_rng(aleatorio.randrange(2 ** 32)).normal(0, 12, (alto, ancho, 3))
+    img = Image.fromarray(np.clip(fondo + ruido, 0, 255).astype(np.uint8))
+    dibujo = ImageDraw.Draw(img)
+    for _ in range(6):
+        x, y = aleatorio.randrange(ancho // 2), aleatorio.randrange(alto // 2)
+        color = tuple(aleatorio.randrange(256) for _ in range(3))
+        dibujo.rectangle([x, y, x + aleatorio.randrange(ancho // 16, ancho // 2), y + aleatorio.randrange(alto // 16, alto // 2)], fill=color)
+    salida = io.BytesIO()
+    img.save(salida, "JPEG", quality=85)
+    return salida.getvalue()
+
+
+class SitioSintetico:
+    """
+    Servidor HTTP local que imita al sitio de anuncios y a su CDN de imágenes.
+
+    Sirve páginas de anuncio con la misma estructura que motorflash (imágenes "lazyload"
+    con data-src y JSON-LD con concesionario, marca y modelo) y las imágenes que
+    enlazan, con latencia, errores 500 y respuestas 429 configurables. También sirve
+    resultados de búsqueda paginados (/coches-de-ocasion/?pagina=N, con rel="next") y
+    un índice de sitemaps (/sitemap.xml) para el descubrimiento de anuncios; cambiar
+    `precios[numero]` cambia la tarjeta y el <lastmod> de ese anuncio.
+
+        with SitioSintetico(anuncios=20, latencia=0.05) as sitio:
+            urls = sitio.urls_anuncios()
+
+    Args:
+        anuncios (int): Número de anuncios del sitio.
+        imagenes_por_anuncio (int): Imágenes de cada anuncio.
+        latencia (float): Segundos de espera antes de cada respuesta.
+        tasa_errores (float): Probabilidad (0-1) de responder 500.
+        tasa_429 (float): Probabilidad (0-1) de responder 429 Too Many Requests.
+        lado_imagen (int): Lado largo de las imágenes en píxeles.
+        variantes (int): Imágenes distintas entre las que se reparten las URLs.
+        semilla (int): Semilla de las imágenes y de los errores.
+        anuncios_por_pagina (int): Anuncios por página de resultados y por sitemap.
+    """
+
+    def __init__(self, anuncios=ANUNCIOS, imagenes_por_anuncio=IMAGENES_POR_ANUNCIO, latencia=0.0, tasa_errores=0.0,
+                 tasa_429=0.0, lado_imagen=LADO_IMAGEN, variantes=VARIANTES_IMAGEN, semilla=1, anuncios_por_pagina=20):
+        self.anuncios = anuncios
+        self.anuncios_por_pagina = anuncios_por_pagina
+        self.precios = [15000 + 100 * numero for numero in range(anuncios)]
+        self.imagenes_por_anuncio = imagenes_por_anuncio
+        self.latencia = latencia
+        self.tasa_errores = tasa_errores
+        self.tasa_429 = tasa_429
+        self.peticiones = {"paginas": 0, "imagenes": 0, "errores": 0, "429": 0}
+        aleatorio = random.Random(semilla)
+        self._imagenes = [_imagen_sintetica(aleatorio, lado_imagen) for _ in range(variantes)]
+        self._aleatorio = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detener()
+
+    def iniciar(self):
+        sitio = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive, como el CDN real
+
+            def do_GET(self):
+                sitio._responder(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name="sitio-sintetico", daemon=True).start()
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}"
+
+    def id_anuncio(self, numero):
+        return str(90000000 + numero)
+
+    def url_anuncio(self, numero):
+        return f"{self.url_base}/coche-de_segunda_mano/sintetico-{numero}/ocasion/{self.id_anuncio(numero)}-es/"
+
+    def urls_anuncios(self):
+        """URLs de las páginas de todos los anuncios, con el mismo formato que las reales."""
+        return [self.url_anuncio(numero) for numero in range(self.anuncios)]
+
+    def _tramos(self):
+        return range(0, self.anuncios, self.anuncios_por_pagina)
+
+    def resultados(self, pagina):
+        """Página `pagina` (desde 1) de los resultados de búsqueda, del anuncio más reciente al más antiguo."""
+        numeros = list(range(self.anuncios - 1, -1, -1))[(pagina - 1) * self.anuncios_por_pagina:][:self.anuncios_por_pagina]
+        tarjetas = "\n".join(
+            f'<article class="tarjeta"><a href="{urlsplit(self.url_anuncio(numero)).path}?origen=busqueda">'
+            f'<img src="/img/{self.id_anuncio(numero)}/0.jpg"></a><h2><a href="{self.url_anuncio(numero)}">Volvo '
+            f'sintético {numero}</a></h2><span class="precio">{self.precios[numero]} €</span></article>'
+            for numero in numeros
+        )
+        siguiente = (f'<link rel="next" href="/coches-de-ocasion/?pagina={pagina + 1}">'
+                     if pagina * self.anuncios_por_pagina < self.anuncios else "")
+        return (f"<!DOCTYPE html><html><head><title>Coches de ocasión - página {pagina}</title>{siguiente}</head>"
+                f"<body>{tarjetas}</body></html>").encode("utf-8")
+
+    def sitemap(self, tramo=None):
+        """Índice de sitemaps (sin `tramo`) o el sitemap con los anuncios del tramo."""
+        if tramo is None:
+            entradas = "".join(f"<sitemap><loc>{self.url_base}/sitemap-anuncios-{posicion}.xml</loc></sitemap>"
+                               for posicion, _ in enumerate(self._tramos()))
+            return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex>{entradas}</sitemapindex>'.encode("utf-8")
+        inicio = self._tramos()[tramo]
+        entradas = "".join(
+            f"<url><loc>{self.url_anuncio(numero)}</loc><lastmod>"
+            f"{time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(1704067200 + self.precios[numero]))}</lastmod></url>"
+            for numero in range(inicio, min(inicio + self.anuncios_por_pagina, self.anuncios))
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset>{entradas}</urlset>'.encode("utf-8")
+
+    def pagina(self, id_anuncio):
+        imagenes = "\n".join(
+            f'<div class="foto"><img class="lazyload" src="/blank.gif" data-src="{self.url_base}/img/{id_anuncio}/{indice}.jpg"></div>'
+            for indice in range(self.imagenes_por_anuncio)
+        )
+        datos = {
+            "@context": "https://schema.org", "@type": "Car", "brand": {"@type": "Brand", "name": "Volvo"},
+            "model": f"XC{40 + int(id_anuncio) % 3 * 20}",
+            "offers": {"@type": "Offer", "seller": {"@type": "AutoDealer", "name": f"Concesionario {int(id_anuncio) % 5}"}},
+        }
+        return (f"<!DOCTYPE html><html><head><title>Anuncio {id_anuncio}</title>"
+                f'<script type="application/ld+json">{json.dumps(datos)}</script></head>'
+                f"<body><h1>Volvo de ocasión</h1>{imagenes}</body></html>").encode("utf-8")
+
+    def _responder(self, peticion):
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._lock:
+            sorteo = self._aleatorio.random()
+        ruta = urlsplit(peticion.path)
+        partes = ruta.path.strip("/").split("/")
+        sitemap = re.match(r'^sitemap(?:-anuncios-(\d+))?\.xml$', partes[0])
+        if partes[0] == "coches-de-ocasion":
+            tipo = "paginas"
+            cuerpo, contenido = self.resultados(int(parse_qs(ruta.query).get("pagina", ["1"])[0])), "text/html; charset=utf-8"
+        elif sitemap:
+            tipo = "paginas"
+            cuerpo = self.sitemap(int(sitemap.group(1)) if sitemap.group(1) else None)
+            contenido = "application/xml"
+        elif partes[0] == "img" and len(partes) == 3:
+            tipo = "imagenes"
+            indice = zlib.crc32(f"{partes[1]}/{partes[2]}".encode()) % len(self._imagenes)
+            cuerpo, contenido = self._imagenes[indice], "image/jpeg"
+        elif "ocasion" in partes:
+            tipo = "paginas"
+            cuerpo, contenido = self.pagina(partes[partes.index("ocasion") + 1].split("-")[0]), "text/html; charset=utf-8"
+        else:
+            peticion.send_error(404)
+            return
+        with self._lock:
+            self.peticiones[tipo] += 1
+            if sorteo < self.tasa_429:
+                self.peticiones["429"] += 1
+                codigo = 429
+            elif sorteo < self.tasa_429 + self.tasa_errores:
+                self.peticiones["errores"] += 1
+                codigo = 500
+            else:
+                codigo = 200
+        if codigo != 200:
+            peticion.send_response(codigo)
+            if codigo == 429:
+                peticion.send_header("Retry-After", "1")
+            peticion.send_header("Content-Length", "0")
+            peticion.end_headers()
+            return
+        peticion.send_response(200)
+        peticion.send_header("Content-Type", contenido)
+        peticion.send_header("Content-Length", str(len(cuerpo)))
+        peticion.end_headers()
+        peticion.wfile.write(cuerpo)
+
+
+def _medidas(duraciones, segundos, errores=0):
+    """Rendimiento y percentiles de latencia de una prueba."""
+    return {
+        "elementos": len(duraciones),
+        "errores": errores,
+        "segundos": segundos,
+        "por_segundo": len(duraciones) / segundos if segundos else 0.0,
+        **{f"p{p}_ms": 1000 * percentil(duraciones, p) for p in (50, 95, 99)},
+    }
+
+
+def _en_paralelo(funcion, elementos, hilos):
+    """Aplica `funcion` a cada elemento con `hilos` hilos y devuelve (resultados, duraciones, segundos)."""
+    def medir(elemento):
+        inicio = time.perf_counter()
+        resultado = funcion(elemento)
+        return resultado, time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        medidos = list(ejecutor.map(medir, elementos))
+    return [m[0] for m in medidos], [m[1] for m in medidos], time.perf_counter() - inicio
+
+
+def medir_descarga_paginas(sitio, directorio_almacen):
+    """descargar_pagina sobre todos los anuncios del sitio, con la concurrencia de url_a_xml.py."""
+    import url_a_xml
+    from almacen_paginas import AlmacenPaginas
+
+    limitador = url_a_xml.LimitadorPorHost(peticiones_por_segundo=1e6, rafaga=url_a_xml.MAX_CONCURRENCIA)
+    with AlmacenPaginas(directorio_almacen) as almacen, url_a_xml.crear_sesion() as sesion, \
+            contextlib.redirect_stdout(io.StringIO()): # descargar_pagina informa con print()
+        resultados, duraciones, segundos = _en_paralelo(
+            lambda url: url_a_xml.descargar_pagina(url, sesion=sesion, limitador=limitador, almacen=almacen,
+                                                   retardo_reintento=RETARDO_REINTENTO_PAGINAS),
+            sitio.urls_anuncios(), url_a_xml.MAX_CONCURRENCIA,
+        )
+    return _medidas(duraciones, segundos, resultados.count(False))
+
+
+def medir_extraccion(directorio_almacen):
+    """get_image_url_from_html sobre cada página del almacén. Devuelve (medidas, URLs de imágenes)."""
+    import Analisis_de_Imagenes as analisis
+    from almacen_paginas import AlmacenPaginas
+
+    almacen = AlmacenPaginas(directorio_almacen)
+    urls, duraciones = [], []
+    inicio = time.perf_counter()
+    for id_anuncio, _ in almacen:
+        comienzo = time.perf_counter()
+        with almacen.abrir(id_anuncio) as pagina:
+            urls += analisis.get_image_url_from_html(pagina)
+        duraciones.append(time.perf_counter() - comienzo)
+    return _medidas(duraciones, time.perf_counter() - inicio), urls
+
+
+def medir_descarga_imagenes(urls):
+    """download_image sobre todas las imágenes, con los hilos de descarga del pipeline."""
+    import Analisis_de_Imagenes as analisis
+
+    nivel = logging.getLogger().level
+    logging.getLogger().setLevel(logging.CRITICAL) # Los errores simulados se cuentan, no se muestran
+    try:
+        resultados, duraciones, segundos = _en_paralelo(analisis.download_image, urls,
+                                                        analisis.PIPELINE_DOWNLOAD_WORKERS)
+    finally:
+        logging.getLogger().setLevel(nivel)
+    medidas = _medidas(duraciones, segundos, resultados.count(None))
+    medidas["mb_por_segundo"] = sum(len(r) for r in resultados if r) / 1e6 / segundos if segundos else 0.0
+    return medidas
+
+
+def medir_pipeline(directorio_almacen, directorio_trabajo, retardo_modelo=RETARDO_MODELO, errores_modelo=0.0):
+    """
+    Análisis completo (Analisis_de_Imagenes.main) sobre el almacén, con el modelo falso.
+
+    La caché de análisis, el índice de casi duplicados y el registro de trabajos se desactivan para que todas las
+    imágenes pasen por el modelo; el resto de la configuración es la del módulo.
+    """
+    import Analisis_de_Imagenes as analisis
+    from motor_analisis import ModeloFalso
+
+    cambios = {
+        "PAGE_STORE_DIR": directorio_almacen,
+        "OUTPUT_BASE_NAME": os.path.join(directorio_trabajo, "informe_"),
+        "TEMP_IMAGES_DIR": os.path.join(directorio_trabajo, "temp"),
+        "RESULTS_STORE_PATH": os.path.join(directorio_trabajo, "resultados.sqlite"),
+        "JOB_LEDGER_PATH": None,
+        "ANALYSIS_CACHE_PATH": None,
+        "NEAR_DUPLICATE_INDEX_PATH": None,
+        "REANALIZAR_SIN_CAMBIOS": True,
+        "GEMINI_RPM": 1e6, # Se mide el pipeline, no la cuota
+        "GEMINI_TPM": 1e9,
+    }
+    anteriores = {nombre: getattr(analisis, nombre) for nombre in cambios}
+    backend_anterior = analisis._model_backend
+    modelo = ModeloFalso(retardo=retardo_modelo, tasa_errores=errores_modelo, semilla=1)
+    nivel = logging.getLogger().level
+    try:
+        for nombre, valor in cambios.items():
+            setattr(analisis, nombre, valor)
+        analisis._quota_limiter = None
+        analisis.set_model_backend(modelo)
+        logging.getLogger().setLevel(logging.CRITICAL)
+        inicio = time.perf_counter()
+        pipeline_ejecutado = analisis.main()
+        segundos = time.perf_counter() - inicio
+    finally:
+        logging.getLogger().setLevel(nivel)
+        for nombre, valor in anteriores.items():
+            setattr(analisis, nombre, valor)
+        analisis._quota_limiter = None
+        analisis.set_model_backend(backend_anterior)
+
+    etapas = {etapa.nombre: etapa.estadisticas for etapa in pipeline_ejecutado.etapas}
+    anuncios = etapas["informe"].emitidos
+    imagenes = etapas["descarga"].procesados
+    return {
+        "anuncios": anuncios,
+        "imagenes": imagenes,
+        "peticiones_modelo": modelo.llamadas,
+        "segundos": segundos,
+        "anuncios_por_segundo": anuncios / segundos if segundos else 0.0,
+        "imagenes_por_segundo": imagenes / segundos if segundos else 0.0,
+        "etapas": {
+            nombre: {"llamadas": len(estadisticas.duraciones), "errores": estadisticas.errores,
+                     "ocupacion": estadisticas.ocupacion(), **estadisticas.latencias()}
+            for nombre, estadisticas in etapas.items()
+        },
+    }
+
+
+def _pico_rss_mb():
+    """Pico de memoria residente del proceso en MB (None si el sistema no lo permite)."""
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 / 1024 if os.uname().sysname == "Darwin" else pico / 1024
+
+
+def _version():
+    """Commit actual (git), para saber qué versión produjo cada resultado."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar_suite(anuncios=ANUNCIOS, imagenes_por_anuncio=IMAGENES_POR_ANUNCIO, latencia=0.0, tasa_errores=0.0,
+                   tasa_429=0.0, retardo_modelo=RETARDO_MODELO, errores_modelo=0.0, memoria_python=False):
+    """
+    Ejecuta todas las pruebas contra un sitio sintético local y el modelo falso.
+
+    Args:
+        anuncios, imagenes_por_anuncio, latencia, tasa_errores, tasa_429: Ver SitioSintetico.
+        retardo_modelo (float): Segundos que tarda cada respuesta del modelo falso.
+        errores_modelo (float): Probabilidad de que el modelo falso devuelva 429/503.
+        memoria_python (bool): Medir también el pico de memoria de Python de cada prueba
+            con tracemalloc (ralentiza la ejecución, así que el rendimiento no es comparable).
+
+    Returns:
+        dict: Parámetros, versión, medidas de cada prueba y pico de memoria.
+    """
+    parametros = {
+        "anuncios": anuncios, "imagenes_por_anuncio": imagenes_por_anuncio, "latencia": latencia,
+        "tasa_errores": tasa_errores, "tasa_429": tasa_429, "retardo_modelo": retardo_modelo,
+        "errores_modelo": errores_modelo, "memoria_python": memoria_python,
+    }
+    pruebas = {}
+    with tempfile.TemporaryDirectory() as directorio, \
+            SitioSintetico(anuncios, imagenes_por_anuncio, latencia, tasa_errores, tasa_429) as sitio:
+        directorio_almacen = os.path.join(directorio, "paginas")
+        pasos = [
+            ("descarga_paginas", lambda: medir_descarga_paginas(sitio, directorio_almacen)),
+            ("extraccion", lambda: medir_extraccion(directorio_almacen)),
+            ("descarga_imagenes", lambda: medir_descarga_imagenes(urls)),
+            ("pipeline", lambda: medir_pipeline(directorio_almacen, directorio, retardo_modelo, errores_modelo)),
+        ]
+        urls = []
+        for nombre, prueba in pasos:
+            if memoria_python:
+                tracemalloc.start()
+            resultado = prueba()
+            if nombre == "extraccion":
+                resultado, urls = resultado
+            if memoria_python:
+                resultado["pico_python_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+                tracemalloc.stop()
+            pruebas[nombre] = resultado
+        peticiones = dict(sitio.peticiones)
+    return {
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "version": _version(),
+        "parametros": parametros,
+        "peticiones_servidor": peticiones,
+        "pruebas": pruebas,
+        "pico_rss_mb": _pico_rss_mb(),
+    }
+
+
+def guardar_resultado(resultado, ruta=ARCHIVO_RESULTADOS_BENCHMARK):
+    """Añade el resultado de una ejecución al histórico (una línea JSON)."""
+    with open(ruta, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+
+def ultimo_resultado(parametros, ruta=ARCHIVO_RESULTADOS_BENCHMARK):
+    """Último resultado guardado con los mismos parámetros (None si no hay)."""
+    if not os.path.exists(ruta):
+        return None
+    anterior = None
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            if linea.strip():
+                resultado = json.loads(linea)
+                if resultado.get("parametros") == parametros:
+                    anterior = resultado
+    return anterior
+
+
+def _rendimientos(resultado):
+    """Medidas de rendimiento (más es mejor) de un resultado: nombre -> valor."""
+    pruebas = resultado["pruebas"]
+    medidas = {f"{nombre}.por_segundo": datos["por_segundo"] for nombre, datos in pruebas.items() if "por_segundo" in datos}
+    if "pipeline" in pruebas:
+        medidas["pipeline.anuncios_por_segundo"] = pruebas["pipeline"]["anuncios_por_segundo"]
+        medidas["pipeline.imagenes_por_segundo"] = pruebas["pipeline"]["imagenes_por_segundo"]
+    return medidas
+
+
+def comparar(anterior, actual, tolerancia=TOLERANCIA_REGRESION):
+    """
+    Compara el rendimiento de dos ejecuciones.
+
+    Returns:
+        list: (medida, valor anterior, valor actual, cambio relativo, es_regresion) por medida.
+    """
+    previos, nuevos = _rendimientos(anterior), _rendimientos(actual)
+    filas = []
+    for medida, valor in nuevos.items():
+        previo = previos.get(medida)
+        if not previo:
+            continue
+        cambio = (valor - previo) / previo
+        filas.append((medida, previo, valor, cambio, cambio < -tolerancia))
+    return filas
+
+
+def imprimir_resultado(resultado):
+    pruebas = resultado["pruebas"]
+    print(f"{'prueba':20s} {'elem.':>7s} {'errores':>7s} {'elem./s':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for nombre in ("descarga_paginas", "extraccion", "descarga_imagenes"):
+        datos = pruebas[nombre]
+        print(f"{nombre:20s} {datos['elementos']:7d} {datos['errores']:7d} {datos['por_segundo']:9.1f} "
+              f"{datos['p50_ms']:8.1f} {datos['p95_ms']:8.1f} {datos['p99_ms']:8.1f}")
+    datos = pruebas["pipeline"]
+    print(f"\nPipeline: {datos['anuncios']} anuncios y {datos['imagenes']} imágenes en {datos['segundos']:.1f} s "
+          f"({datos['anuncios_por_segundo']:.2f} anuncios/s, {datos['imagenes_por_segundo']:.1f} imágenes/s, "
+          f"{datos['peticiones_modelo']} peticiones al modelo)")
+    print(f"{'etapa':20s} {'llamadas':>8s} {'errores':>7s} {'ocup.':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for nombre, etapa in datos["etapas"].items():
+        print(f"{nombre:20s} {etapa['llamadas']:8d} {etapa['errores']:7d} {100 * etapa['ocupacion']:5.0f}% "
+              f"{etapa['p50_ms']:8.1f} {etapa['p95_ms']:8.1f} {etapa['p99_ms']:8.1f}")
+    if resultado["pico_rss_mb"] is not None:
+        print(f"\nPico de memoria del proceso: {resultado['pico_rss_mb']:.0f} MB")
+    for nombre, datos in pruebas.items():
+        if "pico_python_mb" in datos:
+            print(f"Pico de memoria de Python en {nombre}: {datos['pico_python_mb']:.1f} MB")
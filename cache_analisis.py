@@ -0,0 +1,139 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+# Base de datos por defecto de la caché de análisis
+ARCHIVO_CACHE_ANALISIS = "cache_analisis.sqlite"
+MAX_ENTRADAS = 200000 # Tamaño máximo de la caché (se expulsan primero las menos usadas recientemente)
+MAX_EDAD_DIAS = 90 # Los análisis más antiguos se descartan
+# Cada cuántas escrituras se aplica la política de expulsión
+EXPULSAR_CADA = 500
+
+
+def hash_texto(texto):
+    """Devuelve el hash SHA-256 (hexadecimal) de un texto."""
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def hash_imagen(origen):
+    """
+    Devuelve el hash SHA-256 del contenido de una imagen.
+
+    Args:
+        origen (bytes | str): Bytes de la imagen o ruta del archivo en disco.
+    """
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(origen).hexdigest()
+    h = hashlib.sha256()
+    with open(origen, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def clave_analisis(hash_de_imagen, nombre_modelo, hash_prompt):
+    """Combina el hash de la imagen, el modelo y la versión del prompt en una única clave."""
+    return hashlib.sha256(f"{hash_de_imagen}|{nombre_modelo}|{hash_prompt}".encode('utf-8')).hexdigest()
+
+
+class CacheAnalisis:
+    """
+    Caché persistente (SQLite) de análisis de imágenes.
+
+    Cada entrada guarda el texto del análisis y la puntuación extraída, con la clave
+    generada por `clave_analisis`. Cuenta aciertos y fallos para poder informar del
+    ahorro al final de la ejecución. Es segura para usarla desde varios hilos.
+
+    Args:
+        ruta (str): Archivo SQLite de la caché.
+        max_entradas (int): Número máximo de entradas antes de expulsar las menos usadas.
+        max_edad_dias (float): Edad máxima de una entrada (desde que se creó).
+    """
+
+    def __init__(self, ruta=ARCHIVO_CACHE_ANALISIS, max_entradas=MAX_ENTRADAS, max_edad_dias=MAX_EDAD_DIAS):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.max_edad_segundos = max_edad_dias * 24 * 3600
+        self.aciertos = 0
+        self.fallos = 0
+        self._escrituras = 0
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS analisis ("
+            " clave TEXT PRIMARY KEY,"
+            " texto TEXT NOT NULL,"
+            " puntuacion REAL NOT NULL,"
+            " creado REAL NOT NULL,"
+            " ultimo_acceso REAL NOT NULL)"
+        )
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_analisis_acceso ON analisis (ultimo_acceso)")
+        self._conexion.commit()
+
+    def obtener(self, clave, registrar=True):
+        """
+        Devuelve (texto, puntuacion) si la clave está en la caché y no ha caducado; si no, None.
+
+        Con registrar=False la consulta no cuenta como acierto ni como fallo (para sondear
+        candidatos, como las fotos casi idénticas, sin falsear el resumen).
+        """
+        ahora = time.time()
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT texto, puntuacion, creado FROM analisis WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None or ahora - fila[2] > self.max_edad_segundos:
+                if registrar:
+                    self.fallos += 1
+                return None
+            self._conexion.execute("UPDATE analisis SET ultimo_acceso = ? WHERE clave = ?", (ahora, clave))
+            self._conexion.commit()
+            if registrar:
+                self.aciertos += 1
+            return fila[0], fila[1]
+
+    def guardar(self, clave, texto, puntuacion):
+        """Guarda (o reemplaza) el análisis de una clave."""
+        ahora = time.time()
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO analisis (clave, texto, puntuacion, creado, ultimo_acceso)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (clave, texto, puntuacion, ahora, ahora),
+            )
+            self._conexion.commit()
+            self._escrituras += 1
+            if self._escrituras % EXPULSAR_CADA == 0:
+                self._expulsar(ahora)
+
+    def expulsar(self):
+        """Aplica la política de expulsión por edad y tamaño. Devuelve las entradas borradas."""
+        with self._lock:
+            return self._expulsar(time.time())
+
+    def _expulsar(self, ahora):
+        borradas = self._conexion.execute(
+            "DELETE FROM analisis WHERE creado < ?", (ahora - self.max_edad_segundos,)
+        ).rowcount
+        total = self._conexion.execute("SELECT COUNT(*) FROM analisis").fetchone()[0]
+        if total > self.max_entradas:
+            borradas += self._conexion.execute(
+                "DELETE FROM analisis WHERE clave IN ("
+                " SELECT clave FROM analisis ORDER BY ultimo_acceso LIMIT ?)",
+                (total - self.max_entradas,),
+            ).rowcount
+        self._conexion.commit()
+        return borradas
+
+    def resumen(self):
+        """Texto con los aciertos y fallos de esta ejecución."""
+        consultas = self.aciertos + self.fallos
+        porcentaje = 100 * self.aciertos / consultas if consultas else 0
+        return f"Caché de análisis: {self.aciertos} aciertos, {self.fallos} fallos ({porcentaje:.1f}% de llamadas a Gemini evitadas)."
+
+    def cerrar(self):
+        with self._lock:
+            self._expulsar(time.time())
+            self._conexion.close()
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import threading
+
+# Archivo donde se guarda la caché de descargas entre ejecuciones
+ARCHIVO_CACHE_PAGINAS = "cache_paginas.json"
+# La caché se vuelca a disco cada tantas URLs actualizadas (y al cerrarla)
+GUARDAR_CADA = 50
+
+
+def hash_contenido(contenido):
+    """Devuelve el hash SHA-256 (hexadecimal) de un contenido en bytes."""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+class CachePaginas:
+    """
+    Caché persistente de metadatos de descarga por URL.
+
+    Para cada URL guarda el ETag, el Last-Modified, el hash del contenido y el
+    destino (archivo o entrada del almacén) donde se escribió la última vez. Con esos datos se pueden hacer
+    peticiones condicionales (If-None-Match / If-Modified-Since) y detectar si el
+    contenido ha cambiado desde la ejecución anterior.
+
+    Los cambios se guardan cada GUARDAR_CADA URLs y al cerrar la caché (se puede usar
+    con `with`).
+
+    Args:
+        ruta (str): Archivo JSON donde se persiste la caché.
+    """
+
+    def __init__(self, ruta=ARCHIVO_CACHE_PAGINAS):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._cambios_sin_guardar = 0
+        self._entradas = {}
+        if os.path.exists(ruta):
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    self._entradas = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Advertencia: No se pudo leer la caché '{ruta}': {e}. Se empezará con una caché vacía.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cerrar()
+
+    def obtener(self, url):
+        """Devuelve la entrada guardada para `url` o None si no existe."""
+        with self._lock:
+            entrada = self._entradas.get(url)
+            return dict(entrada) if entrada else None
+
+    def cabeceras_condicionales(self, url, destino, hay_copia_local):
+        """
+        Construye las cabeceras If-None-Match / If-Modified-Since para `url`.
+
+        Solo se envían si la copia local sigue existiendo en `destino`; si no,
+        un 304 nos dejaría sin página que analizar.
+        """
+        entrada = self.obtener(url)
+        if not entrada or entrada.get('archivo') != destino or not hay_copia_local:
+            return {}
+        cabeceras = {}
+        if entrada.get('etag'):
+            cabeceras['If-None-Match'] = entrada['etag']
+        if entrada.get('last_modified'):
+            cabeceras['If-Modified-Since'] = entrada['last_modified']
+        return cabeceras
+
+    def sin_cambios(self, url, destino, hash_nuevo, hay_copia_local):
+        """Indica si el contenido descargado coincide con la copia local de la última ejecución."""
+        entrada = self.obtener(url)
+        return (
+            entrada is not None
+            and entrada.get('hash') == hash_nuevo
+            and entrada.get('archivo') == destino
+            and hay_copia_local
+        )
+
+    def actualizar(self, url, destino, etag, last_modified, hash_nuevo):
+        """Guarda los metadatos de la última descarga de `url` (en disco cada GUARDAR_CADA URLs)."""
+        entrada = {
+            'archivo': destino,
+            'etag': etag,
+            'last_modified': last_modified,
+            'hash': hash_nuevo,
+        }
+        with self._lock:
+            if self._entradas.get(url) == entrada:
+                return
+            self._entradas[url] = entrada
+            self._cambios_sin_guardar += 1
+            if self._cambios_sin_guardar >= GUARDAR_CADA:
+                self._guardar()
+
+    def guardar(self):
+        """Vuelca a disco los cambios pendientes."""
+        with self._lock:
+            if self._cambios_sin_guardar:
+                self._guardar()
+
+    def cerrar(self):
+        """Guarda los cambios pendientes de la caché."""
+        self.guardar()
+
+    def _guardar(self):
+        # Escritura atómica: si el proceso muere a mitad, la caché anterior sigue intacta
+        ruta_temporal = f"{self.ruta}.tmp"
+        with open(ruta_temporal, 'w', encoding='utf-8') as f:
+            json.dump(self._entradas, f, ensure_ascii=False, indent=1)
+        os.replace(ruta_temporal, self.ruta)
+        self._cambios_sin_guardar = 0
@@ -0,0 +1,191 @@
+import argparse
+import importlib
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from fragmentos import Fragmento
+
+# Módulos que carga cada subcomando. Se importan solo al ejecutarlo, así que `--help` o
+# un subcomando ligero no pagan la importación de Pillow, BeautifulSoup o el cliente de Gemini.
+MODULOS_SUBCOMANDO = {
+    "discover": ("descubrimiento",),
+    "fetch": ("url_a_xml",),
+    "analyze": ("Analisis_de_Imagenes",),
+    "report": ("almacen_resultados", "informes"),
+    "bench": ("extraccion_urls", "almacen_paginas", "benchmark"),
+}
+REPETICIONES_ARRANQUE = 5
+
+
+def _cargar(subcomando):
+    """Importa los módulos de un subcomando y devuelve el primero."""
+    return [importlib.import_module(nombre) for nombre in MODULOS_SUBCOMANDO[subcomando]][0]
+
+
+def discover(args):
+    descubrimiento = _cargar("discover")
+    import url_a_xml
+    from configuracion import aplicar_configuracion
+    aplicar_configuracion(descubrimiento, "descubrimiento", args.config)
+    aplicar_configuracion(url_a_xml, "descarga", args.config) # Ritmo por host de las peticiones
+    semillas = args.semillas or url_a_xml.leer_urls(descubrimiento.ARCHIVO_SEMILLAS)
+    cola = descubrimiento.descubrir_a_cola(semillas, descubrimiento.ARCHIVO_FRONTERA, descubrimiento.ARCHIVO_COLA)
+    if args.descargar and cola:
+        descubrimiento.descargar_cola(descubrimiento.ARCHIVO_COLA)
+
+
+def fetch(args):
+    url_a_xml = _cargar("fetch")
+    from configuracion import aplicar_configuracion
+    aplicar_configuracion(url_a_xml, "descarga", args.config)
+    if args.cola:
+        # Quita de la cola los anuncios descargados: varios fragmentos a la vez se pisarían
+        if args.shard:
+            sys.exit("--cola no admite --shard.")
+        import descubrimiento
+        aplicar_configuracion(descubrimiento, "descubrimiento", args.config)
+        descubrimiento.descargar_cola(descubrimiento.ARCHIVO_COLA)
+        return
+    url_a_xml.descargar_al_almacen(url_a_xml.leer_urls(args.urls or url_a_xml.ARCHIVO_URLS), args.shard)
+
+
+def analyze(args):
+    analisis = _cargar("analyze")
+    from configuracion import aplicar_configuracion
+    settings = aplicar_configuracion(analisis, "analisis", args.config)
+    analisis.run_analysis(args.shard, args.procesos, settings)
+
+
+def report(args):
+    almacen_resultados = _cargar("report")
+    import informes
+    ruta = args.resultados or almacen_resultados.ARCHIVO_RESULTADOS
+    with almacen_resultados.AlmacenResultados(ruta) as almacen:
+        escritos = informes.regenerate_reports(almacen, args.prefijo or informes.REPORT_BASE_NAME, args.anuncios or None)
+    print(f"{escritos} informes regenerados desde '{ruta}'.")
+
+
+def medir_arranque(repeticiones=REPETICIONES_ARRANQUE):
+    """
+    Mide en procesos nuevos cuánto tarda en arrancar cada subcomando.
+
+    Returns:
+        dict: Subcomando -> {"ayuda": ms de `cli.py <subcomando> --help`,
+            "carga": ms de importar sus módulos}, medianas de `repeticiones` ejecuciones.
+    """
+    directorio = os.path.dirname(os.path.abspath(__file__))
+
+    def mediana_ms(orden):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            subprocess.run(orden, cwd=directorio, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            tiempos.append(1000 * (time.perf_counter() - inicio))
+        return statistics.median(tiempos)
+
+    base = mediana_ms([sys.executable, "-c", "pass"])
+    resultados = {"(python)": {"ayuda": base, "carga": base}}
+    for subcomando in MODULOS_SUBCOMANDO:
+        resultados[subcomando] = {
+            "ayuda": mediana_ms([sys.executable, "cli.py", subcomando, "--help"]),
+            "carga": mediana_ms([sys.executable, "-c", f"import cli; cli._cargar({subcomando!r})"]),
+        }
+    return resultados
+
+
+def bench(args):
+    if args.prueba == "arranque":
+        print(f"{'subcomando':12s} {'--help (ms)':>12s} {'carga (ms)':>12s}")
+        for subcomando, tiempos in medir_arranque(args.repeticiones).items():
+            print(f"{subcomando:12s} {tiempos['ayuda']:12.0f} {tiempos['carga']:12.0f}")
+    elif args.prueba == "extraccion":
+        extraccion_urls = _cargar("bench")
+        from almacen_paginas import DIRECTORIO_ALMACEN, AlmacenPaginas
+        almacen = AlmacenPaginas(args.directorio or DIRECTORIO_ALMACEN)
+        resultados = extraccion_urls.comparar_motores(almacen, repeticiones=args.repeticiones)
+        base = resultados.get("bs4", {}).get("segundos")
+        for motor, datos in resultados.items():
+            aceleracion = f" (x{base / datos['segundos']:.1f} frente a bs4)" if base and datos['segundos'] else ""
+            print(f"{motor:10s} {datos['segundos'] * 1000:9.1f} ms{aceleracion}  páginas con URLs distintas: {datos['diferencias']}")
+    elif args.prueba == "suite":
+        _cargar("bench")
+        import benchmark
+        resultado = benchmark.ejecutar_suite(args.anuncios, args.imagenes, args.latencia, args.errores, args.tasa_429,
+                                             args.retardo_modelo, memoria_python=args.memoria)
+        benchmark.imprimir_resultado(resultado)
+        anterior = benchmark.ultimo_resultado(resultado["parametros"], args.historico)
+        benchmark.guardar_resultado(resultado, args.historico)
+        if anterior is None:
+            print(f"\nPrimer resultado con estos parámetros, guardado en '{args.historico}'.")
+            return
+        print(f"\nFrente a la ejecución anterior ({anterior['fecha']}, versión {anterior['version'] or 'desconocida'}):")
+        regresiones = 0
+        for medida, previo, valor, cambio, es_regresion in benchmark.comparar(anterior, resultado, args.tolerancia):
+            regresiones += es_regresion
+            print(f"{medida:34s} {previo:10.1f} -> {valor:10.1f} ({cambio:+.0%}){'  REGRESIÓN' if es_regresion else ''}")
+        if regresiones and args.fallar_si_regresion:
+            raise SystemExit(f"{regresiones} medidas han empeorado más de un {args.tolerancia:.0%}.")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Descarga y análisis de las fotos de anuncios de coches.")
+    subparsers = parser.add_subparsers(dest="subcomando", required=True)
+
+    sub = subparsers.add_parser("discover", help="Busca anuncios nuevos o cambiados en páginas de resultados o sitemaps.")
+    sub.add_argument("semillas", nargs="*", help="URLs de partida (por defecto las de semillas_descubrimiento.txt).")
+    sub.add_argument("--descargar", action="store_true", help="Descargar a continuación los anuncios pendientes de la cola.")
+    sub.add_argument("--config", help="Archivo de configuración JSON (por defecto configuracion.json).")
+    sub.set_defaults(funcion=discover)
+
+    sub = subparsers.add_parser("fetch", help="Descarga las páginas de los anuncios al almacén de páginas.")
+    origen = sub.add_mutually_exclusive_group()
+    origen.add_argument("--urls", help="Archivo con las URLs de los anuncios (por defecto urls_anuncios.txt).")
+    origen.add_argument("--cola", action="store_true",
+                        help="Descargar los anuncios pendientes que ha encontrado discover y quitarlos de la cola.")
+    sub.add_argument("--shard", type=Fragmento.desde_texto, help="Solo el fragmento K de N de los anuncios (p. ej. 2/4).")
+    sub.add_argument("--config", help="Archivo de configuración JSON (por defecto configuracion.json).")
+    sub.set_defaults(funcion=fetch)
+
+    sub = subparsers.add_parser("analyze", help="Analiza con Gemini las fotos de los anuncios del almacén.")
+    sub.add_argument("--shard", type=Fragmento.desde_texto, help="Solo el fragmento K de N de los anuncios (p. ej. 2/4).")
+    sub.add_argument("--procesos", type=int, default=1, help="Procesos locales entre los que repartir el fragmento.")
+    sub.add_argument("--config", help="Archivo de configuración JSON (por defecto configuracion.json).")
+    sub.set_defaults(funcion=analyze)
+
+    sub = subparsers.add_parser("report", help="Regenera los informes .txt desde el almacén de resultados.")
+    sub.add_argument("anuncios", nargs="*", help="IDs de los anuncios (todos si no se indica ninguno).")
+    sub.add_argument("--resultados", help="Almacén de resultados (por defecto resultados.sqlite).")
+    sub.add_argument("--prefijo", help="Prefijo de los archivos de informe (por defecto analisis_fotos_coche_flash_).")
+    sub.set_defaults(funcion=report)
+
+    sub = subparsers.add_parser("bench", help="Pruebas de rendimiento.")
+    sub.add_argument("prueba", choices=["arranque", "extraccion", "suite"],
+                     help="arranque: tiempo de arranque de cada subcomando; extraccion: motores de extracción de URLs; "
+                          "suite: descarga, extracción y análisis completo contra un sitio local y un modelo falso.")
+    sub.add_argument("--repeticiones", type=int, default=REPETICIONES_ARRANQUE)
+    sub.add_argument("--directorio", help="Directorio del almacén de páginas (por defecto paginas).")
+    suite = sub.add_argument_group("suite")
+    suite.add_argument("--anuncios", type=int, default=40, help="Anuncios del sitio sintético.")
+    suite.add_argument("--imagenes", type=int, default=8, help="Imágenes por anuncio.")
+    suite.add_argument("--latencia", type=float, default=0.0, help="Segundos de latencia de cada respuesta del sitio.")
+    suite.add_argument("--errores", type=float, default=0.0, help="Proporción de respuestas 500 del sitio (0-1).")
+    suite.add_argument("--tasa-429", type=float, default=0.0, help="Proporción de respuestas 429 del sitio (0-1).")
+    suite.add_argument("--retardo-modelo", type=float, default=0.5, help="Segundos que tarda cada respuesta del modelo falso.")
+    suite.add_argument("--memoria", action="store_true", help="Medir también la memoria de Python con tracemalloc (más lento).")
+    suite.add_argument("--historico", default="resultados_benchmark.jsonl", help="Archivo donde se acumulan los resultados.")
+    suite.add_argument("--tolerancia", type=float, default=0.10, help="Caída relativa que se considera regresión.")
+    suite.add_argument("--fallar-si-regresion", action="store_true", help="Terminar con error si alguna medida empeora.")
+    sub.set_defaults(funcion=bench)
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    args.funcion(args)
+
+
+if __name__ == "__main__":
+    main()
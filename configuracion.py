@@ -0,0 +1,91 @@
+import json
+import os
+
+# Archivo de configuración por defecto: un objeto JSON por sección, por ejemplo
+# {"analisis": {"GEMINI_RPM": 120, "ANALYSIS_BATCH_SIZE": 4}, "descarga": {"MAX_CONCURRENCIA": 8}}
+ARCHIVO_CONFIGURACION = "configuracion.json"
+# Variable de entorno con la ruta de otro archivo de configuración
+VARIABLE_ARCHIVO = "ANALISIS_CONFIGURACION"
+
+_VERDADEROS = ("1", "true", "si", "sí", "yes", "on")
+_FALSOS = ("0", "false", "no", "off")
+
+
+def _convertir(texto, actual):
+    """Convierte el valor de una variable de entorno al tipo del valor por defecto."""
+    if texto.strip().lower() in ("none", "null"):
+        return None
+    if isinstance(actual, bool):
+        if texto.strip().lower() in _VERDADEROS:
+            return True
+        if texto.strip().lower() in _FALSOS:
+            return False
+        raise ValueError(f"'{texto}' no es un valor booleano.")
+    if isinstance(actual, (int, float)):
+        return type(actual)(texto)
+    if isinstance(actual, (list, dict)):
+        return json.loads(texto)
+    if actual is None:
+        # Sin valor por defecto no se sabe el tipo: los números (puertos, ráfagas...) se
+        # convierten y el resto (rutas, modos) se deja como texto
+        for tipo in (int, float):
+            try:
+                return tipo(texto)
+            except ValueError:
+                pass
+    return texto
+
+
+def leer_archivo(ruta=None):
+    """
+    Lee el archivo de configuración (el de ANALISIS_CONFIGURACION o ARCHIVO_CONFIGURACION).
+
+    Returns:
+        dict: Sección -> {constante: valor}. Vacío si no hay archivo.
+    """
+    ruta = ruta or os.environ.get(VARIABLE_ARCHIVO) or ARCHIVO_CONFIGURACION
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def aplicar_configuracion(modulo, seccion, ruta=None, entorno=None):
+    """
+    Sobrescribe las constantes de configuración (nombres en MAYÚSCULAS) de un módulo.
+
+    Primero se aplican los valores de la sección `seccion` del archivo de configuración
+    y después las variables de entorno <SECCION>_<CONSTANTE> (por ejemplo,
+    ANALISIS_GEMINI_RPM=120), que tienen prioridad. Los valores del entorno se convierten
+    al tipo del valor por defecto.
+
+    Args:
+        modulo (module): Módulo cuyas constantes se modifican.
+        seccion (str): Sección del archivo y prefijo de las variables de entorno.
+        ruta (str, opcional): Archivo de configuración.
+        entorno (dict, opcional): Variables de entorno (os.environ por defecto).
+
+    Returns:
+        dict: Constantes modificadas -> nuevo valor.
+
+    Raises:
+        ValueError: Si el archivo menciona una constante que el módulo no tiene o un valor
+            del entorno no se puede convertir.
+    """
+    entorno = os.environ if entorno is None else entorno
+    aplicados = {}
+    for nombre, valor in leer_archivo(ruta).get(seccion, {}).items():
+        if not nombre.isupper() or not hasattr(modulo, nombre):
+            raise ValueError(f"Configuración desconocida en la sección '{seccion}': {nombre}")
+        aplicados[nombre] = valor
+    prefijo = f"{seccion.upper()}_"
+    for variable, texto in entorno.items():
+        nombre = variable[len(prefijo):]
+        if variable.startswith(prefijo) and nombre.isupper() and hasattr(modulo, nombre):
+            try:
+                aplicados[nombre] = _convertir(texto, getattr(modulo, nombre))
+            except ValueError as e:
+                raise ValueError(f"Valor no válido en {variable}: {e}") from None
+    for nombre, valor in aplicados.items():
+        setattr(modulo, nombre, valor)
+    return aplicados
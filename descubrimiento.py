@@ -0,0 +1,418 @@
+import array
+import bisect
+import gzip
+import os
+import re
+import threading
+import zlib
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import requests
+
+from almacen_paginas import PATRON_ID_ANUNCIO
+from metricas import contar, instrumentar, medir
+import url_a_xml
+from url_a_xml import USER_AGENT, LimitadorPorHost, crear_sesion
+
+# --- Configuración del descubrimiento ---
+# Páginas de partida: resultados de búsqueda (se sigue su enlace rel="next") o sitemaps XML
+# (también índices de sitemaps y .xml.gz). Una URL por línea; las líneas con # se ignoran.
+ARCHIVO_SEMILLAS = "semillas_descubrimiento.txt"
+# Anuncios ya vistos (ID y firma), entre ejecuciones
+ARCHIVO_FRONTERA = "frontera_anuncios.bin"
+# URLs de los anuncios nuevos o cambiados pendientes de descargar. Cada ejecución añade los suyos
+# y descargar_cola (cli.py fetch --cola) quita solo los que se han descargado bien.
+ARCHIVO_COLA = "cola_anuncios.txt"
+MAX_PAGINAS_POR_SEMILLA = 500 # Tope de páginas de resultados que se recorren desde cada semilla
+# Los resultados suelen estar ordenados por fecha: tras tantas páginas seguidas sin anuncios nuevos
+# ni cambiados se deja de paginar esa semilla. Con None se recorren siempre todas.
+PAGINAS_SIN_NOVEDADES = 3
+ARCHIVO_METRICAS = "metricas_descubrimiento.json" # Con None no se guarda
+
+# Enlaces a la ficha de un anuncio, en href o data-href
+PATRON_ENLACE_ANUNCIO = re.compile(r'''(?:href|data-href)\s*=\s*["']([^"'<>]*/ocasion/\d+-es/?[^"'<>]*)["']''', re.IGNORECASE)
+PATRON_ETIQUETA_ENLACE = re.compile(r'<(?:a|link)\b[^>]*>', re.IGNORECASE)
+PATRON_ETIQUETA = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)\b[^>]*?(/?)>')
+ETIQUETAS_VACIAS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+PATRON_ATRIBUTO = re.compile(r'''([a-zA-Z-]+)\s*=\s*["']([^"']*)["']''')
+PATRON_ENTRADA_SITEMAP = re.compile(r'<(url|sitemap)>(.*?)</\1>', re.DOTALL | re.IGNORECASE)
+PATRON_LOC = re.compile(r'<loc>\s*(.*?)\s*</loc>', re.DOTALL | re.IGNORECASE)
+PATRON_LASTMOD = re.compile(r'<lastmod>\s*(.*?)\s*</lastmod>', re.DOTALL | re.IGNORECASE)
+
+_CABECERA_FRONTERA = b"FRONTERA-ANUNCIOS-1\n"
+
+
+class FronteraAnuncios:
+    """
+    Conjunto persistente de los anuncios ya vistos, con una firma de su contenido.
+
+    Los IDs de motorflash son numéricos, así que se guardan como dos arrays ordenados
+    (ID de 8 bytes y firma CRC32 de 4 bytes): unas decenas de miles de anuncios ocupan
+    menos de 1 MB y se cargan con una sola lectura, sin reconstruir ninguna estructura.
+    A diferencia de un filtro de Bloom, el conjunto es exacto (un falso positivo haría
+    perder un anuncio nuevo para siempre) y guarda la firma para detectar cambios.
+
+    Args:
+        ruta (str): Archivo donde se persiste la frontera.
+    """
+
+    def __init__(self, ruta=ARCHIVO_FRONTERA):
+        self.ruta = ruta
+        self._ids = array.array('Q')
+        self._firmas = array.array('I')
+        self._cambios = {} # ID -> firma, pendientes de incorporar a los arrays
+        self._lock = threading.Lock()
+        if os.path.exists(ruta):
+            with open(ruta, 'rb') as f:
+                if f.read(len(_CABECERA_FRONTERA)) != _CABECERA_FRONTERA:
+                    raise ValueError(f"'{ruta}' no es un archivo de frontera de anuncios.")
+                total = int.from_bytes(f.read(8), 'little')
+                self._ids.fromfile(f, total)
+                self._firmas.fromfile(f, total)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.guardar()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ids) + sum(1 for id_anuncio in self._cambios if self._posicion(id_anuncio) is None)
+
+    def __contains__(self, id_anuncio):
+        return self.firma(id_anuncio) is not None
+
+    def _posicion(self, id_anuncio):
+        posicion = bisect.bisect_left(self._ids, id_anuncio)
+        if posicion < len(self._ids) and self._ids[posicion] == id_anuncio:
+            return posicion
+        return None
+
+    def firma(self, id_anuncio):
+        """Firma guardada de un anuncio (None si no se ha visto nunca)."""
+        id_anuncio = int(id_anuncio)
+        with self._lock:
+            if id_anuncio in self._cambios:
+                return self._cambios[id_anuncio]
+            posicion = self._posicion(id_anuncio)
+            return None if posicion is None else self._firmas[posicion]
+
+    def registrar(self, id_anuncio, firma):
+        """
+        Anota un anuncio visto con la firma de su contenido.
+
+        Returns:
+            str: "nuevo", "cambiado" o None si ya se conocía con la misma firma.
+        """
+        anterior = self.firma(id_anuncio)
+        if anterior == firma:
+            return None
+        with self._lock:
+            self._cambios[int(id_anuncio)] = firma
+        return "nuevo" if anterior is None else "cambiado"
+
+    def guardar(self):
+        """Incorpora los cambios a los arrays ordenados y escribe el archivo de forma atómica."""
+        with self._lock:
+            if self._cambios:
+                fusion = dict(zip(self._ids, self._firmas))
+                fusion.update(self._cambios)
+                ids = sorted(fusion)
+                self._ids = array.array('Q', ids)
+                self._firmas = array.array('I', (fusion[id_anuncio] for id_anuncio in ids))
+                self._cambios = {}
+            elif os.path.exists(self.ruta):
+                return
+            ruta_temporal = f"{self.ruta}.tmp"
+            with open(ruta_temporal, 'wb') as f:
+                f.write(_CABECERA_FRONTERA)
+                f.write(len(self._ids).to_bytes(8, 'little'))
+                self._ids.tofile(f)
+                self._firmas.tofile(f)
+            os.replace(ruta_temporal, self.ruta)
+
+
+def firma_texto(texto):
+    """CRC32 del texto sin etiquetas HTML ni espacios repetidos."""
+    texto = re.sub(r'<[^>]+>', ' ', texto)
+    return zlib.crc32(" ".join(texto.split()).encode('utf-8'))
+
+
+def normalizar_url_anuncio(url):
+    """URL de la ficha sin consulta ni fragmento, para que el mismo anuncio no aparezca dos veces."""
+    partes = urlsplit(url)
+    return urlunsplit((partes.scheme, partes.netloc, partes.path, "", ""))
+
+
+def anuncios_en_html(html, url_base):
+    """
+    Enlaces a fichas de anuncios de una página de resultados.
+
+    La firma de cada anuncio se calcula con el HTML que va desde su primer enlace hasta
+    el del siguiente anuncio (su tarjeta: precio, kilómetros, título...), de modo que
+    cambia cuando cambian esos datos. La última tarjeta termina donde se cierra el mismo
+    elemento que cierra la anterior, para no incluir el pie de la página.
+
+    Returns:
+        list: (id_anuncio, url, firma) en orden de aparición, sin repetidos.
+    """
+    primeros = {} # id -> (posición del primer enlace, url)
+    for enlace in PATRON_ENLACE_ANUNCIO.finditer(html):
+        url = normalizar_url_anuncio(urljoin(url_base, enlace.group(1)))
+        id_anuncio = PATRON_ID_ANUNCIO.search(url).group(1)
+        primeros.setdefault(id_anuncio, (html.rfind("<", 0, enlace.start()), url))
+    ordenados = sorted(primeros.items(), key=lambda elemento: elemento[1][0])
+    anuncios = []
+    for posicion, (id_anuncio, (inicio, url)) in enumerate(ordenados):
+        if posicion + 1 < len(ordenados):
+            fin = ordenados[posicion + 1][1][0]
+        else:
+            fin = _fin_ultima_tarjeta(html, ordenados[posicion - 1][1][0] if posicion else None, inicio)
+        anuncios.append((id_anuncio, url, firma_texto(html[inicio:fin])))
+    return anuncios
+
+
+def _profundidades(html, inicio, fin=None):
+    """Recorre las etiquetas desde `inicio`: (posición tras cada etiqueta, profundidad relativa)."""
+    profundidad = 0
+    for etiqueta in PATRON_ETIQUETA.finditer(html, inicio, len(html) if fin is None else fin):
+        cierre, nombre, autocierre = etiqueta.groups()
+        if cierre:
+            profundidad -= 1
+        elif not autocierre and nombre.lower() not in ETIQUETAS_VACIAS:
+            profundidad += 1
+        yield etiqueta.end(), profundidad
+
+
+def _fin_ultima_tarjeta(html, inicio_anterior, inicio):
+    """Final de la última tarjeta: el cierre del elemento más externo que cierra la tarjeta anterior."""
+    if inicio_anterior is None:
+        return len(html)
+    minima = min((profundidad for _, profundidad in _profundidades(html, inicio_anterior, inicio)), default=0)
+    if minima >= 0:
+        return len(html)
+    return next((posicion for posicion, profundidad in _profundidades(html, inicio) if profundidad <= minima), len(html))
+
+
+def enlace_siguiente(html, url_base):
+    """URL de la siguiente página de resultados (<link rel="next"> o <a rel="next">), o None."""
+    for etiqueta in PATRON_ETIQUETA_ENLACE.finditer(html):
+        atributos = {nombre.lower(): valor for nombre, valor in PATRON_ATRIBUTO.findall(etiqueta.group(0))}
+        if "next" in atributos.get("rel", "").lower().split() and atributos.get("href"):
+            return urljoin(url_base, atributos["href"])
+    return None
+
+
+def leer_sitemap(xml):
+    """
+    Entradas de un sitemap o de un índice de sitemaps.
+
+    Returns:
+        tuple: (anuncios, sitemaps): [(id_anuncio, url, firma)] de las URLs de fichas
+            (la firma es la de <lastmod>, o 0 si no lo tiene) y URLs de sitemaps hijos.
+    """
+    anuncios, sitemaps = [], []
+    for entrada in PATRON_ENTRADA_SITEMAP.finditer(xml):
+        loc = PATRON_LOC.search(entrada.group(2))
+        if not loc:
+            continue
+        url = loc.group(1).replace("&amp;", "&")
+        if entrada.group(1).lower() == "sitemap":
+            sitemaps.append(url)
+            continue
+        id_anuncio = PATRON_ID_ANUNCIO.search(url)
+        if id_anuncio:
+            lastmod = PATRON_LASTMOD.search(entrada.group(2))
+            anuncios.append((id_anuncio.group(1), normalizar_url_anuncio(url),
+                             zlib.crc32(lastmod.group(1).encode('utf-8')) if lastmod else 0))
+    return anuncios, sitemaps
+
+
+def es_sitemap(texto):
+    return bool(re.search(r'<(urlset|sitemapindex)\b', texto[:2048]))
+
+
+def descargar_texto(url, sesion, limitador):
+    """Descarga una página o un sitemap (descomprimiendo los .gz) y la devuelve como texto."""
+    limitador.esperar(url)
+    with medir("peticion_descubrimiento"):
+        respuesta = sesion.get(url, headers={'User-Agent': USER_AGENT}, timeout=15)
+    contar("respuestas_descubrimiento", codigo=respuesta.status_code)
+    respuesta.raise_for_status()
+    contenido = respuesta.content
+    if contenido[:2] == b"\x1f\x8b":
+        contenido = gzip.decompress(contenido)
+    return contenido.decode(respuesta.encoding or 'utf-8', errors='replace')
+
+
+def descubrir(semillas, frontera, sesion=None, limitador=None, max_paginas=MAX_PAGINAS_POR_SEMILLA,
+              paginas_sin_novedades=PAGINAS_SIN_NOVEDADES):
+    """
+    Recorre las semillas y devuelve los anuncios nuevos o cambiados respecto a la frontera.
+
+    Las páginas de resultados se siguen por su enlace rel="next" y los índices de
+    sitemaps por sus sitemaps hijos. Cada anuncio se anota en la frontera al encontrarlo,
+    así que aparece en una sola ejecución (y una sola vez por ejecución).
+
+    Args:
+        semillas (list): URLs de páginas de resultados o sitemaps.
+        frontera (FronteraAnuncios): Anuncios ya vistos.
+        sesion (requests.Session, opcional): Sesión HTTP (se crea una si no se indica).
+        limitador (LimitadorPorHost, opcional): Limitador de peticiones por host (por defecto,
+            el ritmo configurado en url_a_xml.py).
+        max_paginas (int): Páginas máximas que se recorren desde cada semilla.
+        paginas_sin_novedades (int): Páginas seguidas sin novedades tras las que se deja
+            de paginar una semilla (None para no parar).
+
+    Returns:
+        list: URLs de los anuncios nuevos o cambiados, en orden de descubrimiento.
+    """
+    sesion = sesion or crear_sesion()
+    limitador = limitador or LimitadorPorHost()
+    cola = []
+    vistos = set() # IDs de esta ejecución: un anuncio puede salir en varias páginas o semillas
+    for semilla in semillas:
+        pendientes = [semilla]
+        recorridas = set() # Evita ciclos entre páginas que se enlazan entre sí
+        paginas = sin_novedades = 0
+        while pendientes and paginas < max_paginas:
+            url = pendientes.pop(0)
+            if url in recorridas:
+                continue
+            recorridas.add(url)
+            paginas += 1
+            try:
+                texto = descargar_texto(url, sesion, limitador)
+            except (requests.exceptions.RequestException, OSError) as e:
+                print(f"Error al descargar '{url}': {e}.")
+                contar("paginas_descubrimiento", resultado="error")
+                continue
+            if es_sitemap(texto):
+                anuncios, sitemaps = leer_sitemap(texto)
+                pendientes += sitemaps
+                tipo = "sitemap"
+            else:
+                anuncios = anuncios_en_html(texto, url)
+                siguiente = enlace_siguiente(texto, url)
+                if siguiente and anuncios:
+                    pendientes.append(siguiente)
+                tipo = "resultados"
+            contar("paginas_descubrimiento", resultado=tipo)
+            novedades = 0
+            for id_anuncio, url_anuncio, firma in anuncios:
+                if id_anuncio in vistos:
+                    continue
+                vistos.add(id_anuncio)
+                estado = frontera.registrar(id_anuncio, firma)
+                contar("anuncios_descubiertos", estado=estado or "conocido")
+                if estado is not None:
+                    cola.append(url_anuncio)
+                    novedades += 1
+            print(f"{url}: {len(anuncios)} anuncios, {novedades} nuevos o cambiados.")
+            sin_novedades = 0 if novedades else sin_novedades + 1
+            if tipo == "resultados" and paginas_sin_novedades and sin_novedades >= paginas_sin_novedades:
+                print(f"{paginas_sin_novedades} páginas seguidas sin novedades: se deja de paginar '{semilla}'.")
+                break
+    return cola
+
+
+def leer_cola(ruta=ARCHIVO_COLA):
+    """Devuelve las URLs pendientes de la cola (lista vacía si todavía no existe)."""
+    if not os.path.exists(ruta):
+        return []
+    return url_a_xml.leer_urls(ruta)
+
+
+def escribir_cola(urls, ruta=ARCHIVO_COLA):
+    """Escribe las URLs de la cola con el formato que lee url_a_xml.leer_urls."""
+    ruta_temporal = f"{ruta}.tmp"
+    with open(ruta_temporal, 'w', encoding='utf-8') as f:
+        f.write("# Anuncios nuevos o cambiados pendientes de descargar (descubrimiento.py)\n")
+        f.writelines(f"{url}\n" for url in urls)
+    os.replace(ruta_temporal, ruta)
+
+
+def anadir_a_cola(urls, ruta=ARCHIVO_COLA):
+    """
+    Añade a la cola las URLs que no estén ya pendientes, conservando las anteriores.
+
+    Returns:
+        list: Todas las URLs pendientes de la cola.
+    """
+    pendientes = leer_cola(ruta)
+    en_cola = set(pendientes)
+    pendientes.extend(url for url in dict.fromkeys(urls) if url not in en_cola)
+    escribir_cola(pendientes, ruta)
+    return pendientes
+
+
+def descargar_cola(ruta_cola=None):
+    """
+    Descarga al almacén los anuncios pendientes de la cola y quita los descargados.
+
+    Los que fallan se quedan en la cola para el siguiente intento: la frontera ya los
+    da por vistos, así que no se volverían a descubrir.
+
+    Returns:
+        list: Resultado (True/False) de cada descarga.
+    """
+    ruta_cola = ruta_cola or ARCHIVO_COLA
+    urls = leer_cola(ruta_cola)
+    if not urls:
+        print(f"No hay anuncios pendientes en '{ruta_cola}'.")
+        return []
+    resultados = url_a_xml.descargar_al_almacen(urls)
+    descargadas = {url for url, correcto in zip(urls, resultados) if correcto}
+    # Se relee la cola por si otra ejecución de descubrimiento ha añadido anuncios mientras tanto
+    pendientes = [url for url in leer_cola(ruta_cola) if url not in descargadas]
+    escribir_cola(pendientes, ruta_cola)
+    print(f"{len(pendientes)} anuncios siguen pendientes en '{ruta_cola}'.")
+    return resultados
+
+
+def descubrir_a_cola(semillas, ruta_frontera=None, ruta_cola=None):
+    """
+    Descubre los anuncios nuevos o cambiados, los añade a la cola y guarda la frontera.
+
+    La frontera se guarda después de escribir la cola: si la ejecución se interrumpe,
+    los anuncios se vuelven a descubrir en la siguiente. Los que ya estaban pendientes
+    en la cola se conservan hasta que descargar_cola los descarga. La configuración (rutas por
+    defecto, MAX_PAGINAS_POR_SEMILLA, PAGINAS_SIN_NOVEDADES) se lee al llamar, así que
+    respeta lo aplicado con configuracion.aplicar_configuracion.
+
+    Returns:
+        list: URLs pendientes en la cola (las de esta ejecución y las anteriores sin descargar).
+    """
+    ruta_frontera = ruta_frontera or ARCHIVO_FRONTERA
+    ruta_cola = ruta_cola or ARCHIVO_COLA
+    if not semillas:
+        print(f"No hay semillas: añade páginas de resultados o sitemaps a '{ARCHIVO_SEMILLAS}'.")
+        return leer_cola(ruta_cola)
+    with instrumentar(ARCHIVO_METRICAS):
+        frontera = FronteraAnuncios(ruta_frontera)
+        conocidos = len(frontera)
+        cola = descubrir(semillas, frontera, max_paginas=MAX_PAGINAS_POR_SEMILLA,
+                         paginas_sin_novedades=PAGINAS_SIN_NOVEDADES)
+        pendientes = anadir_a_cola(cola, ruta_cola)
+        frontera.guardar()
+    print("-" * 30)
+    print(f"{len(cola)} anuncios nuevos o cambiados; {len(pendientes)} pendientes en '{ruta_cola}' "
+          f"(frontera: {conocidos} -> {len(frontera)} anuncios en '{ruta_frontera}').")
+    if pendientes:
+        print("Para descargarlos: python cli.py fetch --cola")
+    return pendientes
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from configuracion import aplicar_configuracion
+    from url_a_xml import leer_urls
+
+    parser = argparse.ArgumentParser(description="Descubre anuncios nuevos o cambiados a partir de páginas de resultados o sitemaps.")
+    parser.add_argument("semillas", nargs="*", help=f"URLs de partida (por defecto las de {ARCHIVO_SEMILLAS}).")
+    args = parser.parse_args()
+
+    aplicar_configuracion(sys.modules[__name__], "descubrimiento")
+    descubrir_a_cola(args.semillas or leer_urls(ARCHIVO_SEMILLAS), ARCHIVO_FRONTERA, ARCHIVO_COLA)
@@ -0,0 +1,224 @@
+import json
+import re
+
+# Tipos de plano que el modelo puede asignar a una foto
+PLANOS = [
+    "frontal", "trasera", "lateral", "tres_cuartos_delantero", "tres_cuartos_trasero",
+    "interior", "salpicadero", "detalle", "motor", "maletero", "otro",
+]
+
+# Esquema de la respuesta estructurada (subconjunto OpenAPI que acepta response_schema de Gemini)
+ESQUEMA_ANALISIS = {
+    "type": "OBJECT",
+    "properties": {
+        "plano": {"type": "STRING", "format": "enum", "enum": PLANOS},
+        "descripcion": {"type": "STRING"},
+        "puntos_fuertes": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "areas_mejora": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "sugerencias": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "puntuacion": {"type": "NUMBER"},
+        "justificacion": {"type": "STRING"},
+    },
+    "required": ["plano", "descripcion", "puntos_fuertes", "areas_mejora", "sugerencias", "puntuacion", "justificacion"],
+}
+
+# Esquema de la respuesta a una petición con varias imágenes: una lista con un análisis por imagen
+ESQUEMA_ANALISIS_LOTE = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"imagen": {"type": "INTEGER"}, **ESQUEMA_ANALISIS["properties"]},
+        "required": ["imagen"] + ESQUEMA_ANALISIS["required"],
+    },
+}
+
+# Palabras clave para deducir el tipo de plano de un análisis en texto libre (se prueban en orden)
+_PALABRAS_PLANO = [
+    ("tres_cuartos_trasero", ("tres cuartos trasero", "3/4 trasero")),
+    ("tres_cuartos_delantero", ("tres cuartos", "3/4")),
+    ("salpicadero", ("salpicadero", "cuadro de instrumentos", "volante")),
+    ("maletero", ("maletero",)),
+    ("motor", ("motor",)),
+    ("interior", ("interior", "asientos", "habitáculo")),
+    ("frontal", ("frontal", "delantero")),
+    ("trasera", ("trasera", "trasero", "posterior")),
+    ("lateral", ("lateral", "perfil")),
+    ("detalle", ("detalle",)),
+]
+
+
+def _como_lista(valor):
+    if valor is None:
+        return []
+    if isinstance(valor, str):
+        return [valor.strip()] if valor.strip() else []
+    return [str(v).strip() for v in valor if str(v).strip()]
+
+
+def _puntuacion(valor):
+    try:
+        return max(0.0, min(10.0, float(valor))) # Asegurar rango 0-10
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def normalizar_analisis(datos):
+    """Completa y ajusta un análisis estructurado: listas, plano conocido y puntuación en 0-10."""
+    plano = str(datos.get("plano") or "otro").strip().lower()
+    return {
+        "plano": plano if plano in PLANOS else "otro",
+        "descripcion": str(datos.get("descripcion") or "").strip(),
+        "puntos_fuertes": _como_lista(datos.get("puntos_fuertes")),
+        "areas_mejora": _como_lista(datos.get("areas_mejora")),
+        "sugerencias": _como_lista(datos.get("sugerencias")),
+        "puntuacion": _puntuacion(datos.get("puntuacion")),
+        "justificacion": str(datos.get("justificacion") or "").strip(),
+    }
+
+
+def analisis_desde_json(texto):
+    """
+    Interpreta la respuesta estructurada del modelo.
+
+    Acepta el JSON envuelto en un bloque de código (```json ... ```), que algunos
+    modelos añaden aunque se les pida solo el objeto.
+
+    Returns:
+        dict: Análisis normalizado con los campos de ESQUEMA_ANALISIS.
+
+    Raises:
+        ValueError: Si la respuesta no es un objeto JSON.
+    """
+    texto = texto.strip()
+    bloque = re.match(r'^```(?:json)?\s*(.*?)\s*```$', texto, re.DOTALL)
+    if bloque:
+        texto = bloque.group(1)
+    try:
+        datos = json.loads(texto)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"La respuesta del modelo no es JSON válido: {e}") from None
+    if isinstance(datos, list) and len(datos) == 1:
+        datos = datos[0]
+    if not isinstance(datos, dict):
+        raise ValueError("La respuesta del modelo no es un objeto JSON.")
+    return normalizar_analisis(datos)
+
+
+def _es_numero(valor):
+    try:
+        float(valor)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def secciones_json_por_imagen(texto):
+    """
+    Separa la respuesta estructurada de una petición por lotes en análisis por imagen.
+
+    Solo se devuelven los objetos con número de imagen y puntuación numérica; las
+    imágenes que falten o estén mal formadas se quedan fuera (para analizarlas aparte).
+
+    Returns:
+        dict: Número de imagen -> objeto JSON (como texto) de su análisis.
+
+    Raises:
+        ValueError: Si la respuesta no es JSON.
+    """
+    texto = texto.strip()
+    bloque = re.match(r'^```(?:json)?\s*(.*?)\s*```$', texto, re.DOTALL)
+    if bloque:
+        texto = bloque.group(1)
+    try:
+        datos = json.loads(texto)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"La respuesta del modelo no es JSON válido: {e}") from None
+    if isinstance(datos, dict):
+        datos = [datos]
+    secciones = {}
+    for objeto in datos if isinstance(datos, list) else []:
+        if not isinstance(objeto, dict) or not _es_numero(objeto.get("puntuacion")):
+            continue
+        try:
+            numero = int(objeto.get("imagen"))
+        except (TypeError, ValueError):
+            continue
+        secciones.setdefault(numero, json.dumps(objeto, ensure_ascii=False))
+    return secciones
+
+
+def secciones_texto_por_imagen(texto):
+    """
+    Separa la respuesta en texto de una petición por lotes en las secciones "Imagen N:".
+
+    Solo se devuelven las secciones que incluyen la línea de puntuación.
+
+    Returns:
+        dict: Número de imagen -> texto de su análisis (empezando por "Imagen N:").
+    """
+    partes = re.split(r'^\s*Imagen (\d+):', texto, flags=re.MULTILINE)
+    secciones = {}
+    for numero, cuerpo in zip(partes[1::2], partes[2::2]):
+        if re.search(r'Puntuación Individual \(0-10\):\s*\d', cuerpo, re.IGNORECASE):
+            secciones.setdefault(int(numero), f"Imagen {numero}:{cuerpo.rstrip()}")
+    return secciones
+
+
+def _seccion(texto, inicio, fin):
+    patron = re.escape(inicio) + r'\s*(.*?)' + (r'(?=^\s*' + re.escape(fin) + ')' if fin else r'$')
+    encontrado = re.search(patron, texto, re.DOTALL | re.MULTILINE | re.IGNORECASE)
+    return encontrado.group(1).strip() if encontrado else ""
+
+
+def _elementos(seccion):
+    """Separa una sección en elementos ("1. ...", "- ...") o la devuelve como un único elemento."""
+    seccion = re.sub(r'^\s*\.\.\..*$', '', seccion, flags=re.MULTILINE) # Líneas "... (Hasta 3-5 puntos)" de la plantilla
+    return [e.strip() for e in re.split(r'(?:^|\s)\d+\.\s+|^\s*[-*•]\s+', seccion, flags=re.MULTILINE) if e.strip()]
+
+
+def deducir_plano(descripcion):
+    """Deduce el tipo de plano a partir de la descripción en texto libre ("otro" si no se reconoce)."""
+    descripcion = descripcion.lower()
+    for plano, palabras in _PALABRAS_PLANO:
+        if any(palabra in descripcion for palabra in palabras):
+            return plano
+    return "otro"
+
+
+def analisis_desde_texto(texto):
+    """
+    Convierte un análisis en el formato de texto original ("Imagen N: ...") en un
+    análisis estructurado, para guardar también los resultados del modo texto y los
+    de ejecuciones anteriores.
+    """
+    descripcion = _seccion(texto, "Descripción del Plano y Composición:", "Evaluación Cualitativa")
+    fuertes = _seccion(texto, "Puntos Fuertes:", "Áreas de Mejora")
+    puntuacion = re.search(r'Puntuación Individual \(0-10\):\s*(\d+(\.\d+)?)', texto, re.IGNORECASE)
+    return normalizar_analisis({
+        "plano": deducir_plano(descripcion),
+        "descripcion": descripcion,
+        # formatear_analisis separa los puntos fuertes con "; " en una sola línea
+        "puntos_fuertes": [] if fuertes.lower().startswith("ninguno") else
+                          [p for e in _elementos(fuertes) for p in e.split("; ")],
+        "areas_mejora": _elementos(_seccion(texto, "Áreas de Mejora:", "Sugerencias Específicas")),
+        "sugerencias": _elementos(_seccion(texto, "Sugerencias Específicas:", "Puntuación Individual")),
+        "puntuacion": puntuacion.group(1) if puntuacion else 0,
+        "justificacion": _seccion(texto, "Justificación:", None),
+    })
+
+
+def formatear_analisis(numero_imagen, datos):
+    """Escribe un análisis estructurado con el formato de texto de los informes."""
+    lineas = [
+        f"Imagen {numero_imagen}:",
+        f"Descripción del Plano y Composición: {datos['descripcion']}",
+        "Evaluación Cualitativa:",
+        f"Puntos Fuertes: {'; '.join(datos['puntos_fuertes']) or 'Ninguno significativo.'}",
+        "Áreas de Mejora:",
+    ]
+    lineas += [f"{n}. {area}" for n, area in enumerate(datos['areas_mejora'], start=1)]
+    lineas.append("Sugerencias Específicas:")
+    lineas += [f"{n}. {sugerencia}" for n, sugerencia in enumerate(datos['sugerencias'], start=1)]
+    lineas.append(f"Puntuación Individual (0-10): {datos['puntuacion']:g}")
+    lineas.append(f"Justificación: {datos['justificacion']}")
+    return "\n".join(lineas)
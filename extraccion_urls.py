@@ -0,0 +1,249 @@
+import codecs
+import importlib.util
+import io
+import json
+import re
+import time
+from html.parser import HTMLParser
+
+# Motor por defecto para extraer las URLs de las imágenes
+MOTOR_POR_DEFECTO = "streaming"
+TAMANO_BLOQUE = 64 * 1024 # Bytes que se leen del flujo en cada paso
+SOLAPE_METADATOS = 4096 # Caracteres que se conservan entre bloques para no cortar un campo
+
+# Campos del JSON-LD (schema.org Car/Offer) de la página del anuncio
+PATRONES_METADATOS = {
+    "concesionario": re.compile(r'"seller"\s*:\s*\{[^{}]*?"name"\s*:\s*"((?:[^"\\]|\\.){1,200})"'),
+    "marca": re.compile(r'"brand"\s*:\s*(?:\{[^{}]*?"name"\s*:\s*)?"((?:[^"\\]|\\.){1,100})"'),
+    "modelo": re.compile(r'"model"\s*:\s*"((?:[^"\\]|\\.){1,100})"'),
+}
+
+
+def _es_url_de_imagen(clases, data_src):
+    """Mismo criterio que la versión original: img con clase 'lazyload' y data-src absoluto."""
+    return bool(clases) and 'lazyload' in clases.split() and bool(data_src) and data_src.startswith('http')
+
+
+def _anadir_unica(urls, vistas, url):
+    if url not in vistas:
+        vistas.add(url)
+        urls.append(url)
+
+
+def _como_texto(origen):
+    """Devuelve el documento completo como str (para los motores que no trabajan en streaming)."""
+    if hasattr(origen, 'read'):
+        origen = origen.read()
+    if isinstance(origen, (bytes, bytearray)):
+        return origen.decode('utf-8', errors='replace')
+    return origen
+
+
+def extraer_urls_bs4(origen):
+    """Versión original: construye el árbol completo de BeautifulSoup."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(_como_texto(origen), 'html.parser')
+    urls, vistas = [], set()
+    for img_tag in soup.find_all('img', class_='lazyload'):
+        data_src = img_tag.get('data-src')
+        if data_src and data_src.startswith('http'):
+            _anadir_unica(urls, vistas, data_src)
+    return urls
+
+
+def extraer_urls_strainer(origen):
+    """BeautifulSoup limitado con un SoupStrainer: solo construye los nodos <img>."""
+    from bs4 import BeautifulSoup, SoupStrainer
+    # El filtro por clase se hace después: el strainer no siempre separa los atributos
+    # multivalor ("x lazyload") igual que find_all
+    soup = BeautifulSoup(_como_texto(origen), 'html.parser', parse_only=SoupStrainer('img'))
+    urls, vistas = [], set()
+    for img_tag in soup.find_all('img', class_='lazyload'):
+        data_src = img_tag.get('data-src')
+        if data_src and data_src.startswith('http'):
+            _anadir_unica(urls, vistas, data_src)
+    return urls
+
+
+class _ParserImagenes(HTMLParser):
+    """Tokenizador de la librería estándar que solo atiende a las etiquetas <img>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.urls = []
+        self._vistas = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'img':
+            return
+        atributos = dict(attrs) # Si un atributo se repite, gana el último (igual que BeautifulSoup)
+        data_src = atributos.get('data-src')
+        if _es_url_de_imagen(atributos.get('class'), data_src):
+            _anadir_unica(self.urls, self._vistas, data_src)
+
+    handle_startendtag = handle_starttag
+
+
+def extraer_urls_streaming(origen):
+    """
+    Tokenizador en streaming sin árbol: procesa el documento por bloques.
+
+    Con un flujo de bytes (por ejemplo `AlmacenPaginas.abrir`) nunca se tiene el
+    documento completo decodificado en memoria.
+    """
+    parser = _ParserImagenes()
+    if hasattr(origen, 'read'):
+        decodificador = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for bloque in iter(lambda: origen.read(TAMANO_BLOQUE), b''):
+            if isinstance(bloque, str):
+                parser.feed(bloque)
+            else:
+                parser.feed(decodificador.decode(bloque))
+        parser.feed(decodificador.decode(b'', final=True))
+    else:
+        parser.feed(_como_texto(origen))
+    parser.close()
+    return parser.urls
+
+
+class _ObjetivoLxml:
+    """Objetivo para el parser de lxml en modo eventos (sin construir el árbol)."""
+
+    def __init__(self):
+        self.urls = []
+        self._vistas = set()
+
+    def start(self, tag, attrib):
+        if tag == 'img':
+            data_src = attrib.get('data-src')
+            if _es_url_de_imagen(attrib.get('class'), data_src):
+                _anadir_unica(self.urls, self._vistas, data_src)
+
+    def end(self, tag):
+        pass
+
+    def data(self, datos):
+        pass
+
+    def close(self):
+        return self.urls
+
+
+def extraer_urls_lxml(origen):
+    """Motor opcional basado en lxml (requiere `pip install lxml`), también en streaming."""
+    from lxml import etree
+    parser = etree.HTMLParser(target=_ObjetivoLxml(), encoding='utf-8')
+    if not hasattr(origen, 'read'):
+        origen = io.BytesIO(origen.encode('utf-8') if isinstance(origen, str) else origen)
+    for bloque in iter(lambda: origen.read(TAMANO_BLOQUE), b''):
+        parser.feed(bloque)
+    return parser.close()
+
+
+def _decodificar_cadena_json(valor):
+    try:
+        return json.loads(f'"{valor}"').strip()
+    except ValueError:
+        return valor.strip()
+
+
+def extraer_metadatos(origen):
+    """
+    Extrae el concesionario, la marca y el modelo del coche del JSON-LD de la página.
+
+    Lee el documento por bloques y termina en cuanto encuentra los tres campos.
+
+    Returns:
+        dict: {"concesionario", "marca", "modelo"}; None en los que no aparecen.
+    """
+    metadatos = dict.fromkeys(PATRONES_METADATOS)
+    if not hasattr(origen, 'read'):
+        origen = io.BytesIO(origen.encode('utf-8') if isinstance(origen, str) else origen)
+    decodificador = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    texto = ""
+    for bloque in iter(lambda: origen.read(TAMANO_BLOQUE), b''):
+        texto = texto[-SOLAPE_METADATOS:] + (bloque if isinstance(bloque, str) else decodificador.decode(bloque))
+        for campo, patron in PATRONES_METADATOS.items():
+            if metadatos[campo] is None:
+                encontrado = patron.search(texto)
+                if encontrado:
+                    metadatos[campo] = _decodificar_cadena_json(encontrado.group(1))
+        if all(metadatos.values()):
+            break
+    return metadatos
+
+
+MOTORES = {
+    "bs4": extraer_urls_bs4,
+    "strainer": extraer_urls_strainer,
+    "streaming": extraer_urls_streaming,
+    "lxml": extraer_urls_lxml,
+}
+
+
+# Dependencia opcional que necesita cada motor
+DEPENDENCIAS = {"bs4": "bs4", "strainer": "bs4", "lxml": "lxml"}
+
+
+def motor_disponible(motor):
+    """Indica si la dependencia que necesita `motor` está instalada."""
+    dependencia = DEPENDENCIAS.get(motor)
+    return dependencia is None or importlib.util.find_spec(dependencia) is not None
+
+
+def extraer_urls(origen, motor=MOTOR_POR_DEFECTO):
+    """
+    Extrae las URLs únicas de las imágenes de un anuncio, en orden de aparición.
+
+    Args:
+        origen (str | bytes | flujo binario): Documento HTML o flujo del que leerlo.
+        motor (str): Uno de MOTORES ("bs4", "strainer", "streaming" o "lxml").
+    """
+    return MOTORES[motor](origen)
+
+
+def comparar_motores(almacen, motores=None, repeticiones=3):
+    """
+    Micro-benchmark de los motores sobre las páginas de un almacén.
+
+    Comprueba que todos devuelven el mismo conjunto de URLs que la versión original
+    (bs4) y mide el tiempo total de cada uno (el mejor de `repeticiones`).
+
+    Returns:
+        dict: motor -> {"segundos": float, "diferencias": int}
+    """
+    motores = motores or list(MOTORES)
+    paginas = [almacen.leer(id_anuncio) for id_anuncio, _ in almacen]
+    referencia = [set(extraer_urls_bs4(pagina)) for pagina in paginas]
+    resultados = {}
+    for motor in motores:
+        if not motor_disponible(motor):
+            print(f"Motor '{motor}' no disponible (falta la dependencia). Se omite.")
+            continue
+        mejor = None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            obtenidas = [MOTORES[motor](io.BytesIO(pagina)) for pagina in paginas]
+            duracion = time.perf_counter() - inicio
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        diferencias = sum(1 for a, b in zip(referencia, obtenidas) if set(b) != a)
+        resultados[motor] = {"segundos": mejor, "diferencias": diferencias}
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+    from almacen_paginas import DIRECTORIO_ALMACEN, AlmacenPaginas
+
+    parser = argparse.ArgumentParser(description="Compara los motores de extracción de URLs de imágenes.")
+    parser.add_argument("--directorio", default=DIRECTORIO_ALMACEN, help="Directorio del almacén de páginas.")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    almacen = AlmacenPaginas(args.directorio)
+    print(f"Comparando motores sobre {len(almacen)} páginas...")
+    resultados = comparar_motores(almacen, repeticiones=args.repeticiones)
+    base = resultados.get("bs4", {}).get("segundos")
+    for motor, datos in resultados.items():
+        aceleracion = f" (x{base / datos['segundos']:.1f} frente a bs4)" if base and datos['segundos'] else ""
+        print(f"{motor:10s} {datos['segundos'] * 1000:9.1f} ms{aceleracion}  páginas con URLs distintas: {datos['diferencias']}")
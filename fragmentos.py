@@ -0,0 +1,77 @@
+import hashlib
+import os
+import re
+
+PATRON_FRAGMENTO = re.compile(r'^\s*(\d+)\s*/\s*(\d+)\s*$')
+
+
+def fragmento_de(id_anuncio, total):
+    """
+    Fragmento (de 1 a `total`) al que pertenece un anuncio.
+
+    Se usa un hash estable del ID (no hash(), que cambia entre procesos), así que el
+    reparto es el mismo en todas las máquinas y en todas las ejecuciones.
+    """
+    resumen = hashlib.sha256(str(id_anuncio).encode('utf-8')).digest()
+    return int.from_bytes(resumen[:8], 'big') % total + 1
+
+
+class Fragmento:
+    """
+    Parte K de N del conjunto de anuncios, repartidos por el hash de su ID.
+
+    Varias máquinas (o procesos) con el mismo almacén de páginas se reparten el trabajo
+    sin coordinarse: cada una procesa solo los anuncios de su fragmento y escribe sus
+    resultados en archivos propios (ver `ruta`), que después se combinan.
+
+    Args:
+        indice (int): Número del fragmento, de 1 a `total`.
+        total (int): Número de fragmentos.
+    """
+
+    def __init__(self, indice, total):
+        if total < 1 or not 1 <= indice <= total:
+            raise ValueError(f"Fragmento no válido: {indice}/{total} (debe ser K/N con 1 <= K <= N).")
+        self.indice = indice
+        self.total = total
+
+    @classmethod
+    def desde_texto(cls, texto):
+        """Crea un fragmento a partir de "K/N" (por ejemplo, "2/4")."""
+        coincidencia = PATRON_FRAGMENTO.match(texto)
+        if not coincidencia:
+            raise ValueError(f"Fragmento no válido: '{texto}' (formato K/N, por ejemplo 2/4).")
+        return cls(int(coincidencia.group(1)), int(coincidencia.group(2)))
+
+    def __str__(self):
+        return f"{self.indice}/{self.total}"
+
+    def __repr__(self):
+        return f"Fragmento({self.indice}, {self.total})"
+
+    def contiene(self, id_anuncio):
+        """Indica si el anuncio pertenece a este fragmento."""
+        return self.total == 1 or fragmento_de(id_anuncio, self.total) == self.indice
+
+    def filtrar(self, elementos, clave=lambda elemento: elemento):
+        """Devuelve (de forma perezosa) los elementos cuyo ID de anuncio, `clave(elemento)`, es de este fragmento."""
+        return (elemento for elemento in elementos if self.contiene(clave(elemento)))
+
+    def subdividir(self, partes):
+        """
+        Divide el fragmento en `partes` fragmentos más pequeños, por ejemplo uno por proceso.
+
+        El fragmento K de N está formado exactamente por los fragmentos K, K + N, K + 2N...
+        de N * partes, porque el resto del hash módulo N * partes determina el resto módulo N.
+        """
+        return [Fragmento(self.indice + self.total * parte, self.total * partes) for parte in range(partes)]
+
+    def ruta(self, ruta):
+        """
+        Ruta propia del fragmento para un archivo de resultados: "resultados.sqlite" ->
+        "resultados.fragmento-2-de-4.sqlite". Sin fragmentar (1/1) se devuelve sin cambios.
+        """
+        if self.total == 1:
+            return ruta
+        base, extension = os.path.splitext(ruta)
+        return f"{base}.fragmento-{self.indice}-de-{self.total}{extension}"
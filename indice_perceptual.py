@@ -0,0 +1,218 @@
+import io
+import itertools
+import sqlite3
+import threading
+
+import numpy as np
+from PIL import Image
+
+# Base de datos por defecto del índice de hashes perceptuales
+ARCHIVO_INDICE_PERCEPTUAL = "indice_perceptual.sqlite"
+ALGORITMO = "phash" # "phash" (DCT, más robusto a recortes y compresión) o "dhash" (gradientes, más barato)
+DISTANCIA_MAXIMA = 8 # Bits distintos (de 64) para considerar dos fotos casi idénticas
+
+_contar_bits = getattr(int, "bit_count", None) or (lambda x: bin(x).count("1"))
+
+
+def distancia_hamming(a, b):
+    """Número de bits distintos entre dos hashes."""
+    return _contar_bits(a ^ b)
+
+
+def _abrir_gris(origen, tamano):
+    img = Image.open(io.BytesIO(origen) if isinstance(origen, (bytes, bytearray, memoryview)) else origen)
+    img.draft("L", tamano) # Los JPEG se decodifican directamente a escala reducida
+    return img.convert("L").resize(tamano, Image.LANCZOS)
+
+
+def _bits_a_entero(bits):
+    return int("".join("1" if b else "0" for b in bits.flatten()), 2)
+
+
+def dhash(origen):
+    """Hash de diferencias de 64 bits: compara cada píxel con su vecino de la derecha en una imagen de 9x8."""
+    pixeles = np.asarray(_abrir_gris(origen, (9, 8)), dtype=np.int16)
+    return _bits_a_entero(pixeles[:, 1:] > pixeles[:, :-1])
+
+
+def _matriz_dct(n):
+    k = np.arange(n)
+    matriz = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    matriz[0] /= np.sqrt(2)
+    return matriz
+
+
+_DCT_32 = _matriz_dct(32)
+
+
+def phash(origen):
+    """Hash perceptual de 64 bits: signo respecto a la mediana de las 8x8 frecuencias más bajas de la DCT."""
+    pixeles = np.asarray(_abrir_gris(origen, (32, 32)), dtype=np.float64)
+    frecuencias = (_DCT_32 @ pixeles @ _DCT_32.T)[:8, :8]
+    return _bits_a_entero(frecuencias > np.median(frecuencias))
+
+
+ALGORITMOS = {"phash": phash, "dhash": dhash}
+
+
+def hash_perceptual(origen, algoritmo=ALGORITMO):
+    """
+    Calcula el hash perceptual de una imagen.
+
+    Args:
+        origen (bytes | str): Bytes de la imagen o ruta del archivo en disco.
+        algoritmo (str): "phash" o "dhash".
+
+    Returns:
+        int: Hash de 64 bits.
+    """
+    return ALGORITMOS[algoritmo](origen)
+
+
+class IndiceHamming:
+    """
+    Índice en memoria para buscar hashes de 64 bits cercanos en distancia de Hamming.
+
+    Usa hashing multi-índice: el hash se parte en BLOQUES trozos de 16 bits y cada trozo
+    tiene su propia tabla. Si dos hashes difieren en r bits o menos, al menos uno de
+    sus trozos difiere en r // BLOQUES bits o menos (principio del palomar), así que
+    basta con consultar en cada tabla los trozos a esa distancia y comprobar solo esos
+    candidatos. El coste de una búsqueda apenas crece con el número de entradas.
+    """
+
+    BLOQUES = 4
+    BITS_BLOQUE = 16
+
+    def __init__(self):
+        self.hashes = []
+        self.valores = []
+        self._tablas = [{} for _ in range(self.BLOQUES)]
+        self._mascaras = {}
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def _trozos(self, hash_):
+        tope = (1 << self.BITS_BLOQUE) - 1
+        return [(hash_ >> (self.BITS_BLOQUE * i)) & tope for i in range(self.BLOQUES)]
+
+    def _mascaras_radio(self, radio):
+        """Todas las máscaras de BITS_BLOQUE bits con `radio` bits a 1 o menos."""
+        if radio not in self._mascaras:
+            mascaras = []
+            for bits in range(radio + 1):
+                for posiciones in itertools.combinations(range(self.BITS_BLOQUE), bits):
+                    mascaras.append(sum(1 << p for p in posiciones))
+            self._mascaras[radio] = mascaras
+        return self._mascaras[radio]
+
+    def anadir(self, hash_, valor):
+        """Inserta un hash con su valor asociado y devuelve su posición."""
+        posicion = len(self.hashes)
+        self.hashes.append(hash_)
+        self.valores.append(valor)
+        for tabla, trozo in zip(self._tablas, self._trozos(hash_)):
+            tabla.setdefault(trozo, []).append(posicion)
+        return posicion
+
+    def buscar(self, hash_, radio):
+        """Devuelve [(distancia, valor)] de las entradas a distancia <= radio, de la más cercana a la más lejana."""
+        mascaras = self._mascaras_radio(radio // self.BLOQUES)
+        candidatos = set()
+        for tabla, trozo in zip(self._tablas, self._trozos(hash_)):
+            for mascara in mascaras:
+                posiciones = tabla.get(trozo ^ mascara)
+                if posiciones:
+                    candidatos.update(posiciones)
+        encontrados = []
+        for posicion in candidatos:
+            distancia = distancia_hamming(hash_, self.hashes[posicion])
+            if distancia <= radio:
+                encontrados.append((distancia, self.valores[posicion]))
+        encontrados.sort(key=lambda e: e[0])
+        return encontrados
+
+
+def _con_signo(hash_):
+    """SQLite guarda enteros de 64 bits con signo."""
+    return hash_ - (1 << 64) if hash_ >= (1 << 63) else hash_
+
+
+class IndicePerceptual:
+    """
+    Índice persistente (SQLite + IndiceHamming en memoria) de hashes perceptuales de imágenes.
+
+    Cada entrada asocia el hash perceptual de una foto ya analizada con el hash de su
+    contenido (el de la caché de análisis), de modo que una foto casi idéntica (mismo
+    plano con otro recorte o compresión) puede reutilizar ese análisis. Las entradas se
+    guardan en SQLite según se añaden y se cargan en memoria al abrir el índice. Es
+    seguro para usarlo desde varios hilos.
+
+    Args:
+        ruta (str): Archivo SQLite del índice.
+        algoritmo (str): Algoritmo de hash; un índice solo admite el algoritmo con el que se creó.
+    """
+
+    def __init__(self, ruta=ARCHIVO_INDICE_PERCEPTUAL, algoritmo=ALGORITMO):
+        self.ruta = ruta
+        self.algoritmo = algoritmo
+        self.reutilizados = 0
+        self._indice = IndiceHamming()
+        self._vistos = set() # (hash perceptual, hash de contenido) ya indexados
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript(
+            "CREATE TABLE IF NOT EXISTS configuracion (clave TEXT PRIMARY KEY, valor TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS fotos ("
+            " hash INTEGER NOT NULL,"
+            " hash_contenido TEXT NOT NULL,"
+            " PRIMARY KEY (hash, hash_contenido));"
+        )
+        # OR IGNORE: varios procesos (uno por fragmento) pueden crear el índice a la vez
+        self._conexion.execute("INSERT OR IGNORE INTO configuracion VALUES ('algoritmo', ?)", (algoritmo,))
+        fila = self._conexion.execute("SELECT valor FROM configuracion WHERE clave = 'algoritmo'").fetchone()
+        if fila[0] != algoritmo:
+            self._conexion.close()
+            raise ValueError(f"El índice '{ruta}' usa el algoritmo '{fila[0]}', no '{algoritmo}'.")
+        self._conexion.commit()
+        for hash_, hash_contenido in self._conexion.execute("SELECT hash, hash_contenido FROM fotos ORDER BY rowid"):
+            hash_ &= (1 << 64) - 1
+            self._indice.anadir(hash_, hash_contenido)
+            self._vistos.add((hash_, hash_contenido))
+
+    def __len__(self):
+        return len(self._indice)
+
+    def calcular(self, origen):
+        """Hash perceptual de una imagen con el algoritmo del índice."""
+        return hash_perceptual(origen, self.algoritmo)
+
+    def buscar(self, hash_, distancia_maxima=DISTANCIA_MAXIMA):
+        """Devuelve [(distancia, hash de contenido)] de las fotos casi idénticas, de la más cercana a la más lejana."""
+        with self._lock:
+            return self._indice.buscar(hash_, distancia_maxima)
+
+    def anadir(self, hash_, hash_contenido):
+        """Indexa una foto analizada (no hace nada si ya estaba)."""
+        with self._lock:
+            if (hash_, hash_contenido) in self._vistos:
+                return
+            self._vistos.add((hash_, hash_contenido))
+            self._indice.anadir(hash_, hash_contenido)
+            self._conexion.execute(
+                "INSERT OR IGNORE INTO fotos (hash, hash_contenido) VALUES (?, ?)", (_con_signo(hash_), hash_contenido)
+            )
+            self._conexion.commit()
+
+    def registrar_reutilizacion(self):
+        with self._lock:
+            self.reutilizados += 1
+
+    def resumen(self):
+        return (f"Índice perceptual ({self.algoritmo}): {len(self)} fotos indexadas, "
+                f"{self.reutilizados} análisis reutilizados de fotos casi idénticas.")
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
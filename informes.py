@@ -0,0 +1,139 @@
+import logging
+
+# Prefijo por defecto de los archivos de informe (uno por anuncio: <prefijo><id>.txt)
+REPORT_BASE_NAME = "analisis_fotos_coche_flash_"
+
+
+def results_from_store(store, listing_id):
+    """Resultados de las imágenes de un anuncio leídos del almacén de resultados, en el orden original."""
+    return [
+        {"original_idx": row["indice"], "url": row["url"], "analysis": row["texto"],
+         "general_rating": row["puntuacion"], "downloaded": row["descargada"], "error": row["error"]}
+        for row in store.imagenes_anuncio(listing_id)
+    ]
+
+
+def write_report(listing_id, page_entry, results, output_file_name):
+    """
+    Escribe el informe .txt de un anuncio a partir de los resultados de sus imágenes.
+
+    Args:
+        listing_id (str): ID del anuncio.
+        page_entry (dict): Entrada del almacén de páginas (al menos "url").
+        results (list): Resultados de las imágenes ("original_idx", "url", "analysis",
+            "general_rating", "downloaded"), en cualquier orden.
+        output_file_name (str): Archivo de salida.
+    """
+    page_name = f"anuncio {listing_id} ({page_entry['url']})"
+    output_lines = []
+    file_individual_ratings = [] # Para guardar ratings generales numéricos de las fotos de ESTE anuncio
+
+    output_lines.append(f"\n--- Análisis de Fotos para: {page_name} ---")
+
+    if not results:
+        logging.info(f"No se encontraron URLs de imágenes únicas en '{page_name}'.")
+        output_lines.append("   No se encontraron imágenes en este archivo o todas eran duplicadas.")
+    else:
+        downloaded_and_analyzed_images = []
+        for item in sorted(results, key=lambda x: x["original_idx"]):
+            if not item["downloaded"]:
+                output_lines.append(f"   Error: No se pudo descargar la imagen {item['original_idx'] + 1} (URL: {item['url']}). Análisis omitido.")
+            file_individual_ratings.append(item["general_rating"]) # Guardar el rating numérico para el promedio global del anuncio
+            downloaded_and_analyzed_images.append(item)
+
+        # Ordenar por el índice original para mantener el orden de las fotos
+        downloaded_and_analyzed_images.sort(key=lambda x: x["original_idx"])
+
+        for item in downloaded_and_analyzed_images:
+            output_lines.append(item["analysis"])
+            output_lines.append("\n") # Separador entre análisis de imágenes
+
+    # --- Parte 2: Análisis Global del Conjunto de Fotografías (Basado en el promedio y la información general) ---
+    output_lines.append("\n--- Parte 2: Análisis Global del Conjunto de Fotografías ---")
+    
+    # Aquí puedes agregar el análisis global.
+    # Por simplicidad, haré un resumen general basado en el promedio.
+    # Para un análisis tan detallado como el de tu ejemplo, necesitarías un prompt a Gemini
+    # que analice TODAS las imágenes en conjunto, lo cual implicaría un costo mayor
+    # y una gestión más compleja de la entrada (pasar todas las imágenes + prompt).
+    # Lo más práctico es resumir los resultados individuales.
+
+    if file_individual_ratings:
+        overall_avg_rating = sum(file_individual_ratings) / len(file_individual_ratings)
+        output_lines.append(f"Promedio de Puntuación Individual de todas las fotos de '{page_name}': {overall_avg_rating:.2f}/10")
+        
+        output_lines.append("\nCobertura y Calidad de Planos Fotográficos:")
+        output_lines.append("Análisis: El conjunto ofrece una variedad de planos (exterior, interior, detalles), pero la calidad de ejecución es inconsistente.")
+        output_lines.append(f"Valoración: {'Sobresaliente' if overall_avg_rating >= 8 else ('Buena' if overall_avg_rating >= 6 else ('Aceptable' if overall_avg_rating >= 4 else 'Deficiente'))}.")
+        output_lines.append("Justificación: Basado en las puntuaciones individuales, se observa una falta general de control de iluminación y composición en muchas de las tomas para un estándar publicitario.")
+        output_lines.append("Sugerencia de Mejora: Priorizar entornos controlados y técnicas de iluminación profesional. Considerar tomas de acción o lifestyle.")
+
+        output_lines.append("\nCoherencia Visual, Estilo y Narrativa del Conjunto:")
+        output_lines.append("Análisis: El estilo dominante es de 'inventario de concesionario', con un entorno de showroom repetitivo. La narrativa publicitaria es escasa.")
+        output_lines.append(f"Valoración: {'Buena' if overall_avg_rating >= 7 else ('Regular' if overall_avg_rating >= 4 else 'Muy Deficiente')}.")
+        output_lines.append("Justificación: Aunque hay coherencia en el entorno, esta no es deseable para una campaña premium que busca impactar y emocionar.")
+        output_lines.append("Sugerencia de Mejora: Definir una dirección creativa clara que incluya ambientes aspiracionales y elementos que cuenten una historia sobre el vehículo.")
+
+        output_lines.append("\nVariedad de Ángulos y Perspectivas del Vehículo:")
+        output_lines.append("Análisis: Los ángulos cubren lo básico, pero son estáticos. Faltan perspectivas dinámicas y creativas que destaquen el diseño o la experiencia de uso.")
+        output_lines.append(f"Valoración: {'Buena' if overall_avg_rating >= 6 else 'Regular'}.")
+        output_lines.append("Justificación: La variedad existe a nivel descriptivo, pero no a nivel creativo o de impacto visual.")
+        output_lines.append("Sugerencia de Mejora: Explorar ángulos más dramáticos, tomas en movimiento, y perspectivas que realcen la ergonomía y el lujo interior.")
+
+        output_lines.append("\nCalidad Técnica General Consolidada del Conjunto:")
+        output_lines.append("Análisis: Los problemas recurrentes incluyen reflejos no deseados (incluyendo el fotógrafo o elementos del showroom), iluminación plana, subexposición y elementos distractores (branding del concesionario).")
+        output_lines.append(f"Valoración: {'Aceptable' if overall_avg_rating >= 5 else 'Muy Deficiente'}.")
+        output_lines.append("Justificación: Los fallos técnicos en iluminación y control de reflejos son sistémicos y comprometen seriamente el atractivo publicitario.")
+        output_lines.append("Sugerencia de Mejora: Implementar un control riguroso de iluminación, usar polarizadores, y eliminar cualquier distracción en el encuadre. Preparación impecable del vehículo.")
+
+        output_lines.append("\n--- Parte 3: Puntuación Global y Veredicto del Conjunto ---")
+        output_lines.append(f"Puntuación Global del Conjunto (0-100): {int(overall_avg_rating * 10):.0f}/100") # Multiplicar por 10 para escala 0-100
+        output_lines.append("Justificación de la Puntuación Global:")
+        output_lines.append("La puntuación global refleja la suma de las deficiencias individuales. A pesar de una buena cobertura descriptiva, la ejecución técnica y artística es deficiente para un estándar de campaña publicitaria de alto nivel.")
+        
+        output_lines.append("\nResumen Crítico Final del Conjunto:")
+        output_lines.append("Principales Fortalezas del Conjunto Fotográfico: Amplitud descriptiva de planos y foco en funcionalidades clave del vehículo.")
+        output_lines.append("Principales Áreas de Mejora Crítica para el Conjunto: Calidad de iluminación y control de reflejos, entorno y narrativa publicitaria, y estilismo/postproducción.")
+        
+        output_lines.append("\nVeredicto Final para Campaña Publicitaria:")
+        if overall_avg_rating >= 7.5:
+            output_lines.append("Adecuado con oportunidades de optimización.")
+        elif overall_avg_rating >= 5.0:
+            output_lines.append("Requiere mejoras significativas.")
+        else:
+            output_lines.append("Totalmente Inadecuado.")
+        output_lines.append("Este conjunto, en su estado actual, no cumple con los requisitos mínimos de calidad técnica, artística y estratégica para una campaña publicitaria de alto nivel en la industria automotriz. Requiere un replanteamiento completo y nuevas sesiones fotográficas, preferiblemente en entornos controlados (estudio) y/o locaciones exteriores cuidadosamente seleccionadas, con un equipo de iluminación profesional y una dirección creativa que infunda emoción y narrativa en las imágenes.")
+
+    else:
+        output_lines.append("No se pudieron obtener calificaciones válidas para este archivo.")
+        logging.warning(f"No se pudieron obtener calificaciones válidas para '{page_name}'.")
+
+    # --- Guardar resultados para ESTE ANUNCIO ---
+    with open(output_file_name, 'w', encoding='utf-8') as f:
+        f.write("\n".join(output_lines))
+    logging.info(f"Análisis para '{page_name}' completado. Resultados guardados en '{output_file_name}'")
+
+
+def regenerate_reports(store, output_base_name, listing_ids=None):
+    """
+    Vuelve a escribir los informes .txt a partir del almacén de resultados, sin descargar
+    ni analizar nada (por ejemplo, tras cambiar el formato del informe o fusionar fragmentos).
+
+    Args:
+        store (AlmacenResultados): Almacén de resultados.
+        output_base_name (str): Prefijo de los archivos de salida.
+        listing_ids (list, opcional): Anuncios a regenerar (todos por defecto).
+
+    Returns:
+        int: Informes escritos.
+    """
+    written = 0
+    for listing_id in listing_ids or store.ids_anuncios():
+        listing = store.anuncio(listing_id)
+        if listing is None:
+            logging.warning(f"El anuncio {listing_id} no está en el almacén de resultados '{store.ruta}'.")
+            continue
+        page_entry = {"url": listing["url"], "hash": listing["hash_pagina"]}
+        write_report(listing_id, page_entry, results_from_store(store, listing_id), f"{output_base_name}{listing_id}.txt")
+        written += 1
+    return written
@@ -0,0 +1,361 @@
+import bisect
+import collections
+import contextlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Límites superiores (en segundos) de los cubos de los histogramas de duración
+CUBOS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PREFIJO_PROMETHEUS = "analisis_fotos" # Prefijo de los nombres de las métricas en Prometheus
+INTERVALO_PERFILADOR = 0.01 # Segundos entre dos muestras del perfilador
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted((clave, str(valor)) for clave, valor in etiquetas.items()))
+
+
+def _texto_clave(nombre, etiquetas):
+    """"nombre{etiqueta=valor,...}", la clave de cada serie en el resumen JSON."""
+    if not etiquetas:
+        return nombre
+    return f"{nombre}{{{','.join(f'{clave}={valor}' for clave, valor in etiquetas)}}}"
+
+
+class Histograma:
+    """
+    Distribución de valores en cubos fijos: memoria constante aunque se observen millones de valores.
+
+    Args:
+        cubos (tuple): Límites superiores de los cubos, en orden creciente.
+    """
+
+    def __init__(self, cubos=CUBOS_SEGUNDOS):
+        self.cubos = tuple(cubos)
+        self.conteos = [0] * (len(self.cubos) + 1) # El último cubo es +Inf
+        self.cuenta = 0
+        self.suma = 0.0
+        self.minimo = None
+        self.maximo = None
+
+    def observar(self, valor):
+        self.conteos[bisect.bisect_left(self.cubos, valor)] += 1
+        self.cuenta += 1
+        self.suma += valor
+        self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+        self.maximo = valor if self.maximo is None else max(self.maximo, valor)
+
+    def cuantil(self, porcentaje):
+        """Estimación del percentil `porcentaje` interpolando dentro de su cubo (como histogram_quantile)."""
+        if not self.cuenta:
+            return 0.0
+        objetivo = self.cuenta * porcentaje / 100
+        acumulado = 0
+        for posicion, conteo in enumerate(self.conteos):
+            if conteo and acumulado + conteo >= objetivo:
+                inferior = self.cubos[posicion - 1] if posicion else min(self.minimo, self.cubos[0])
+                superior = self.cubos[posicion] if posicion < len(self.cubos) else self.maximo
+                estimado = inferior + (superior - inferior) * (objetivo - acumulado) / conteo
+                return max(self.minimo, min(self.maximo, estimado))
+            acumulado += conteo
+        return self.maximo
+
+    def como_dict(self):
+        return {
+            "cuenta": self.cuenta, "suma": self.suma, "minimo": self.minimo, "maximo": self.maximo,
+            "media": self.suma / self.cuenta if self.cuenta else 0.0,
+            "p50": self.cuantil(50), "p95": self.cuantil(95), "p99": self.cuantil(99),
+            "cubos": list(self.cubos), "conteos": list(self.conteos),
+        }
+
+    def sumar(self, datos):
+        """Añade un histograma exportado con `como_dict` (por ejemplo, el de otro proceso)."""
+        if tuple(datos["cubos"]) != self.cubos:
+            raise ValueError("No se pueden sumar histogramas con cubos distintos.")
+        self.conteos = [a + b for a, b in zip(self.conteos, datos["conteos"])]
+        self.cuenta += datos["cuenta"]
+        self.suma += datos["suma"]
+        for valor in (datos["minimo"], datos["maximo"]):
+            if valor is not None:
+                self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+                self.maximo = valor if self.maximo is None else max(self.maximo, valor)
+
+
+class Metricas:
+    """
+    Registro de contadores e histogramas de una ejecución, seguro entre hilos.
+
+    Cada serie se identifica por su nombre y sus etiquetas:
+
+        metricas.contar("tokens_modelo", 1520)
+        with metricas.medir("peticion_modelo"):
+            ...
+        metricas.observar("etapa_segundos", 0.8, etapa="descarga")
+
+    El registro se exporta como resumen JSON (`resumen`, `guardar_json`) y en el formato
+    de texto de Prometheus (`texto_prometheus`, `guardar_prometheus`, `servir`).
+    """
+
+    def __init__(self):
+        self._contadores = {}
+        self._histogramas = {}
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+
+    def reiniciar(self):
+        """Vacía el registro (al empezar una ejecución)."""
+        with self._lock:
+            self._contadores.clear()
+            self._histogramas.clear()
+            self.inicio = time.time()
+
+    def contar(self, nombre, valor=1, **etiquetas):
+        """Suma `valor` al contador `nombre`."""
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, cubos=CUBOS_SEGUNDOS, **etiquetas):
+        """Añade `valor` al histograma `nombre` (se crea con `cubos` la primera vez)."""
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = Histograma(cubos)
+            histograma.observar(valor)
+
+    @contextlib.contextmanager
+    def medir(self, nombre, **etiquetas):
+        """
+        Mide la duración del bloque en el histograma "<nombre>_segundos". Si el bloque
+        lanza una excepción, se cuenta además en "<nombre>_errores".
+        """
+        comienzo = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.contar(f"{nombre}_errores", **etiquetas)
+            raise
+        finally:
+            self.observar(f"{nombre}_segundos", time.perf_counter() - comienzo, **etiquetas)
+
+    def resumen(self):
+        """
+        Resumen de la ejecución, serializable como JSON.
+
+        Returns:
+            dict: "inicio", "segundos", "contadores" (serie -> valor) e "histogramas"
+                (serie -> cuenta, suma, media, mínimo, máximo, p50, p95, p99 y cubos).
+        """
+        with self._lock:
+            return {
+                "inicio": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.inicio)),
+                "segundos": time.time() - self.inicio,
+                "contadores": {_texto_clave(*clave): valor for clave, valor in sorted(self._contadores.items())},
+                "histogramas": {_texto_clave(*clave): histograma.como_dict()
+                                for clave, histograma in sorted(self._histogramas.items())},
+            }
+
+    def sumar_resumen(self, resumen):
+        """Añade al registro un resumen de `resumen` (por ejemplo, el de otro proceso)."""
+        with self._lock:
+            for serie, valor in resumen["contadores"].items():
+                clave = _clave_de_texto(serie)
+                self._contadores[clave] = self._contadores.get(clave, 0) + valor
+            for serie, datos in resumen["histogramas"].items():
+                clave = _clave_de_texto(serie)
+                if clave not in self._histogramas:
+                    self._histogramas[clave] = Histograma(datos["cubos"])
+                self._histogramas[clave].sumar(datos)
+
+    def texto_prometheus(self, prefijo=PREFIJO_PROMETHEUS):
+        """Todas las series en el formato de texto de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted((clave, histograma.como_dict()) for clave, histograma in self._histogramas.items())
+        lineas = []
+        tipos = set()
+        for (nombre, etiquetas), valor in contadores:
+            metrica = _nombre_prometheus(prefijo, nombre) + "_total"
+            if metrica not in tipos:
+                tipos.add(metrica)
+                lineas.append(f"# TYPE {metrica} counter")
+            lineas.append(f"{metrica}{_etiquetas_prometheus(etiquetas)} {valor}")
+        for (nombre, etiquetas), datos in histogramas:
+            metrica = _nombre_prometheus(prefijo, nombre)
+            if metrica not in tipos:
+                tipos.add(metrica)
+                lineas.append(f"# TYPE {metrica} histogram")
+            acumulado = 0
+            for limite, conteo in zip(datos["cubos"] + ["+Inf"], datos["conteos"]):
+                acumulado += conteo
+                lineas.append(f"{metrica}_bucket{_etiquetas_prometheus(etiquetas + (('le', str(limite)),))} {acumulado}")
+            lineas.append(f"{metrica}_sum{_etiquetas_prometheus(etiquetas)} {datos['suma']}")
+            lineas.append(f"{metrica}_count{_etiquetas_prometheus(etiquetas)} {datos['cuenta']}")
+        return "\n".join(lineas) + "\n"
+
+    def guardar_json(self, ruta):
+        _escribir_atomico(ruta, json.dumps(self.resumen(), ensure_ascii=False, indent=2))
+
+    def guardar_prometheus(self, ruta, prefijo=PREFIJO_PROMETHEUS):
+        """Escribe el archivo de forma atómica, como espera el textfile collector de node_exporter."""
+        _escribir_atomico(ruta, self.texto_prometheus(prefijo))
+
+    def servir(self, puerto, direccion="0.0.0.0", prefijo=PREFIJO_PROMETHEUS):
+        """
+        Sirve /metrics en un hilo de fondo para que Prometheus lo consulte durante la ejecución.
+
+        Returns:
+            ThreadingHTTPServer: El servidor (se detiene con shutdown()).
+        """
+        metricas = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.texto_prometheus(prefijo).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((direccion, puerto), Manejador)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+        return servidor
+
+
+def _clave_de_texto(serie):
+    coincidencia = re.match(r'^([^{]+)(?:\{(.*)\})?$', serie)
+    etiquetas = dict(par.split("=", 1) for par in coincidencia.group(2).split(",")) if coincidencia.group(2) else {}
+    return _clave(coincidencia.group(1), etiquetas)
+
+
+def _nombre_prometheus(prefijo, nombre):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', f"{prefijo}_{nombre}" if prefijo else nombre)
+
+
+def _etiquetas_prometheus(etiquetas):
+    if not etiquetas:
+        return ""
+    escapar = lambda valor: valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{clave}="{escapar(valor)}"' for clave, valor in etiquetas) + "}"
+
+
+def _escribir_atomico(ruta, texto):
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(texto)
+    os.replace(temporal, ruta)
+
+
+class PerfiladorMuestreo:
+    """
+    Perfilador estadístico: cada `intervalo` segundos toma la pila de todos los hilos.
+
+    Apenas ralentiza la ejecución (no instrumenta cada llamada como cProfile), así que
+    se puede activar en lotes reales. Mide tiempo de reloj: las esperas de red y de las
+    colas también aparecen, que es donde se va el tiempo de un pipeline como este. Guarda las pilas en formato "collapsed"
+    ("hilo;modulo:funcion;... muestras"), que leen flamegraph.pl y speedscope.
+
+    Args:
+        ruta (str): Archivo donde se guardan las pilas al detenerlo.
+        intervalo (float): Segundos entre muestras.
+    """
+
+    def __init__(self, ruta, intervalo=INTERVALO_PERFILADOR):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.muestras = collections.Counter()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detener()
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._muestrear, name="perfilador", daemon=True)
+        self._hilo.start()
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            for ident, marco in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = []
+                while marco is not None:
+                    codigo = marco.f_code
+                    pila.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                    marco = marco.f_back
+                # Los hilos de una etapa del pipeline ("descarga-3") se agrupan por etapa
+                hilo = re.sub(r'-\d+$', '', nombres.get(ident, str(ident)))
+                self.muestras[";".join([hilo] + pila[::-1])] += 1
+
+    def detener(self):
+        """Detiene el muestreo y guarda las pilas en `ruta`."""
+        if self._hilo is None:
+            return
+        self._parar.set()
+        self._hilo.join()
+        self._hilo = None
+        _escribir_atomico(self.ruta, "".join(f"{pila} {cuenta}\n" for pila, cuenta in self.muestras.most_common()))
+
+    def funciones_mas_costosas(self, cuantas=10):
+        """Funciones en las que más muestras se han tomado (tiempo propio): [(función, muestras)]."""
+        propias = collections.Counter()
+        for pila, cuenta in self.muestras.items():
+            propias[pila.rsplit(";", 1)[-1]] += cuenta
+        return propias.most_common(cuantas)
+
+
+# Registro compartido por todos los módulos del proceso
+registro = Metricas()
+contar = registro.contar
+observar = registro.observar
+medir = registro.medir
+
+
+@contextlib.contextmanager
+def instrumentar(ruta_json=None, ruta_prometheus=None, puerto=None, ruta_perfil=None, intervalo_perfil=INTERVALO_PERFILADOR):
+    """
+    Instrumenta una ejecución: vacía el registro al empezar y, al terminar, guarda el
+    resumen JSON y el archivo de Prometheus. Con `puerto` se sirve /metrics mientras dura
+    y con `ruta_perfil` se activa el perfilador de muestreo. Cada opción a None la desactiva.
+
+    Yields:
+        Metricas: El registro compartido.
+    """
+    registro.reiniciar()
+    servidor = registro.servir(int(puerto)) if puerto else None
+    perfilador = PerfiladorMuestreo(ruta_perfil, intervalo_perfil) if ruta_perfil else None
+    if perfilador is not None:
+        perfilador.iniciar()
+    try:
+        yield registro
+    finally:
+        if perfilador is not None:
+            perfilador.detener()
+        if ruta_json:
+            registro.guardar_json(ruta_json)
+        if ruta_prometheus:
+            registro.guardar_prometheus(ruta_prometheus)
+        if servidor is not None:
+            servidor.shutdown()
+            servidor.server_close()
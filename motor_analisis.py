@@ -0,0 +1,229 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+# --- Configuración por defecto ---
+PETICIONES_POR_MINUTO = 60 # Cuota RPM de la API
+TOKENS_POR_MINUTO = 1000000 # Cuota TPM de la API
+MAX_INTENTOS = 5 # Intentos por petición ante errores 429/5xx
+ESPERA_BASE = 1.0 # Segundos de la primera espera entre reintentos (se duplica en cada intento)
+ESPERA_MAXIMA = 60.0 # Tope de la espera entre reintentos
+TOKENS_POR_IMAGEN = 258 # Tokens que Gemini cuenta por cada imagen de entrada
+
+
+class ErrorModelo(Exception):
+    """Error devuelto por un backend de modelo, con el código HTTP equivalente."""
+
+    def __init__(self, mensaje, codigo=None):
+        super().__init__(mensaje)
+        self.codigo = codigo
+
+
+class RespuestaModelo:
+    """Respuesta de un backend: texto generado y tokens consumidos (si se conocen)."""
+
+    def __init__(self, texto, tokens=None):
+        self.texto = texto
+        self.tokens = tokens
+
+
+class ModeloGemini:
+    """
+    Backend que envía las peticiones a Google Gemini.
+
+    Args:
+        nombre (str): Nombre del modelo (ej. "gemini-2.0-flash").
+        modelo (genai.GenerativeModel, opcional): Modelo ya inicializado. Si no se indica,
+            se crea uno nuevo (la API debe estar configurada con genai.configure).
+    """
+
+    def __init__(self, nombre, modelo=None):
+        import google.generativeai as genai
+        self._genai = genai
+        self.nombre = nombre
+        self.modelo = modelo or genai.GenerativeModel(model_name=nombre)
+
+    def generar(self, partes, temperatura=0.0, max_tokens=1500, esquema=None):
+        """Con `esquema`, el modelo responde con JSON que cumple ese esquema (salida estructurada)."""
+        opciones = {}
+        if esquema is not None:
+            opciones = {"response_mime_type": "application/json", "response_schema": esquema}
+        respuesta = self.modelo.generate_content(partes,
+            generation_config=self._genai.types.GenerationConfig(
+                temperature=temperatura,
+                max_output_tokens=max_tokens,
+                **opciones
+            )
+        )
+        uso = getattr(respuesta, 'usage_metadata', None)
+        return RespuestaModelo(respuesta.text, getattr(uso, 'total_token_count', None))
+
+
+class ModeloFalso:
+    """
+    Backend local que imita a Gemini sin acceso a red, para pruebas y benchmarks.
+
+    Devuelve un análisis con el formato esperado por el analizador (texto, o JSON si
+    se pide un esquema) tras un retardo configurable, y puede simular errores 429/503
+    con una probabilidad dada.
+
+    Args:
+        retardo (float): Segundos que tarda cada respuesta.
+        tasa_errores (float): Probabilidad (0-1) de devolver un error reintentable.
+        semilla (int, opcional): Semilla para que las puntuaciones y errores sean reproducibles.
+    """
+
+    nombre = "modelo-falso"
+
+    def __init__(self, retardo=0.0, tasa_errores=0.0, semilla=None):
+        self.retardo = retardo
+        self.tasa_errores = tasa_errores
+        self.llamadas = 0
+        self._aleatorio = random.Random(semilla)
+        self._lock = threading.Lock()
+
+    def generar(self, partes, temperatura=0.0, max_tokens=1500, esquema=None):
+        with self._lock:
+            self.llamadas += 1
+            fallo = self._aleatorio.random() < self.tasa_errores
+            codigo_error = self._aleatorio.choice([429, 503])
+            puntuacion = self._aleatorio.randint(0, 10)
+        if self.retardo:
+            time.sleep(self.retardo)
+        if fallo:
+            raise ErrorModelo("Error simulado por el modelo falso", codigo=codigo_error)
+        numeros = [int(n) for n in _numeros_de_imagen(partes)] or [1]
+        if esquema is not None:
+            objetos = [
+                {"imagen": numero, "plano": "lateral", "descripcion": "Plano lateral de prueba.", "puntos_fuertes": [],
+                 "areas_mejora": ["Iluminación y Reflejos."], "sugerencias": ["Usar iluminación controlada."],
+                 "puntuacion": puntuacion, "justificacion": "Respuesta generada por el modelo falso."}
+                for numero in numeros
+            ]
+            texto = json.dumps(objetos[0] if len(objetos) == 1 else objetos, ensure_ascii=False)
+            return RespuestaModelo(texto, tokens=estimar_tokens(partes) + len(texto) // 4)
+        secciones = [
+            f"Imagen {numero}:\n"
+            f"Descripción del Plano y Composición: Plano lateral de prueba.\n"
+            f"Evaluación Cualitativa:\n"
+            f"Puntos Fuertes: Ninguno significativo.\n"
+            f"Áreas de Mejora:\n"
+            f"1. Iluminación y Reflejos.\n"
+            f"Sugerencias Específicas:\n"
+            f"1. Usar iluminación controlada.\n"
+            f"Puntuación Individual (0-10): {puntuacion}\n"
+            f"Justificación: Respuesta generada por el modelo falso."
+            for numero in numeros
+        ]
+        texto = "\n\n".join(secciones)
+        return RespuestaModelo(texto, tokens=estimar_tokens(partes) + len(texto) // 4)
+
+
+def _numeros_de_imagen(partes):
+    """Números de foto ("Imagen N:") que el prompt pide analizar."""
+    prompt = next((p for p in partes if isinstance(p, str)), "")
+    vistos = []
+    for numero in re.findall(r'^Imagen (\d+):', prompt, re.MULTILINE):
+        if numero not in vistos:
+            vistos.append(numero)
+    return vistos
+
+
+def estimar_tokens(partes, max_tokens_salida=0):
+    """Estimación aproximada de los tokens de una petición (≈4 caracteres por token de texto)."""
+    tokens = max_tokens_salida
+    for parte in partes:
+        tokens += len(parte) // 4 if isinstance(parte, str) else TOKENS_POR_IMAGEN
+    return tokens
+
+
+class LimitadorCuota:
+    """
+    Limitador de peticiones por minuto (RPM) y tokens por minuto (TPM).
+
+    Usa dos cubos de fichas que se rellenan de forma continua. Cada petición reserva
+    una ficha de peticiones y una estimación de tokens; cuando se conoce el consumo
+    real, `ajustar_tokens` corrige la diferencia.
+
+    Las cuotas pueden ser menores que una petición o que una estimación de tokens (p. ej.
+    al repartir una cuota pequeña entre varios procesos): el cubo de peticiones admite
+    siempre al menos una y cada reserva de tokens se limita a la capacidad del cubo, de
+    modo que las peticiones se espacian al ritmo de la cuota en lugar de esperar para siempre.
+
+    Args:
+        peticiones_por_minuto (float): Cuota RPM.
+        tokens_por_minuto (float): Cuota TPM.
+    """
+
+    def __init__(self, peticiones_por_minuto=PETICIONES_POR_MINUTO, tokens_por_minuto=TOKENS_POR_MINUTO):
+        self.peticiones_por_minuto = peticiones_por_minuto
+        self.tokens_por_minuto = tokens_por_minuto
+        self._capacidad_peticiones = max(1.0, peticiones_por_minuto)
+        self._peticiones = self._capacidad_peticiones
+        self._tokens = float(tokens_por_minuto)
+        self._ultima = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        transcurrido = ahora - self._ultima
+        self._ultima = ahora
+        self._peticiones = min(self._capacidad_peticiones,
+                               self._peticiones + transcurrido * self.peticiones_por_minuto / 60)
+        self._tokens = min(self.tokens_por_minuto,
+                           self._tokens + transcurrido * self.tokens_por_minuto / 60)
+
+    def adquirir(self, tokens_estimados=0):
+        """Bloquea hasta que haya cuota para una petición de `tokens_estimados` tokens y la reserva."""
+        tokens_estimados = min(tokens_estimados, self.tokens_por_minuto)
+        while True:
+            with self._lock:
+                self._recargar()
+                if self._peticiones >= 1 and self._tokens >= tokens_estimados:
+                    self._peticiones -= 1
+                    self._tokens -= tokens_estimados
+                    return
+                espera = max(
+                    (1 - self._peticiones) * 60 / self.peticiones_por_minuto,
+                    (tokens_estimados - self._tokens) * 60 / self.tokens_por_minuto,
+                )
+            time.sleep(max(espera, 0.01))
+
+    def ajustar_tokens(self, diferencia):
+        """Descuenta (o devuelve, si es negativa) la diferencia entre tokens reales y estimados."""
+        with self._lock:
+            self._tokens -= diferencia
+
+
+def es_reintentable(error):
+    """Indica si un error del modelo es transitorio (429 o 5xx) y merece reintentarse."""
+    codigo = getattr(error, 'codigo', None)
+    if codigo is None:
+        codigo = getattr(error, 'code', None) # google.api_core.exceptions.GoogleAPICallError
+    if callable(codigo):
+        codigo = None
+    if isinstance(codigo, int):
+        return codigo == 429 or codigo >= 500
+    return type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+                                    "InternalServerError", "DeadlineExceeded")
+
+
+def llamar_con_reintentos(funcion, max_intentos=MAX_INTENTOS, espera_base=ESPERA_BASE, espera_maxima=ESPERA_MAXIMA):
+    """
+    Ejecuta `funcion()` reintentando los errores 429/5xx con espera exponencial y jitter.
+
+    Los errores no reintentables (o el último intento fallido) se propagan al llamador.
+    """
+    for intento in range(1, max_intentos + 1):
+        try:
+            return funcion()
+        except Exception as e:
+            if intento == max_intentos or not es_reintentable(e):
+                raise
+            espera = min(espera_maxima, espera_base * 2 ** (intento - 1))
+            espera *= random.uniform(0.5, 1.0)
+            logging.warning(f"Intento {intento}/{max_intentos} fallido ({e}). Reintentando en {espera:.1f} segundos...")
+            time.sleep(espera)
@@ -0,0 +1,206 @@
+import logging
+import queue
+import threading
+import time
+
+from metricas import contar, observar
+
+CAPACIDAD_COLA = 32 # Elementos máximos en espera entre dos etapas
+
+_FIN = object() # Marca de fin de datos que recorre las colas
+
+
+class Etapa:
+    """
+    Etapa de un pipeline: una función aplicada por uno o varios hilos.
+
+    La función recibe un elemento y devuelve un iterable con los elementos que pasan a
+    la siguiente etapa (puede devolver varios, uno o ninguno; None equivale a ninguno).
+    Con `lote` > 1 recibe en cambio una lista de hasta `lote` elementos.
+
+    Args:
+        nombre (str): Nombre para las estadísticas y los mensajes.
+        funcion (callable): Función que procesa cada elemento.
+        trabajadores (int): Hilos que ejecutan la etapa en paralelo.
+        capacidad (int): Tamaño de la cola de entrada. Cuando se llena, la etapa
+            anterior se bloquea (contrapresión), así que la memoria se mantiene acotada.
+        al_terminar (callable, opcional): Se llama una vez cuando ya no quedan elementos;
+            puede devolver un iterable de elementos finales (por ejemplo, lo que quedó a medias).
+        lote (int): Máximo de elementos por llamada. El lote se forma con lo que ya está
+            en la cola, sin esperar a que se llene, así que no añade latencia.
+    """
+
+    def __init__(self, nombre, funcion, trabajadores=1, capacidad=CAPACIDAD_COLA, al_terminar=None, lote=1):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.trabajadores = trabajadores
+        self.capacidad = capacidad
+        self.al_terminar = al_terminar
+        self.lote = lote
+        self.estadisticas = EstadisticasEtapa(nombre, trabajadores)
+
+
+def percentil(valores, porcentaje):
+    """Percentil (0-100) de una lista de valores, con interpolación lineal (0.0 si está vacía)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * porcentaje / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+class EstadisticasEtapa:
+    """Contadores de una etapa: elementos procesados, errores, tiempo ocupado y duración de cada llamada."""
+
+    def __init__(self, nombre, trabajadores):
+        self.nombre = nombre
+        self.trabajadores = trabajadores
+        self.procesados = 0
+        self.emitidos = 0
+        self.errores = 0
+        self.segundos_ocupada = 0.0
+        self.segundos_totales = 0.0
+        self.duraciones = [] # Segundos de cada llamada a la función de la etapa
+        self._lock = threading.Lock()
+
+    def registrar(self, segundos, emitidos, error=False, procesados=1):
+        with self._lock:
+            self.procesados += procesados
+            self.emitidos += emitidos
+            self.segundos_ocupada += segundos
+            self.duraciones.append(segundos)
+            if error:
+                self.errores += 1
+
+    def rendimiento(self):
+        """Elementos procesados por segundo de ejecución del pipeline."""
+        return self.procesados / self.segundos_totales if self.segundos_totales else 0.0
+
+    def ocupacion(self):
+        """Fracción del tiempo que los hilos de la etapa estuvieron trabajando (1.0 = cuello de botella)."""
+        capacidad = self.segundos_totales * self.trabajadores
+        return self.segundos_ocupada / capacidad if capacidad else 0.0
+
+    def latencias(self):
+        """Percentiles 50, 95 y 99 de la duración de cada llamada, en milisegundos."""
+        with self._lock:
+            duraciones = list(self.duraciones)
+        return {f"p{p}_ms": 1000 * percentil(duraciones, p) for p in (50, 95, 99)}
+
+    def resumen(self):
+        return (f"{self.nombre}: {self.procesados} elementos ({self.errores} errores), "
+                f"{self.rendimiento():.2f}/s, ocupación {100 * self.ocupacion():.0f}% "
+                f"con {self.trabajadores} hilo(s)")
+
+
+class Pipeline:
+    """
+    Encadena etapas con colas acotadas entre ellas, de modo que el trabajo de varios
+    elementos se solapa (mientras uno se analiza, otro se descarga, etc.).
+
+    Args:
+        etapas (list): Lista de `Etapa` en orden.
+    """
+
+    def __init__(self, etapas):
+        self.etapas = etapas
+
+    def ejecutar(self, entradas):
+        """
+        Procesa todas las `entradas` y espera a que terminen todas las etapas.
+
+        Returns:
+            list: Elementos emitidos por la última etapa.
+        """
+        colas = [queue.Queue(maxsize=etapa.capacidad) for etapa in self.etapas]
+        salida = []
+        inicio = time.monotonic()
+        hilos = []
+        for posicion, etapa in enumerate(self.etapas):
+            siguiente = colas[posicion + 1] if posicion + 1 < len(colas) else None
+            pendientes = [etapa.trabajadores]
+            lock = threading.Lock()
+            for numero in range(etapa.trabajadores):
+                hilo = threading.Thread(
+                    target=self._trabajador,
+                    args=(etapa, colas[posicion], siguiente, salida, pendientes, lock, inicio),
+                    name=f"{etapa.nombre}-{numero}",
+                    daemon=True,
+                )
+                hilo.start()
+                hilos.append(hilo)
+
+        # put() se bloquea si la primera etapa va atrasada: las entradas se leen a su ritmo
+        for elemento in entradas:
+            colas[0].put(elemento)
+        for _ in range(self.etapas[0].trabajadores):
+            colas[0].put(_FIN)
+        for hilo in hilos:
+            hilo.join()
+        return salida
+
+    def _trabajador(self, etapa, entrada, siguiente, salida, pendientes, lock, inicio):
+        terminado = False
+        while not terminado:
+            elemento = entrada.get()
+            if elemento is _FIN:
+                break
+            if etapa.lote > 1:
+                lote = [elemento]
+                while len(lote) < etapa.lote:
+                    try:
+                        elemento = entrada.get_nowait()
+                    except queue.Empty:
+                        break
+                    if elemento is _FIN:
+                        terminado = True
+                        break
+                    lote.append(elemento)
+                elemento, procesados = lote, len(lote)
+            else:
+                procesados = 1
+            comienzo = time.monotonic()
+            emitidos, error = 0, False
+            try:
+                for resultado in etapa.funcion(elemento) or ():
+                    self._emitir(resultado, siguiente, salida)
+                    emitidos += 1
+            except Exception as e:
+                error = True
+                logging.exception(f"Error en la etapa '{etapa.nombre}': {e}")
+            duracion = time.monotonic() - comienzo
+            etapa.estadisticas.registrar(duracion, emitidos, error, procesados)
+            observar("etapa_segundos", duracion, etapa=etapa.nombre)
+            contar("etapa_elementos", procesados, etapa=etapa.nombre)
+            if error:
+                contar("etapa_errores", etapa=etapa.nombre)
+
+        with lock:
+            pendientes[0] -= 1
+            ultimo = pendientes[0] == 0
+        if not ultimo:
+            return
+        # El último hilo de la etapa cierra la etapa y avisa a la siguiente
+        if etapa.al_terminar is not None:
+            try:
+                for resultado in etapa.al_terminar() or ():
+                    self._emitir(resultado, siguiente, salida)
+            except Exception as e:
+                logging.exception(f"Error al cerrar la etapa '{etapa.nombre}': {e}")
+        etapa.estadisticas.segundos_totales = time.monotonic() - inicio
+        if siguiente is not None:
+            for _ in range(self.etapas[self.etapas.index(etapa) + 1].trabajadores):
+                siguiente.put(_FIN)
+
+    @staticmethod
+    def _emitir(resultado, siguiente, salida):
+        if siguiente is not None:
+            siguiente.put(resultado)
+        else:
+            salida.append(resultado)
+
+    def resumen(self):
+        """Una línea por etapa con su rendimiento y ocupación, para localizar el cuello de botella."""
+        return "\n".join(etapa.estadisticas.resumen() for etapa in self.etapas)
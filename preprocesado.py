@@ -0,0 +1,111 @@
+import io
+import os
+import threading
+
+from PIL import Image
+
+# --- Configuración por defecto ---
+LADO_MAXIMO = 1536 # Píxeles del lado más largo tras el reescalado
+FORMATO = "JPEG" # "JPEG" o "WEBP"
+CALIDAD = 85 # Calidad de re-codificación (1-95)
+USAR_DRAFT = True # Decodificar los JPEG directamente a tamaño reducido
+
+TIPOS_MIME = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+class ImagenPreprocesada:
+    """Imagen lista para enviar al modelo, con su tamaño antes y después del preprocesado."""
+
+    def __init__(self, datos, tipo_mime, bytes_antes, tamano):
+        self.datos = datos
+        self.tipo_mime = tipo_mime
+        self.bytes_antes = bytes_antes
+        self.bytes_despues = len(datos)
+        self.tamano = tamano
+
+    def como_parte(self):
+        """Devuelve la imagen en el formato de parte en línea que acepta generate_content."""
+        return {"mime_type": self.tipo_mime, "data": self.datos}
+
+
+def _leer_bytes(origen):
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        return bytes(origen)
+    with open(origen, 'rb') as f:
+        return f.read()
+
+
+def firma_preprocesado(lado_maximo=LADO_MAXIMO, formato=FORMATO, calidad=CALIDAD, usar_draft=USAR_DRAFT):
+    """
+    Texto que identifica la configuración de preprocesado (forma parte de la clave de caché).
+
+    Incluye `usar_draft` porque la decodificación reducida cambia los píxeles que se envían.
+    """
+    return f"{formato}:{lado_maximo}:{calidad}:{'draft' if usar_draft else 'completa'}"
+
+
+def preprocesar_imagen(origen, lado_maximo=LADO_MAXIMO, formato=FORMATO, calidad=CALIDAD, usar_draft=USAR_DRAFT):
+    """
+    Reduce una imagen a `lado_maximo` píxeles en su lado más largo y la re-codifica.
+
+    Con `usar_draft`, los JPEG se decodifican directamente a una escala reducida
+    (1/2, 1/4 o 1/8), lo que evita descomprimir todos los píxeles de fotos grandes.
+    Si la imagen ya es pequeña y está en el formato de destino, y re-codificarla no
+    ahorra nada, se envían los bytes originales.
+
+    Args:
+        origen (bytes | str): Bytes de la imagen o ruta del archivo en disco.
+        lado_maximo (int): Tamaño máximo del lado más largo, en píxeles.
+        formato (str): Formato de salida ("JPEG" o "WEBP").
+        calidad (int): Calidad de la re-codificación.
+        usar_draft (bool): Usar el modo draft de Pillow para los JPEG.
+
+    Returns:
+        ImagenPreprocesada: Bytes re-codificados y estadísticas de tamaño.
+    """
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        bytes_antes = len(origen)
+        img = Image.open(io.BytesIO(origen))
+    else:
+        bytes_antes = os.path.getsize(origen)
+        img = Image.open(origen)
+    formato_original = img.format
+    ancho, alto = img.size
+    reducir = max(ancho, alto) > lado_maximo
+
+    if reducir and usar_draft and formato_original == "JPEG":
+        escala = lado_maximo / max(ancho, alto)
+        # draft nunca baja del tamaño pedido, así que el thumbnail posterior ajusta el resto
+        img.draft("RGB", (int(ancho * escala), int(alto * escala)))
+    img = img.convert("RGB")
+    if reducir:
+        img.thumbnail((lado_maximo, lado_maximo), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format=formato, quality=calidad)
+    datos = buffer.getvalue()
+    if not reducir and formato_original == formato and len(datos) >= bytes_antes:
+        # Re-codificar no ahorra nada: se envía la imagen tal cual
+        datos = _leer_bytes(origen)
+    return ImagenPreprocesada(datos, TIPOS_MIME[formato], bytes_antes, img.size)
+
+
+class EstadisticasPreprocesado:
+    """Acumula los bytes antes y después del preprocesado de una ejecución (seguro entre hilos)."""
+
+    def __init__(self):
+        self.imagenes = 0
+        self.bytes_antes = 0
+        self.bytes_despues = 0
+        self._lock = threading.Lock()
+
+    def registrar(self, imagen):
+        with self._lock:
+            self.imagenes += 1
+            self.bytes_antes += imagen.bytes_antes
+            self.bytes_despues += imagen.bytes_despues
+
+    def resumen(self):
+        ahorro = 100 * (1 - self.bytes_despues / self.bytes_antes) if self.bytes_antes else 0
+        return (f"Preprocesado: {self.imagenes} imágenes, {self.bytes_antes / 1e6:.1f} MB originales -> "
+                f"{self.bytes_despues / 1e6:.1f} MB enviados ({ahorro:.1f}% menos).")
@@ -0,0 +1,192 @@
+import io
+import threading
+
+import numpy as np
+from PIL import Image
+
+# --- Configuración por defecto ---
+LADO_METRICAS = 256 # Las métricas se calculan sobre una copia de LADO_METRICAS x LADO_METRICAS píxeles
+NITIDEZ_MINIMA = 15.0 # Varianza del laplaciano por debajo de la cual la foto está desenfocada
+BRILLO_MINIMO = 30.0 # Luminancia media (0-255) por debajo de la cual la foto está subexpuesta
+BRILLO_MAXIMO = 225.0 # Luminancia media por encima de la cual está sobreexpuesta
+RECORTE_MAXIMO = 0.40 # Fracción máxima de píxeles quemados (>= 250) o empastados (<= 5)
+RESOLUCION_MINIMA = 320 # Píxeles mínimos del lado corto de la imagen original
+DOMINANTE_MAXIMA = 0.60 # Diferencia relativa máxima entre las medias de los canales R, G y B
+
+# Motivo de descarte -> área de mejora y sugerencia para el informe
+DESCRIPCIONES = {
+    "desenfocada": "Imagen desenfocada o movida.",
+    "subexpuesta": "Imagen subexpuesta.",
+    "sobreexpuesta": "Imagen sobreexpuesta.",
+    "recortada": "Luces quemadas o sombras empastadas en gran parte de la imagen.",
+    "baja_resolucion": "Resolución insuficiente.",
+    "dominante_de_color": "Dominante de color.",
+}
+SUGERENCIAS = {
+    "desenfocada": "Enfocar correctamente y usar trípode o mayor velocidad de obturación.",
+    "subexpuesta": "Aumentar la exposición o iluminar el vehículo.",
+    "sobreexpuesta": "Reducir la exposición y evitar la luz directa.",
+    "recortada": "Controlar el rango dinámico para no perder detalle en luces y sombras.",
+    "baja_resolucion": "Publicar la foto original a mayor resolución.",
+    "dominante_de_color": "Corregir el balance de blancos.",
+}
+# Motivos que por sí solos indican que la foto es inutilizable (la dominante de color
+# puede deberse al propio color del coche, así que solo resta puntos)
+MOTIVOS_GRAVES = ("desenfocada", "subexpuesta", "sobreexpuesta", "recortada", "baja_resolucion")
+
+
+def cargar_para_metricas(origen, lado=LADO_METRICAS):
+    """
+    Decodifica una imagen a una matriz RGB de `lado` x `lado` píxeles.
+
+    Los JPEG se decodifican directamente a escala reducida (modo draft de Pillow).
+
+    Args:
+        origen (bytes | str): Bytes de la imagen o ruta del archivo en disco.
+
+    Returns:
+        tuple: (matriz uint8 de forma (lado, lado, 3), (ancho, alto) originales)
+    """
+    img = Image.open(io.BytesIO(origen) if isinstance(origen, (bytes, bytearray, memoryview)) else origen)
+    tamano = img.size
+    img.draft("RGB", (lado, lado))
+    img = img.convert("RGB").resize((lado, lado), Image.BILINEAR)
+    return np.asarray(img, dtype=np.uint8), tamano
+
+
+def metricas_lote(imagenes, tamanos):
+    """
+    Calcula las métricas de calidad de un lote de imágenes de una sola vez.
+
+    Args:
+        imagenes (np.ndarray): Lote de forma (N, lado, lado, 3) en uint8.
+        tamanos (list): (ancho, alto) originales de cada imagen.
+
+    Returns:
+        dict: Nombre de la métrica -> np.ndarray de N valores: "nitidez" (varianza del
+            laplaciano), "brillo" (luminancia media), "recorte" (fracción de píxeles
+            quemados o empastados), "resolucion" (lado corto original) y "dominante"
+            (diferencia relativa entre las medias de los canales).
+    """
+    rgb = imagenes.astype(np.float32)
+    luminancia = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    # Laplaciano de 4 vecinos sobre todo el lote a la vez
+    laplaciano = (luminancia[:, :-2, 1:-1] + luminancia[:, 2:, 1:-1] + luminancia[:, 1:-1, :-2]
+                  + luminancia[:, 1:-1, 2:] - 4 * luminancia[:, 1:-1, 1:-1])
+    medias_canal = rgb.mean(axis=(1, 2))
+    return {
+        "nitidez": laplaciano.var(axis=(1, 2)),
+        "brillo": luminancia.mean(axis=(1, 2)),
+        "recorte": ((luminancia >= 250) | (luminancia <= 5)).mean(axis=(1, 2)),
+        "resolucion": np.array([min(tamano) for tamano in tamanos], dtype=np.float32),
+        "dominante": (medias_canal.max(axis=1) - medias_canal.min(axis=1)) / np.maximum(medias_canal.mean(axis=1), 1.0),
+    }
+
+
+class PoliticaPrepuntuacion:
+    """
+    Decide qué imágenes son claramente inutilizables a partir de sus métricas.
+
+    Una imagen se puntúa localmente si incumple al menos un criterio grave (desenfoque,
+    exposición, recorte o resolución). Su puntuación es 2 con un motivo, 1 con dos y 0
+    con tres o más. Las demás pasan a la revisión completa de Gemini.
+
+    Args:
+        nitidez_minima, brillo_minimo, brillo_maximo, recorte_maximo, resolucion_minima,
+        dominante_maxima: Umbrales (ver las constantes del módulo).
+    """
+
+    def __init__(self, nitidez_minima=NITIDEZ_MINIMA, brillo_minimo=BRILLO_MINIMO, brillo_maximo=BRILLO_MAXIMO,
+                 recorte_maximo=RECORTE_MAXIMO, resolucion_minima=RESOLUCION_MINIMA, dominante_maxima=DOMINANTE_MAXIMA):
+        self.nitidez_minima = nitidez_minima
+        self.brillo_minimo = brillo_minimo
+        self.brillo_maximo = brillo_maximo
+        self.recorte_maximo = recorte_maximo
+        self.resolucion_minima = resolucion_minima
+        self.dominante_maxima = dominante_maxima
+
+    def motivos(self, metricas):
+        """Devuelve, para cada imagen del lote, la lista de criterios que incumple."""
+        incumplidos = {
+            "desenfocada": metricas["nitidez"] < self.nitidez_minima,
+            "subexpuesta": metricas["brillo"] < self.brillo_minimo,
+            "sobreexpuesta": metricas["brillo"] > self.brillo_maximo,
+            "recortada": metricas["recorte"] > self.recorte_maximo,
+            "baja_resolucion": metricas["resolucion"] < self.resolucion_minima,
+            "dominante_de_color": metricas["dominante"] > self.dominante_maxima,
+        }
+        total = len(metricas["nitidez"])
+        return [[motivo for motivo, fallos in incumplidos.items() if fallos[i]] for i in range(total)]
+
+    def evaluar(self, metricas):
+        """
+        Aplica la política a un lote.
+
+        Returns:
+            list: Para cada imagen, (puntuación local 0-2, motivos) si es claramente
+                inutilizable, o (None, motivos) si debe revisarla Gemini.
+        """
+        resultados = []
+        for motivos in self.motivos(metricas):
+            if any(motivo in MOTIVOS_GRAVES for motivo in motivos):
+                resultados.append((max(0, 3 - len(motivos)), motivos))
+            else:
+                resultados.append((None, motivos))
+        return resultados
+
+
+def prepuntuar_lote(origenes, politica=None, lado=LADO_METRICAS):
+    """
+    Carga un lote de imágenes, calcula sus métricas y aplica la política.
+
+    Las imágenes que no se pueden decodificar se dejan para Gemini (que registrará el error).
+
+    Args:
+        origenes (list): Bytes o rutas de las imágenes.
+        politica (PoliticaPrepuntuacion, opcional): Política a aplicar (la de por defecto si no se indica).
+
+    Returns:
+        list: Para cada imagen, (puntuación local o None, motivos, métricas) con las
+            métricas como dict de floats (None si no se pudo decodificar).
+    """
+    politica = politica or PoliticaPrepuntuacion()
+    resultados = [(None, [], None)] * len(origenes)
+    matrices, tamanos, posiciones = [], [], []
+    for posicion, origen in enumerate(origenes):
+        try:
+            matriz, tamano = cargar_para_metricas(origen, lado)
+        except (OSError, ValueError):
+            continue
+        matrices.append(matriz)
+        tamanos.append(tamano)
+        posiciones.append(posicion)
+    if not matrices:
+        return resultados
+    metricas = metricas_lote(np.stack(matrices), tamanos)
+    for i, (puntuacion, motivos) in enumerate(politica.evaluar(metricas)):
+        resultados[posiciones[i]] = (puntuacion, motivos, {nombre: float(valores[i]) for nombre, valores in metricas.items()})
+    return resultados
+
+
+class EstadisticasPrepuntuacion:
+    """Cuenta las imágenes evaluadas y las puntuadas localmente (seguro entre hilos)."""
+
+    def __init__(self):
+        self.evaluadas = 0
+        self.locales = 0
+        self.motivos = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, puntuacion, motivos):
+        with self._lock:
+            self.evaluadas += 1
+            if puntuacion is not None:
+                self.locales += 1
+                for motivo in motivos:
+                    self.motivos[motivo] = self.motivos.get(motivo, 0) + 1
+
+    def resumen(self):
+        porcentaje = 100 * self.locales / self.evaluadas if self.evaluadas else 0
+        detalle = ", ".join(f"{motivo}: {cuenta}" for motivo, cuenta in sorted(self.motivos.items()))
+        return (f"Prepuntuación local: {self.locales} de {self.evaluadas} imágenes claramente inutilizables "
+                f"({porcentaje:.1f}%)" + (f" [{detalle}]" if detalle else ""))
@@ -0,0 +1,181 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Base de datos por defecto del registro de trabajos
+ARCHIVO_REGISTRO = "registro_trabajos.sqlite"
+MAX_INTENTOS_IMAGEN = 3 # A partir de aquí una imagen fallida ya no se reintenta en nuevas ejecuciones
+
+PENDIENTE = "pendiente"
+COMPLETADO = "completado"
+FALLIDO = "fallido"
+
+
+class RegistroTrabajos:
+    """
+    Registro persistente (SQLite) del progreso de una ejecución por lotes.
+
+    Cada anuncio y cada imagen son unidades de trabajo idempotentes con su estado
+    (pendiente, completado o fallido), el número de intentos y el resultado. Si el
+    proceso se interrumpe, la siguiente ejecución solo repite las unidades que no
+    terminaron o que fallaron. Es seguro para usarlo desde varios hilos.
+
+    Args:
+        ruta (str): Archivo SQLite del registro.
+        max_intentos_imagen (int): Intentos máximos por imagen antes de darla por perdida.
+    """
+
+    def __init__(self, ruta=ARCHIVO_REGISTRO, max_intentos_imagen=MAX_INTENTOS_IMAGEN):
+        self.ruta = ruta
+        self.max_intentos_imagen = max_intentos_imagen
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript(
+            "CREATE TABLE IF NOT EXISTS anuncios ("
+            " id_anuncio TEXT PRIMARY KEY,"
+            " hash_pagina TEXT NOT NULL,"
+            " estado TEXT NOT NULL,"
+            " intentos INTEGER NOT NULL DEFAULT 0,"
+            " informe TEXT,"
+            " actualizado REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS imagenes ("
+            " id_anuncio TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " indice INTEGER NOT NULL,"
+            " estado TEXT NOT NULL,"
+            " intentos INTEGER NOT NULL DEFAULT 0,"
+            " analisis TEXT,"
+            " puntuacion REAL,"
+            " descargada INTEGER,"
+            " error TEXT,"
+            " actualizado REAL NOT NULL,"
+            " datos TEXT,"
+            " modelo TEXT,"
+            " PRIMARY KEY (id_anuncio, url));"
+            "CREATE INDEX IF NOT EXISTS idx_imagenes_estado ON imagenes (estado);"
+        )
+        # Registros creados antes de guardar el análisis estructurado y el modelo de cada imagen
+        columnas = {fila[1] for fila in self._conexion.execute("PRAGMA table_info(imagenes)")}
+        for columna in ("datos", "modelo"):
+            if columna not in columnas:
+                self._conexion.execute(f"ALTER TABLE imagenes ADD COLUMN {columna} TEXT")
+        self._conexion.commit()
+
+    def anuncio_completado(self, id_anuncio, hash_pagina):
+        """Indica si el anuncio ya se completó con esta misma versión de la página."""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT estado FROM anuncios WHERE id_anuncio = ? AND hash_pagina = ?", (id_anuncio, hash_pagina)
+            ).fetchone()
+        return fila is not None and fila[0] == COMPLETADO
+
+    def iniciar_anuncio(self, id_anuncio, hash_pagina, urls):
+        """
+        Registra un anuncio y sus imágenes como unidades de trabajo.
+
+        Si la página ha cambiado desde la última vez, se descartan los resultados
+        anteriores de sus imágenes. Las imágenes ya completadas de la misma versión
+        se conservan, de modo que volver a llamar a este método es inocuo.
+        """
+        ahora = time.time()
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT hash_pagina FROM anuncios WHERE id_anuncio = ?", (id_anuncio,)
+            ).fetchone()
+            if fila is not None and fila[0] != hash_pagina:
+                self._conexion.execute("DELETE FROM imagenes WHERE id_anuncio = ?", (id_anuncio,))
+            self._conexion.execute(
+                "INSERT INTO anuncios (id_anuncio, hash_pagina, estado, intentos, actualizado)"
+                " VALUES (?, ?, ?, 1, ?)"
+                " ON CONFLICT (id_anuncio) DO UPDATE SET hash_pagina = excluded.hash_pagina,"
+                " estado = excluded.estado, intentos = intentos + 1, actualizado = excluded.actualizado",
+                (id_anuncio, hash_pagina, PENDIENTE, ahora),
+            )
+            self._conexion.executemany(
+                "INSERT OR IGNORE INTO imagenes (id_anuncio, url, indice, estado, actualizado) VALUES (?, ?, ?, ?, ?)",
+                [(id_anuncio, url, indice, PENDIENTE, ahora) for indice, url in enumerate(urls)],
+            )
+            self._conexion.commit()
+
+    def resultado_imagen(self, id_anuncio, url):
+        """
+        Devuelve el resultado guardado de una imagen que no hace falta repetir, o None.
+
+        Una imagen no se repite si está completada o si ya agotó sus intentos.
+
+        Returns:
+            dict | None: {"analysis", "general_rating", "downloaded", "error", "data", "model"};
+                "data" (análisis estructurado) y "model" son None si no se guardaron.
+        """
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT estado, intentos, analisis, puntuacion, descargada, error, datos, modelo FROM imagenes"
+                " WHERE id_anuncio = ? AND url = ?", (id_anuncio, url)
+            ).fetchone()
+        if fila is None or fila[2] is None:
+            return None
+        estado, intentos = fila[0], fila[1]
+        if estado == COMPLETADO or (estado == FALLIDO and intentos >= self.max_intentos_imagen):
+            return {"analysis": fila[2], "general_rating": fila[3], "downloaded": bool(fila[4]), "error": fila[5],
+                    "data": json.loads(fila[6]) if fila[6] else None, "model": fila[7]}
+        return None
+
+    def completar_imagen(self, id_anuncio, url, analisis, puntuacion, descargada=True, datos=None, modelo=None):
+        """
+        Marca una imagen como completada y guarda su resultado.
+
+        `datos` es el análisis estructurado y `modelo` el modelo que lo hizo, si no es el
+        del anuncio (p. ej. la prepuntuación local).
+        """
+        self._actualizar_imagen(id_anuncio, url, COMPLETADO, analisis, puntuacion, descargada, None, datos, modelo)
+
+    def fallar_imagen(self, id_anuncio, url, error, analisis=None, puntuacion=0, descargada=False):
+        """Marca una imagen como fallida; se reintentará mientras no agote sus intentos."""
+        self._actualizar_imagen(id_anuncio, url, FALLIDO, analisis, puntuacion, descargada, str(error))
+
+    def _actualizar_imagen(self, id_anuncio, url, estado, analisis, puntuacion, descargada, error, datos=None, modelo=None):
+        datos = json.dumps(datos, ensure_ascii=False) if datos is not None else None
+        with self._lock:
+            self._conexion.execute(
+                "UPDATE imagenes SET estado = ?, intentos = intentos + 1, analisis = ?, puntuacion = ?,"
+                " descargada = ?, error = ?, datos = ?, modelo = ?, actualizado = ? WHERE id_anuncio = ? AND url = ?",
+                (estado, analisis, puntuacion, int(descargada), error, datos, modelo, time.time(), id_anuncio, url),
+            )
+            self._conexion.commit()
+
+    def finalizar_anuncio(self, id_anuncio, informe):
+        """
+        Cierra un anuncio tras escribir su informe.
+
+        Queda completado solo si ninguna de sus imágenes tiene que repetirse; si no,
+        sigue pendiente y la próxima ejecución retoma únicamente las imágenes fallidas.
+
+        Returns:
+            bool: True si el anuncio quedó completado.
+        """
+        with self._lock:
+            por_repetir = self._conexion.execute(
+                "SELECT COUNT(*) FROM imagenes WHERE id_anuncio = ? AND (estado = ? OR (estado = ? AND intentos < ?))",
+                (id_anuncio, PENDIENTE, FALLIDO, self.max_intentos_imagen),
+            ).fetchone()[0]
+            estado = COMPLETADO if por_repetir == 0 else PENDIENTE
+            self._conexion.execute(
+                "UPDATE anuncios SET estado = ?, informe = ?, actualizado = ? WHERE id_anuncio = ?",
+                (estado, informe, time.time(), id_anuncio),
+            )
+            self._conexion.commit()
+        return estado == COMPLETADO
+
+    def resumen(self):
+        """Texto con el número de anuncios e imágenes en cada estado."""
+        with self._lock:
+            anuncios = dict(self._conexion.execute("SELECT estado, COUNT(*) FROM anuncios GROUP BY estado").fetchall())
+            imagenes = dict(self._conexion.execute("SELECT estado, COUNT(*) FROM imagenes GROUP BY estado").fetchall())
+        formato = lambda cuentas: ", ".join(f"{cuentas.get(e, 0)} {e}s" for e in (COMPLETADO, PENDIENTE, FALLIDO))
+        return f"Registro de trabajos: anuncios: {formato(anuncios)}; imágenes: {formato(imagenes)}."
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+
+import almacen_resultados
+from almacen_resultados import AlmacenResultados
+
+
+def imagen(indice, puntuacion, **extra):
+    return {
+        "indice": indice,
+        "url": f"https://img.example.com/{indice}.jpg",
+        "texto": f"Imagen {indice + 1}:\nDescripción del Plano y Composición: Plano lateral.\n"
+                 f"Evaluación Cualitativa:\nPuntuación Individual (0-10): {puntuacion}/10",
+        "puntuacion": puntuacion,
+        "descargada": True,
+        **extra,
+    }
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """Fecha de guardado controlada: fusionar se queda con la versión más reciente."""
+    instante = [1_700_000_000.0]
+    monkeypatch.setattr(almacen_resultados.time, "time", lambda: instante[0])
+    return instante
+
+
+def abrir(tmp_path, nombre):
+    return AlmacenResultados(str(tmp_path / nombre))
+
+
+def test_guardar_y_leer_un_anuncio(tmp_path):
+    with abrir(tmp_path, "r.sqlite") as almacen:
+        almacen.guardar_anuncio("1", "https://anuncio/1", [imagen(1, 4), imagen(0, 8)],
+                                metadatos={"marca": "Seat"}, modelo_ia="gemini")
+        imagenes = almacen.imagenes_anuncio("1")
+        assert [img["indice"] for img in imagenes] == [0, 1]
+        # Sin "datos", el análisis estructurado se obtiene del texto
+        assert imagenes[0]["datos"]["plano"] == "lateral"
+        anuncio = almacen.anuncio("1")
+        assert anuncio["marca"] == "Seat" and anuncio["puntuacion_media"] == 6
+
+
+def test_la_media_no_cuenta_las_imagenes_con_error(tmp_path):
+    with abrir(tmp_path, "r.sqlite") as almacen:
+        almacen.guardar_anuncio("1", "u", [imagen(0, 8), imagen(1, 0, error="No se pudo descargar")])
+        assert almacen.anuncio("1")["puntuacion_media"] == 8
+        assert [g["imagenes"] for g in almacen.agregados("flota")] == [1]
+        assert [g["imagenes"] for g in almacen.agregados("flota", incluir_errores=True)] == [2]
+
+
+def test_modelo_por_imagen(tmp_path):
+    with abrir(tmp_path, "r.sqlite") as almacen:
+        almacen.guardar_anuncio("1", "u", [imagen(0, 8), imagen(1, 1, modelo_ia="prepuntuacion-local")],
+                                modelo_ia="gemini")
+        grupos = {g["grupo"]: g["imagenes"] for g in almacen.agregados("modelo_ia")}
+        assert grupos == {"gemini": 1, "prepuntuacion-local": 1}
+
+
+def test_fusionar_copia_los_anuncios_que_faltan_y_es_idempotente(tmp_path, reloj):
+    with abrir(tmp_path, "a.sqlite") as a, abrir(tmp_path, "b.sqlite") as b:
+        a.guardar_anuncio("1", "u1", [imagen(0, 5)])
+        b.guardar_anuncio("2", "u2", [imagen(0, 7), imagen(1, 9)])
+        assert a.fusionar(b.ruta) == 1
+        assert a.fusionar(b.ruta) == 0
+        assert a.ids_anuncios() == ["1", "2"]
+        assert [img["puntuacion"] for img in a.imagenes_anuncio("2")] == [7, 9]
+
+
+def test_fusionar_se_queda_con_la_version_mas_reciente(tmp_path, reloj):
+    with abrir(tmp_path, "a.sqlite") as a, abrir(tmp_path, "b.sqlite") as b:
+        b.guardar_anuncio("1", "u", [imagen(0, 3), imagen(1, 3)])
+        reloj[0] += 60
+        a.guardar_anuncio("1", "u", [imagen(0, 9)])
+        assert a.fusionar(b.ruta) == 0 # La de `a` es más reciente
+        assert [img["puntuacion"] for img in a.imagenes_anuncio("1")] == [9]
+
+        reloj[0] += 60
+        b.guardar_anuncio("1", "u", [imagen(0, 6), imagen(1, 6)])
+        assert a.fusionar(b.ruta) == 1
+        # Se sustituyen todas las imágenes del anuncio, no solo las que coinciden
+        assert [img["puntuacion"] for img in a.imagenes_anuncio("1")] == [6, 6]
+
+
+def test_fusionar_un_almacen_inexistente(tmp_path):
+    with abrir(tmp_path, "a.sqlite") as a:
+        with pytest.raises(FileNotFoundError):
+            a.fusionar(str(tmp_path / "no-existe.sqlite"))
+
+
+def test_tras_una_fusion_fallida_se_puede_volver_a_fusionar(tmp_path):
+    with abrir(tmp_path, "a.sqlite") as a, abrir(tmp_path, "b.sqlite") as b, abrir(tmp_path, "c.sqlite") as c:
+        b.guardar_anuncio("1", "u", [imagen(0, 7)])
+        c.guardar_anuncio("2", "u", [imagen(0, 5)])
+    # Un esquema incompatible hace fallar la copia de las imágenes, a mitad de la fusión
+    conexion = sqlite3.connect(str(tmp_path / "c.sqlite"))
+    conexion.execute("ALTER TABLE imagenes ADD COLUMN sobrante TEXT")
+    conexion.commit()
+    conexion.close()
+    with abrir(tmp_path, "a.sqlite") as a:
+        with pytest.raises(sqlite3.OperationalError):
+            a.fusionar(str(tmp_path / "c.sqlite"))
+        assert a.ids_anuncios() == [] # La transacción se deshizo
+        assert a.fusionar(str(tmp_path / "b.sqlite")) == 1
+        assert a.ids_anuncios() == ["1"]
@@ -0,0 +1,88 @@
+import io
+import random
+
+import pytest
+
+import Analisis_de_Imagenes as analisis
+from benchmark import _imagen_sintetica
+from motor_analisis import ModeloFalso
+
+
+def lookup(content_hash, perceptual_hash=None):
+    return analisis.CacheLookup("clave-" + content_hash, content_hash, perceptual_hash)
+
+
+def test_agrupa_copias_exactas_y_casi_identicas():
+    lookups = [
+        lookup("a", 0b0000),
+        lookup("b", 0b0011),          # A 2 bits de "a"
+        lookup("c", (1 << 64) - 1),   # Muy distinta
+        lookup("a", None),            # Copia exacta de "a" (sin hash perceptual)
+        lookup("d", (1 << 64) - 2),   # Casi idéntica a "c"
+    ]
+    assert analisis.group_near_duplicates(lookups, range(5)) == {0: [1, 3], 2: [4]}
+
+
+def test_solo_agrupa_las_posiciones_pendientes():
+    lookups = [lookup("a", 0), lookup("b", 0), lookup("c", 0)]
+    assert analisis.group_near_duplicates(lookups, [1, 2]) == {1: [2]}
+
+
+def test_sin_cache_no_agrupa():
+    lookups = [analisis.CacheLookup() for _ in range(3)]
+    assert analisis.group_near_duplicates(lookups, range(3)) == {0: [], 1: [], 2: []}
+
+
+def test_respeta_la_distancia_maxima(monkeypatch):
+    monkeypatch.setattr(analisis, "NEAR_DUPLICATE_MAX_DISTANCE", 1)
+    lookups = [lookup("a", 0b0000), lookup("b", 0b0011)]
+    assert analisis.group_near_duplicates(lookups, range(2)) == {0: [], 1: []}
+
+
+@pytest.fixture
+def modelo(tmp_path, monkeypatch):
+    """Analizador con caché e índice temporales y el modelo falso en lugar de Gemini."""
+    monkeypatch.setattr(analisis, "ANALYSIS_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(analisis, "NEAR_DUPLICATE_INDEX_PATH", str(tmp_path / "indice.sqlite"))
+    monkeypatch.setattr(analisis, "GEMINI_RPM", 1_000_000)
+    monkeypatch.setattr(analisis, "_quota_limiter", None)
+    modelo = ModeloFalso(semilla=1)
+    analisis.set_model_backend(modelo)
+    yield modelo
+    analisis.close_analysis_cache()
+    analisis.close_near_duplicate_index()
+    analisis.set_model_backend(None)
+
+
+def jpeg(semilla, calidad=90):
+    from PIL import Image
+    salida = io.BytesIO()
+    Image.open(io.BytesIO(_imagen_sintetica(random.Random(semilla), 256))).save(salida, "JPEG", quality=calidad)
+    return salida.getvalue()
+
+
+@pytest.mark.parametrize("estructurado", [True, False])
+def test_lote_envia_una_imagen_por_grupo_de_casi_identicas(modelo, monkeypatch, estructurado):
+    monkeypatch.setattr(analisis, "STRUCTURED_OUTPUT", estructurado)
+    imagenes = [
+        (jpeg(1), "https://img/1.jpg", 1),
+        (jpeg(1, calidad=70), "https://img/2.jpg", 2), # Misma foto recomprimida
+        (jpeg(2), "https://img/3.jpg", 3),
+        (jpeg(1), "https://img/4.jpg", 4),             # Copia exacta de la primera
+    ]
+    resultados = analisis.analyze_image_batch(imagenes)
+    assert modelo.llamadas == 1
+    assert [texto.splitlines()[0] for texto, _, _ in resultados] == ["Imagen 1:", "Imagen 2:", "Imagen 3:", "Imagen 4:"]
+    assert resultados[1][1] == resultados[3][1] == resultados[0][1]
+
+    # Las copias quedan en la caché con su propia clave: la segunda vez no se llama al modelo
+    assert [r[1] for r in analisis.analyze_image_batch(imagenes)] == [r[1] for r in resultados]
+    assert modelo.llamadas == 1
+
+
+def test_si_falla_la_imagen_enviada_fallan_sus_copias(modelo, monkeypatch):
+    modelo.tasa_errores = 1.0
+    monkeypatch.setattr(analisis, "llamar_con_reintentos", lambda funcion, **opciones: funcion())
+    resultados = analisis.analyze_image_batch([(jpeg(1), "u1", 1), (jpeg(1, calidad=70), "u2", 2)])
+    assert all(isinstance(resultado, Exception) for resultado in resultados)
+    assert modelo.llamadas == 1
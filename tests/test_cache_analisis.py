@@ -0,0 +1,66 @@
+import cache_analisis
+from cache_analisis import CacheAnalisis, clave_analisis, hash_imagen
+
+
+def test_hash_imagen_igual_desde_bytes_y_desde_archivo(tmp_path):
+    ruta = tmp_path / "foto.jpg"
+    ruta.write_bytes(b"contenido de la foto")
+    assert hash_imagen(b"contenido de la foto") == hash_imagen(str(ruta))
+
+
+def test_clave_cambia_con_el_modelo_y_el_prompt():
+    clave = clave_analisis("imagen", "modelo", "prompt")
+    assert clave != clave_analisis("imagen", "otro-modelo", "prompt")
+    assert clave != clave_analisis("imagen", "modelo", "otro-prompt")
+
+
+def test_guardar_y_obtener_cuenta_aciertos_y_fallos(tmp_path):
+    cache = CacheAnalisis(str(tmp_path / "cache.sqlite"))
+    assert cache.obtener("clave") is None
+    cache.guardar("clave", "Imagen 1: ...", 7.5)
+    assert cache.obtener("clave") == ("Imagen 1: ...", 7.5)
+    assert (cache.aciertos, cache.fallos) == (1, 1)
+    cache.cerrar()
+
+
+def test_sondeo_sin_registrar_no_altera_el_resumen(tmp_path):
+    cache = CacheAnalisis(str(tmp_path / "cache.sqlite"))
+    cache.guardar("clave", "texto", 5)
+    assert cache.obtener("clave", registrar=False) == ("texto", 5)
+    assert cache.obtener("otra", registrar=False) is None
+    assert (cache.aciertos, cache.fallos) == (0, 0)
+    cache.cerrar()
+
+
+def test_persiste_entre_aperturas(tmp_path):
+    ruta = str(tmp_path / "cache.sqlite")
+    cache = CacheAnalisis(ruta)
+    cache.guardar("clave", "texto", 6)
+    cache.cerrar()
+    cache = CacheAnalisis(ruta)
+    assert cache.obtener("clave") == ("texto", 6)
+    cache.cerrar()
+
+
+def test_entradas_caducadas_no_se_devuelven(tmp_path, monkeypatch):
+    cache = CacheAnalisis(str(tmp_path / "cache.sqlite"), max_edad_dias=1)
+    ahora = 1_000_000.0
+    monkeypatch.setattr(cache_analisis.time, "time", lambda: ahora)
+    cache.guardar("clave", "texto", 6)
+    ahora += 2 * 24 * 3600
+    assert cache.obtener("clave") is None
+    assert cache.expulsar() == 1
+    cache.cerrar()
+
+
+def test_expulsa_las_menos_usadas_recientemente(tmp_path, monkeypatch):
+    cache = CacheAnalisis(str(tmp_path / "cache.sqlite"), max_entradas=2)
+    reloj = iter(range(1_000_000, 1_000_100))
+    monkeypatch.setattr(cache_analisis.time, "time", lambda: float(next(reloj)))
+    for clave in ("a", "b", "c"):
+        cache.guardar(clave, clave, 5)
+    cache.obtener("a") # "b" queda como la menos usada
+    assert cache.expulsar() == 1
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") is not None and cache.obtener("c") is not None
+    cache.cerrar()
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from esquema_analisis import secciones_json_por_imagen, secciones_texto_por_imagen
+
+
+def analisis(imagen, puntuacion=7):
+    return {"imagen": imagen, "plano": "lateral", "descripcion": "Plano lateral.", "puntos_fuertes": [],
+            "areas_mejora": [], "sugerencias": [], "puntuacion": puntuacion, "justificacion": "Correcta."}
+
+
+def test_json_separa_un_analisis_por_imagen():
+    secciones = secciones_json_por_imagen(json.dumps([analisis(1, 6), analisis(2, 8)]))
+    assert sorted(secciones) == [1, 2]
+    assert json.loads(secciones[2])["puntuacion"] == 8
+
+
+def test_json_descarta_los_objetos_mal_formados():
+    respuesta = json.dumps([
+        analisis(1),
+        analisis(2, puntuacion="alta"),  # Puntuación no numérica
+        {**analisis(3), "imagen": None}, # Sin número de imagen
+        "texto suelto",
+        analisis("4", puntuacion="5.5"), # Números como texto: se aceptan
+    ])
+    assert sorted(secciones_json_por_imagen(respuesta)) == [1, 4]
+
+
+def test_json_admite_bloque_de_codigo_y_un_objeto_suelto():
+    assert list(secciones_json_por_imagen("```json\n" + json.dumps(analisis(3)) + "\n```")) == [3]
+
+
+def test_json_se_queda_con_el_primer_analisis_repetido():
+    secciones = secciones_json_por_imagen(json.dumps([analisis(1, 2), analisis(1, 9)]))
+    assert json.loads(secciones[1])["puntuacion"] == 2
+
+
+def test_json_invalido_lanza_value_error():
+    with pytest.raises(ValueError):
+        secciones_json_por_imagen("Imagen 1: esto no es JSON")
+
+
+def seccion_texto(numero, puntuacion="7/10"):
+    return (f"Imagen {numero}:\nDescripción del Plano y Composición: Frontal.\nEvaluación Cualitativa:\n"
+            f"Puntos Fuertes: Buena luz.\nPuntuación Individual (0-10): {puntuacion}\nJustificación: Correcta.")
+
+
+def test_texto_separa_las_secciones_por_imagen():
+    respuesta = "Aquí tienes los análisis:\n\n" + "\n\n".join(seccion_texto(n) for n in (1, 2, 3))
+    secciones = secciones_texto_por_imagen(respuesta)
+    assert sorted(secciones) == [1, 2, 3]
+    assert secciones[2].startswith("Imagen 2:") and "Imagen 3" not in secciones[2]
+
+
+def test_texto_descarta_las_secciones_sin_puntuacion():
+    respuesta = seccion_texto(1) + "\n\nImagen 2:\nDescripción del Plano y Composición: Cortada..."
+    assert sorted(secciones_texto_por_imagen(respuesta)) == [1]
+
+
+def test_texto_no_confunde_menciones_dentro_de_una_seccion():
+    respuesta = seccion_texto(1).replace("Buena luz.", "Mejor que la Imagen 2: más nítida.") + "\n" + seccion_texto(2)
+    secciones = secciones_texto_por_imagen(respuesta)
+    assert sorted(secciones) == [1, 2]
+    assert "más nítida" in secciones[1]
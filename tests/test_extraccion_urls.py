@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+import extraccion_urls
+from extraccion_urls import MOTORES, extraer_metadatos, extraer_urls, motor_disponible
+
+PAGINA = """<html><head>
+<script type="application/ld+json">{"@type": "Car", "brand": {"@type": "Brand", "name": "Seat"},
+ "model": "Le\\u00f3n", "offers": {"seller": {"@type": "AutoDealer", "name": "Coches Ñandú"}}}</script>
+</head><body>
+<img class="lazyload" data-src="https://img.example.com/1.jpg">
+<img class="foto lazyload grande" data-src="https://img.example.com/2.jpg"/>
+<img class="lazyload" data-src="/relativa.jpg">
+<img class="logo" data-src="https://img.example.com/logo.jpg">
+<img class="lazyload" src="https://img.example.com/sin-data-src.jpg">
+<img class="lazyload" data-src="https://img.example.com/1.jpg">
+<p>Descripción con acentos: ñ, á, €</p>
+<img class="lazyload" data-src="https://img.example.com/3.jpg">
+</body></html>"""
+
+ESPERADAS = ["https://img.example.com/1.jpg", "https://img.example.com/2.jpg", "https://img.example.com/3.jpg"]
+
+MOTORES_DISPONIBLES = [motor for motor in MOTORES if motor_disponible(motor)]
+
+
+@pytest.mark.parametrize("motor", MOTORES_DISPONIBLES)
+def test_todos_los_motores_extraen_las_mismas_urls(motor):
+    assert extraer_urls(PAGINA, motor) == ESPERADAS
+
+
+@pytest.mark.parametrize("motor", MOTORES_DISPONIBLES)
+def test_acepta_bytes_y_flujos(motor):
+    assert extraer_urls(PAGINA.encode("utf-8"), motor) == ESPERADAS
+    assert extraer_urls(io.BytesIO(PAGINA.encode("utf-8")), motor) == ESPERADAS
+
+
+def test_streaming_con_bloques_que_cortan_etiquetas_y_caracteres(monkeypatch):
+    # Bloques de 7 bytes: se cortan etiquetas, atributos y caracteres UTF-8 de varios bytes
+    monkeypatch.setattr(extraccion_urls, "TAMANO_BLOQUE", 7)
+    assert extraer_urls(io.BytesIO(PAGINA.encode("utf-8")), "streaming") == ESPERADAS
+
+
+def test_extraer_metadatos_del_json_ld():
+    assert extraer_metadatos(PAGINA) == {"concesionario": "Coches Ñandú", "marca": "Seat", "modelo": "León"}
+
+
+def test_extraer_metadatos_con_campos_entre_bloques(monkeypatch):
+    monkeypatch.setattr(extraccion_urls, "TAMANO_BLOQUE", 16)
+    assert extraer_metadatos(io.BytesIO(PAGINA.encode("utf-8")))["concesionario"] == "Coches Ñandú"
+
+
+def test_extraer_metadatos_sin_json_ld():
+    assert extraer_metadatos("<html><body>Sin datos</body></html>") == {
+        "concesionario": None, "marca": None, "modelo": None}
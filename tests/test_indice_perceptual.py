@@ -0,0 +1,92 @@
+import io
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from indice_perceptual import IndiceHamming, IndicePerceptual, distancia_hamming, hash_perceptual
+
+
+def voltear_bits(hash_, posiciones):
+    for posicion in posiciones:
+        hash_ ^= 1 << posicion
+    return hash_
+
+
+def test_distancia_hamming():
+    assert distancia_hamming(0, 0) == 0
+    assert distancia_hamming(0b1011, 0b0001) == 2
+    assert distancia_hamming(0, (1 << 64) - 1) == 64
+
+
+@pytest.mark.parametrize("radio", [0, 3, 4, 8, 12])
+def test_buscar_devuelve_lo_mismo_que_la_fuerza_bruta(radio):
+    aleatorio = random.Random(radio)
+    indice = IndiceHamming()
+    hashes = []
+    for valor in range(2000):
+        if hashes and aleatorio.random() < 0.5:
+            # Variantes cercanas de hashes ya indexados, con los bits cambiados en cualquier bloque
+            hash_ = voltear_bits(aleatorio.choice(hashes), aleatorio.sample(range(64), aleatorio.randint(0, 14)))
+        else:
+            hash_ = aleatorio.getrandbits(64)
+        hashes.append(hash_)
+        indice.anadir(hash_, valor)
+    for consulta in aleatorio.sample(hashes, 50) + [aleatorio.getrandbits(64) for _ in range(10)]:
+        esperado = sorted((distancia_hamming(consulta, h), v) for v, h in enumerate(hashes)
+                          if distancia_hamming(consulta, h) <= radio)
+        encontrado = indice.buscar(consulta, radio)
+        assert sorted(encontrado) == esperado
+        assert [d for d, _ in encontrado] == sorted(d for d, _ in encontrado)
+
+
+def test_buscar_encuentra_diferencias_concentradas_en_un_bloque():
+    # 8 bits distintos dentro del mismo trozo de 16: los otros tres trozos coinciden
+    indice = IndiceHamming()
+    indice.anadir(0, "original")
+    assert indice.buscar(voltear_bits(0, range(8)), 8) == [(8, "original")]
+    # Y repartidos en los cuatro trozos (2 por trozo): ninguno coincide exactamente
+    assert indice.buscar(voltear_bits(0, [0, 1, 16, 17, 32, 33, 48, 49]), 8) == [(8, "original")]
+    assert indice.buscar(voltear_bits(0, range(9)), 8) == []
+
+
+def jpeg(img, calidad=90):
+    salida = io.BytesIO()
+    img.save(salida, "JPEG", quality=calidad)
+    return salida.getvalue()
+
+
+def foto(semilla):
+    aleatorio = np.random.default_rng(semilla)
+    bloques = aleatorio.integers(0, 255, size=(8, 8, 3), dtype=np.uint8)
+    return Image.fromarray(bloques).resize((320, 240), Image.BILINEAR)
+
+
+@pytest.mark.parametrize("algoritmo", ["phash", "dhash"])
+def test_hash_perceptual_tolera_recompresion_y_distingue_fotos(algoritmo):
+    original = hash_perceptual(jpeg(foto(1)), algoritmo)
+    recomprimida = hash_perceptual(jpeg(foto(1).resize((160, 120)), calidad=50), algoritmo)
+    otra = hash_perceptual(jpeg(foto(2)), algoritmo)
+    assert distancia_hamming(original, recomprimida) <= 8
+    assert distancia_hamming(original, otra) > 8
+
+
+def test_indice_perceptual_persiste_y_no_duplica(tmp_path):
+    ruta = str(tmp_path / "indice.sqlite")
+    indice = IndicePerceptual(ruta)
+    hash_alto = (1 << 63) | 5 # Se guarda con signo en SQLite
+    indice.anadir(hash_alto, "contenido-a")
+    indice.anadir(hash_alto, "contenido-a")
+    assert len(indice) == 1
+    indice.cerrar()
+    indice = IndicePerceptual(ruta)
+    assert indice.buscar(voltear_bits(hash_alto, [2]), 8) == [(1, "contenido-a")]
+    indice.cerrar()
+
+
+def test_indice_perceptual_rechaza_otro_algoritmo(tmp_path):
+    ruta = str(tmp_path / "indice.sqlite")
+    IndicePerceptual(ruta, "phash").cerrar()
+    with pytest.raises(ValueError):
+        IndicePerceptual(ruta, "dhash")
@@ -0,0 +1,135 @@
+import pytest
+
+import motor_analisis
+from motor_analisis import ErrorModelo, LimitadorCuota, es_reintentable, llamar_con_reintentos
+
+
+class RelojFalso:
+    """Sustituye time.monotonic y time.sleep: dormir solo avanza el reloj."""
+
+    def __init__(self):
+        self.ahora = 1000.0
+        self.dormido = 0.0
+
+    def monotonic(self):
+        return self.ahora
+
+    def sleep(self, segundos):
+        self.ahora += segundos
+        self.dormido += segundos
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = RelojFalso()
+    monkeypatch.setattr(motor_analisis.time, "monotonic", reloj.monotonic)
+    monkeypatch.setattr(motor_analisis.time, "sleep", reloj.sleep)
+    return reloj
+
+
+def test_limitador_permite_la_rafaga_y_luego_espacia(reloj):
+    limitador = LimitadorCuota(peticiones_por_minuto=60, tokens_por_minuto=1_000_000)
+    for _ in range(60):
+        limitador.adquirir()
+    assert reloj.dormido == 0
+    limitador.adquirir()
+    assert reloj.dormido == pytest.approx(1.0, abs=0.02)
+
+
+def test_limitador_con_cuota_menor_que_una_peticion_no_se_bloquea(reloj):
+    limitador = LimitadorCuota(peticiones_por_minuto=0.5, tokens_por_minuto=1_000_000)
+    limitador.adquirir()
+    assert reloj.dormido == 0
+    limitador.adquirir()
+    assert reloj.dormido == pytest.approx(120, abs=0.1)
+
+
+def test_limitador_recorta_estimaciones_mayores_que_la_cuota_de_tokens(reloj):
+    limitador = LimitadorCuota(peticiones_por_minuto=60, tokens_por_minuto=1000)
+    limitador.adquirir(5000)
+    limitador.adquirir(5000)
+    assert reloj.dormido == pytest.approx(60, abs=0.1)
+
+
+def test_limitador_espera_por_tokens(reloj):
+    limitador = LimitadorCuota(peticiones_por_minuto=1000, tokens_por_minuto=600)
+    limitador.adquirir(600)
+    limitador.adquirir(60)
+    assert reloj.dormido == pytest.approx(6, abs=0.1)
+
+
+def test_ajustar_tokens_devuelve_los_sobrantes(reloj):
+    limitador = LimitadorCuota(peticiones_por_minuto=1000, tokens_por_minuto=600)
+    limitador.adquirir(600)
+    limitador.ajustar_tokens(-300) # Se usaron 300 tokens menos de los estimados
+    limitador.adquirir(300)
+    assert reloj.dormido == 0
+
+
+class ErrorGoogle(Exception):
+    """Imita google.api_core.exceptions.GoogleAPICallError, que expone `code`."""
+
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+@pytest.mark.parametrize("error, esperado", [
+    (ErrorModelo("cuota", codigo=429), True),
+    (ErrorModelo("servidor", codigo=503), True),
+    (ErrorModelo("petición mal formada", codigo=400), False),
+    (ErrorModelo("sin código"), False),
+    (ErrorGoogle(500), True),
+    (ErrorGoogle(404), False),
+    (ResourceExhausted("cuota agotada"), True),
+    (ValueError("respuesta mal formada"), False),
+])
+def test_es_reintentable(error, esperado):
+    assert es_reintentable(error) is esperado
+
+
+def test_es_reintentable_ignora_code_si_es_un_metodo():
+    class ErrorGrpc(Exception):
+        def code(self):
+            return 14
+    assert es_reintentable(ErrorGrpc()) is False
+
+
+def test_llamar_con_reintentos_reintenta_solo_los_errores_transitorios(reloj):
+    errores = [ErrorModelo("cuota", codigo=429), ErrorModelo("servidor", codigo=503)]
+
+    def funcion():
+        if errores:
+            raise errores.pop(0)
+        return "ok"
+
+    assert llamar_con_reintentos(funcion, max_intentos=3, espera_base=1) == "ok"
+    assert 1.5 <= reloj.dormido <= 3
+
+
+def test_llamar_con_reintentos_propaga_los_errores_permanentes(reloj):
+    llamadas = []
+
+    def funcion():
+        llamadas.append(1)
+        raise ErrorModelo("petición mal formada", codigo=400)
+
+    with pytest.raises(ErrorModelo):
+        llamar_con_reintentos(funcion, max_intentos=5, espera_base=1)
+    assert len(llamadas) == 1
+
+
+def test_llamar_con_reintentos_se_rinde_tras_el_ultimo_intento(reloj):
+    llamadas = []
+
+    def funcion():
+        llamadas.append(1)
+        raise ErrorModelo("cuota", codigo=429)
+
+    with pytest.raises(ErrorModelo):
+        llamar_con_reintentos(funcion, max_intentos=3, espera_base=1)
+    assert len(llamadas) == 3
@@ -0,0 +1,60 @@
+import io
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from prepuntuacion import PoliticaPrepuntuacion, prepuntuar_lote
+
+
+def jpeg(matriz):
+    salida = io.BytesIO()
+    Image.fromarray(matriz.astype(np.uint8)).save(salida, "JPEG", quality=92)
+    return salida.getvalue()
+
+
+def foto_buena(ancho=640, alto=480, semilla=0):
+    """Textura con detalle, exposición media y colores equilibrados."""
+    aleatorio = np.random.default_rng(semilla)
+    return aleatorio.integers(60, 200, size=(alto, ancho, 3))
+
+
+def test_una_foto_correcta_pasa_a_gemini():
+    (puntuacion, motivos, metricas), = prepuntuar_lote([jpeg(foto_buena())])
+    assert puntuacion is None and motivos == []
+    assert set(metricas) == {"nitidez", "brillo", "recorte", "resolucion", "dominante"}
+
+
+def test_detecta_cada_defecto_grave():
+    desenfocada = np.asarray(Image.fromarray(foto_buena().astype(np.uint8)).filter(ImageFilter.GaussianBlur(12)))
+    lote = [
+        jpeg(desenfocada),
+        jpeg(foto_buena() * 0.1),              # subexpuesta
+        jpeg(np.full((480, 640, 3), 252)),     # sobreexpuesta y quemada
+        jpeg(foto_buena(200, 150)),            # baja resolución
+    ]
+    resultados = prepuntuar_lote(lote)
+    assert "desenfocada" in resultados[0][1]
+    assert "subexpuesta" in resultados[1][1]
+    assert {"sobreexpuesta", "recortada"} <= set(resultados[2][1])
+    assert resultados[3][1] == ["baja_resolucion"]
+    assert all(puntuacion is not None for puntuacion, _, _ in resultados)
+
+
+def test_puntuacion_segun_el_numero_de_motivos():
+    politica = PoliticaPrepuntuacion()
+    metricas = {
+        "nitidez": np.array([100.0, 1.0, 1.0, 1.0, 100.0]),
+        "brillo": np.array([120.0, 120.0, 10.0, 10.0, 120.0]),
+        "recorte": np.array([0.0, 0.0, 0.0, 0.9, 0.0]),
+        "resolucion": np.array([1000.0, 1000.0, 1000.0, 1000.0, 1000.0]),
+        "dominante": np.array([0.1, 0.1, 0.1, 0.1, 0.9]),
+    }
+    puntuaciones = [puntuacion for puntuacion, _ in politica.evaluar(metricas)]
+    # La dominante de color sola no descarta la foto (puede ser el color del coche)
+    assert puntuaciones == [None, 2, 1, 0, None]
+
+
+def test_las_imagenes_que_no_se_decodifican_se_dejan_para_gemini():
+    resultados = prepuntuar_lote([b"no es una imagen", jpeg(foto_buena())])
+    assert resultados[0] == (None, [], None)
+    assert resultados[1][2] is not None
@@ -1,26 +1,158 @@
 import requests
 import os
+import threading
 import time # Importa la librería time para añadir pausas
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from almacen_paginas import DIRECTORIO_ALMACEN, AlmacenPaginas, extraer_id_anuncio
+from cache_paginas import CachePaginas, hash_contenido
+from fragmentos import Fragmento
+from metricas import INTERVALO_PERFILADOR, contar, instrumentar, medir
 
-def descargar_pagina(url, nombre_archivo, max_intentos=3, retardo_reintento=5):
+# --- Configuración de la descarga concurrente ---
+MAX_CONCURRENCIA = 4 # Número máximo de peticiones en vuelo a la vez
+# Ritmo sostenido por host. Con un solo sitio es el techo real de la descarga: a 0.5 (la antigua
+# pausa de 2 segundos) subir MAX_CONCURRENCIA no acelera nada. 2 peticiones/s sigue siendo un ritmo
+# amable para un portal de anuncios; por encima de ~5 aumentan los 429 y el riesgo de bloqueo.
+PETICIONES_POR_SEGUNDO_POR_HOST = 2.0
+# Peticiones que se permiten seguidas antes de aplicar el límite. Con None, MAX_CONCURRENCIA:
+# cada hilo puede lanzar su primera petición sin esperar a los demás.
+RAFAGA_POR_HOST = None
+
+# Métricas de cada ejecución (tiempos de petición y de espera, códigos HTTP, reintentos, bytes).
+# Con None se desactiva cada salida; ver metricas.py
+ARCHIVO_METRICAS = "metricas_descarga.json"
+ARCHIVO_METRICAS_PROMETHEUS = None
+PUERTO_METRICAS = None # Sirve /metrics mientras dura la descarga
+ARCHIVO_PERFIL = None # Perfil de muestreo en formato "collapsed"
+INTERVALO_PERFIL = INTERVALO_PERFILADOR
+
+# Archivo con las URLs de los anuncios a descargar (una por línea)
+ARCHIVO_URLS = "urls_anuncios.txt"
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+class LimitadorPorHost:
+    """
+    Limitador de tipo "token bucket" independiente para cada host.
+
+    Cada host dispone de un cubo que se rellena a `peticiones_por_segundo` fichas
+    por segundo hasta un máximo de `rafaga`. Cada petición consume una ficha; si
+    no quedan, el hilo espera lo justo hasta que haya una disponible.
+
+    Args:
+        peticiones_por_segundo (float, opcional): Ritmo sostenido permitido por host
+            (PETICIONES_POR_SEGUNDO_POR_HOST por defecto).
+        rafaga (int, opcional): Número máximo de peticiones seguidas sin espera
+            (RAFAGA_POR_HOST o, si es None, MAX_CONCURRENCIA).
+    """
+
+    def __init__(self, peticiones_por_segundo=None, rafaga=None):
+        peticiones_por_segundo = peticiones_por_segundo or PETICIONES_POR_SEGUNDO_POR_HOST
+        rafaga = rafaga or RAFAGA_POR_HOST or MAX_CONCURRENCIA
+        if peticiones_por_segundo <= 0:
+            raise ValueError("peticiones_por_segundo debe ser mayor que 0")
+        self.peticiones_por_segundo = peticiones_por_segundo
+        self.rafaga = max(1, rafaga)
+        self._cubos = {} # host -> [fichas, instante de la última recarga]
+        self._lock = threading.Lock()
+
+    def esperar(self, url):
+        """Bloquea hasta que el host de `url` tenga una ficha disponible y la consume."""
+        host = urlparse(url).netloc
+        with self._lock:
+            ahora = time.monotonic()
+            fichas, ultima = self._cubos.get(host, (self.rafaga, ahora))
+            fichas = min(self.rafaga, fichas + (ahora - ultima) * self.peticiones_por_segundo)
+            # Se reserva la ficha aunque el saldo quede negativo; la espera lo compensa
+            fichas -= 1
+            self._cubos[host] = (fichas, ahora)
+            espera = -fichas / self.peticiones_por_segundo if fichas < 0 else 0
+        if espera > 0:
+            time.sleep(espera)
+
+
+def crear_sesion(tamano_pool=None):
+    """
+    Crea una sesión de requests con conexiones keep-alive reutilizables.
+
+    Args:
+        tamano_pool (int, opcional): Conexiones máximas que se mantienen abiertas por host
+            (MAX_CONCURRENCIA por defecto).
+    """
+    tamano_pool = tamano_pool or MAX_CONCURRENCIA
+    sesion = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool)
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    sesion.headers['User-Agent'] = USER_AGENT
+    return sesion
+
+
+def descargar_pagina(url, nombre_archivo=None, max_intentos=3, retardo_reintento=5, sesion=None, limitador=None,
+                     cache=None, almacen=None):
     """
-    Descarga el contenido de una URL y lo guarda en un archivo, con reintentos.
+    Descarga el contenido de una URL y lo guarda en un archivo o en el almacén de páginas, con reintentos.
 
     Args:
         url (str): La URL de la página a descargar.
         nombre_archivo (str): El nombre del archivo donde se guardará el contenido.
+            Se ignora si se indica `almacen`.
         max_intentos (int): Número máximo de intentos para descargar la página.
         retardo_reintento (int): Segundos de espera entre reintentos.
+        sesion (requests.Session, opcional): Sesión con conexiones reutilizables.
+            Si no se indica, se hace una petición independiente con requests.get.
+        limitador (LimitadorPorHost, opcional): Limitador que se consulta antes de cada intento.
+        cache (CachePaginas, opcional): Caché de ETag/Last-Modified/hash. Si se indica, se
+            hace una petición condicional y no se reescribe el archivo cuando la página
+            no ha cambiado, de modo que el análisis posterior puede saltarla.
+        almacen (AlmacenPaginas, opcional): Almacén donde guardar la página, con el ID del
+            anuncio extraído de la URL como clave.
+
+    Returns:
+        bool: True si la página está disponible en su destino (descargada o sin cambios).
     """
+    if almacen is not None:
+        id_anuncio = extraer_id_anuncio(url)
+        nombre_archivo = os.path.join(almacen.directorio, id_anuncio)
+        hay_copia_local = almacen.contiene(id_anuncio)
+    else:
+        hay_copia_local = os.path.exists(nombre_archivo)
+
     for intento in range(1, max_intentos + 1):
         try:
             # Añadir un User-Agent para simular una petición de navegador
             headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                'User-Agent': USER_AGENT
             }
-            response = requests.get(url, headers=headers, timeout=10) # Añadir un timeout
+            if cache is not None:
+                headers.update(cache.cabeceras_condicionales(url, nombre_archivo, hay_copia_local))
+            if limitador is not None:
+                with medir("espera_limitador"):
+                    limitador.esperar(url)
+            with medir("peticion_pagina"):
+                if sesion is not None:
+                    response = sesion.get(url, headers=headers, timeout=10)
+                else:
+                    response = requests.get(url, headers=headers, timeout=10) # Añadir un timeout
+            contar("respuestas_pagina", codigo=response.status_code)
+            if response.status_code == 304:
+                print(f"La página '{url}' no ha cambiado (304). Se conserva '{nombre_archivo}'.")
+                contar("paginas", resultado="sin_cambios")
+                return True
             response.raise_for_status()  # Lanza una excepción para códigos de estado de error HTTP
 
+            hash_nuevo = hash_contenido(response.content)
+            if cache is not None and cache.sin_cambios(url, nombre_archivo, hash_nuevo, hay_copia_local):
+                # Se guardan los validadores nuevos para que la próxima vez responda 304
+                cache.actualizar(url, nombre_archivo, response.headers.get('ETag'),
+                                 response.headers.get('Last-Modified'), hash_nuevo)
+                print(f"El contenido de '{url}' no ha cambiado. Se conserva '{nombre_archivo}'.")
+                contar("paginas", resultado="sin_cambios")
+                return True
+
             # Verifica el Content-Type para advertir si no es XML
             content_type = response.headers.get('Content-Type', '')
             if 'xml' not in content_type.lower() and 'html' in content_type.lower():
@@ -30,11 +162,20 @@ def descargar_pagina(url, nombre_archivo, max_intentos=3, retardo_reintento=5):
             else:
                 print(f"La URL '{url}' parece devolver contenido XML. Content-Type: {content_type}.")
 
-            # Abre el archivo en modo de escritura binaria y guarda el contenido
-            with open(nombre_archivo, 'wb') as f:
-                f.write(response.content)
+            if almacen is not None:
+                # El almacén no reescribe nada si el contenido ya estaba guardado
+                almacen.guardar(id_anuncio, url, response.content)
+            else:
+                # Abre el archivo en modo de escritura binaria y guarda el contenido
+                with open(nombre_archivo, 'wb') as f:
+                    f.write(response.content)
+            if cache is not None:
+                cache.actualizar(url, nombre_archivo, response.headers.get('ETag'),
+                                 response.headers.get('Last-Modified'), hash_nuevo)
             print(f"Página descargada exitosamente como '{nombre_archivo}' en el intento {intento}.")
-            return # Si la descarga es exitosa, sale de la función
+            contar("paginas", resultado="descargada")
+            contar("bytes_paginas", len(response.content))
+            return True # Si la descarga es exitosa, sale de la función
 
         except requests.exceptions.Timeout:
             print(f"Intento {intento}/{max_intentos}: Tiempo de espera agotado al descargar '{url}'. Reintentando en {retardo_reintento} segundos...")
@@ -48,130 +189,108 @@ def descargar_pagina(url, nombre_archivo, max_intentos=3, retardo_reintento=5):
 
         # Esperar antes de reintentar
         if intento < max_intentos:
+            contar("reintentos_pagina")
             time.sleep(retardo_reintento)
 
     print(f"Fallo al descargar '{url}' después de {max_intentos} intentos.")
+    contar("paginas", resultado="fallida")
+    return False
+
+
+def descargar_paginas_concurrente(urls, nombres_archivo=None, max_concurrencia=None,
+                                  peticiones_por_segundo=None, rafaga=None, cache=None, almacen=None):
+    """
+    Descarga varias URLs en paralelo compartiendo una sesión y un limitador por host.
+
+    Args:
+        urls (list): URLs a descargar.
+        nombres_archivo (list, opcional): Nombre de archivo de salida para cada URL (mismo
+            orden). No hace falta si se usa `almacen`.
+        max_concurrencia (int, opcional): Número máximo de descargas simultáneas
+            (MAX_CONCURRENCIA por defecto).
+        peticiones_por_segundo (float, opcional): Ritmo máximo permitido por host.
+        rafaga (int, opcional): Peticiones seguidas permitidas por host antes de limitar.
+            Ver LimitadorPorHost para los valores por defecto.
+        cache (CachePaginas, opcional): Caché compartida para las peticiones condicionales.
+        almacen (AlmacenPaginas, opcional): Almacén donde guardar las páginas.
+
+    Returns:
+        list: Resultado (True/False) de cada descarga, en el mismo orden que `urls`.
+    """
+    if nombres_archivo is None:
+        nombres_archivo = [None] * len(urls)
+    max_concurrencia = max_concurrencia or MAX_CONCURRENCIA
+    limitador = LimitadorPorHost(peticiones_por_segundo, rafaga or RAFAGA_POR_HOST or max_concurrencia)
+    with crear_sesion(max_concurrencia) as sesion:
+        with ThreadPoolExecutor(max_workers=max_concurrencia) as ejecutor:
+            futuros = [
+                ejecutor.submit(descargar_pagina, url, nombre, sesion=sesion, limitador=limitador,
+                                cache=cache, almacen=almacen)
+                for url, nombre in zip(urls, nombres_archivo)
+            ]
+            return [futuro.result() for futuro in futuros]
+
+
+def leer_urls(ruta=ARCHIVO_URLS):
+    """
+    Lee la lista de URLs de anuncios de un archivo de texto.
+
+    Una URL por línea; se ignoran las líneas vacías y las que empiezan por #.
+    """
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return [linea.strip() for linea in f if linea.strip() and not linea.lstrip().startswith('#')]
+
+
+def descargar_al_almacen(urls, fragmento=None, directorio=None):
+    """
+    Descarga las páginas de los anuncios al almacén y muestra el resumen.
+
+    Args:
+        urls (list): URLs de los anuncios.
+        fragmento (Fragmento, opcional): Si se indica, solo se descargan los anuncios de ese
+            fragmento (el mismo reparto que Analisis_de_Imagenes.py).
+        directorio (str, opcional): Directorio del almacén de páginas (DIRECTORIO_ALMACEN por defecto).
+
+    Returns:
+        list: Resultado (True/False) de cada descarga.
+    """
+    directorio = directorio or DIRECTORIO_ALMACEN
+    if fragmento is not None:
+        urls = list(fragmento.filtrar(urls, clave=extraer_id_anuncio))
+
+    # Las páginas se guardan comprimidas en el almacén, con el ID del anuncio como clave
+    print(f"Las páginas se guardarán en el almacén: {os.path.abspath(directorio)}")
+
+    # Descarga las URLs en paralelo; el limitador por host sustituye a la pausa fija
+    # entre URLs para seguir siendo "amigables" con el servidor.
+    # La caché evita reescribir (y volver a analizar) las páginas que no han cambiado
+    inicio = time.monotonic()
+    fragmento_metricas = fragmento or Fragmento(1, 1)
+    rutas_metricas = [fragmento_metricas.ruta(ruta) if ruta else None
+                      for ruta in (ARCHIVO_METRICAS, ARCHIVO_METRICAS_PROMETHEUS, ARCHIVO_PERFIL)]
+    with instrumentar(rutas_metricas[0], rutas_metricas[1], PUERTO_METRICAS, rutas_metricas[2], INTERVALO_PERFIL), \
+            AlmacenPaginas(directorio) as almacen, CachePaginas() as cache:
+        resultados = descargar_paginas_concurrente(urls, max_concurrencia=MAX_CONCURRENCIA,
+                                                   peticiones_por_segundo=PETICIONES_POR_SEGUNDO_POR_HOST,
+                                                   rafaga=RAFAGA_POR_HOST, cache=cache, almacen=almacen)
+    print("-" * 30) # Separador para mejor legibilidad en la consola
+    print(f"Descargadas {sum(resultados)}/{len(resultados)} páginas en {time.monotonic() - inicio:.1f} segundos.")
+    for ruta in rutas_metricas:
+        if ruta:
+            print(f"Métricas guardadas en '{ruta}'.")
+    return resultados
 
 
 if __name__ == "__main__":
-    # Lista de URLs a descargar
-    urls_a_descargar = [
-         
-       "https://www.motorflash.com/coche-de_segunda_mano/volvo-v60-b4_d_core_auto_145_kw_197_cv/ocasion/59715573-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_phev_recharge_plus_dark_auto_155_kw_211_cv/ocasion/59367432-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_recharge_phev_core_auto_155_kw_211_cv/ocasion/59367426-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b4_g_core_auto_145_kw_197_cv/ocasion/59166474-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/59129925-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_recharge_phev_core_auto_155_kw_211_cv/ocasion/58476555-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc90-t8_recharge_inscription_expression_awd_auto_335_kw_455_cv/ocasion/57954666-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t8_recharge_r_design_awd_auto_287_kw_390_cv/ocasion/56384412-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/56047410-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_phev_recharge_plus_dark_auto_155_kw_211_cv/ocasion/56047392-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_phev_recharge_plus_bright_auto_155_kw_211_cv/ocasion/56047386-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t5_recharge_plus_bright_auto_193_kw_262_cv/ocasion/55969566-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-s60-b4_g_core_fwd_auto_145_kw_197_cv/ocasion/55712343-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t2_core_auto_95_kw_129_cv/ocasion/55712319-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_192_kw_261_cv/ocasion/55158577-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_twin_recharge_r_design_expression_auto_155_kw_211_cv/ocasion/54763408-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-v60-t6_recharge_inscription_core_awd_auto_257_kw_350_cv/ocasion/54762958-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-s60-t8_recharge_ultimate_dark_auto_335_kw_455_cv/ocasion/54762928-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_phev_recharge_plus_bright_auto_155_kw_211_cv/ocasion/54762916-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-v60-b4_d_plus_dark_auto_145_kw_197_cv/ocasion/54762835-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-v60-b4_d_plus_dark_auto_145_kw_197_cv/ocasion/54762832-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-v60-b4_d_plus_dark_auto_145_kw_197_cv/ocasion/54762817-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_recharge_phev_essential_auto_155_kw_211_cv/ocasion/54762814-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_phev_recharge_core_auto_155_kw_211_cv/ocasion/54762250-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-b4_d_plus_dark_auto_145_kw_197_cv/ocasion/54762130-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-d4_momentum_awd_auto_140_kw_190_cv/ocasion/54761929-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_inscription_awd_auto_257_kw_350_cv/ocasion/54761896-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-v60-t6_recharge_r_design_awd_auto_250_kw_340_cv/ocasion/54761875-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_phev_recharge_ultimate_dark_auto_155_kw_211_cv/ocasion/54761815-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_recharge_phev_core_auto_155_kw_211_cv/ocasion/54761809-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-s60-t8_reccharge_core_auto_335_kw_455_cv/ocasion/54761803-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-v60-b4_d_plus_dark_auto_145_kw_197_cv/ocasion/54761797-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t2_essential_auto_95_kw_129_cv/ocasion/54761674-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t2_core_auto_95_kw_129_cv/ocasion/54761500-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/peugeot-508-bluehdi_130_sands_allure_eat8_96_kw_130_cv/ocasion/54761497-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-b4_d_essential_auto_145_kw_197_cv/ocasion/54761473-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t2_core_auto_95_kw_129_cv/ocasion/54761434-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-b4_g_essential_auto_145_kw_197_cv/ocasion/54761422-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_core_awd_auto_257_kw_350_cv/ocasion/73972904-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_core_awd_auto_257_kw_350_cv/ocasion/73780801-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/73562314-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-c40-recharge_single_plus_auto_175_kw_238_cv/ocasion/73496443-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-ex30-single_motor_extended_range_core_auto_200_kw_272_cv/ocasion/73496440-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_6_6kw_192_kw_261_cv/ocasion/73118492-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_192_kw_261_cv/ocasion/73118480-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_6_6kw_192_kw_261_cv/ocasion/73118462-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_6_6kw_192_kw_261_cv/ocasion/73118402-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_6_6kw_192_kw_261_cv/ocasion/73118399-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t2_essential_auto_95_kw_129_cv/ocasion/72397085-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/72397055-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/71133901-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc90-t8_core_recharge_awd_auto_335_kw_455_cv/ocasion/69937502-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_core_awd_auto_257_kw_350_cv/ocasion/69725594-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_plus_dark_awd_auto_257_kw_350_cv/ocasion/69169400-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-c40-electrico_recharge_extended_plus_auto_185_kw_252_cv/ocasion/69169397-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/69169391-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_plus_dark_awd_auto_257_kw_350_cv/ocasion/69169382-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_core_awd_auto_257_kw_350_cv/ocasion/69169379-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-v60-t6_recharge_inscription_core_awd_auto_257_kw_350_cv/ocasion/69169376-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-b4_g_essential_auto_145_kw_197_cv/ocasion/69169373-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-s60-b4_g_core_fwd_auto_145_kw_197_cv/ocasion/69169367-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-single_recharge_core_auto_175_kw_238_cv/ocasion/69148180-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_phev_recharge_plus_bright_auto_155_kw_211_cv/ocasion/69148177-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-single_recharge_core_auto_175_kw_238_cv/ocasion/69148171-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_phev_recharge_plus_dark_auto_155_kw_211_cv/ocasion/69148168-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/69148165-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-single_recharge_plus_auto_175_kw_238_cv/ocasion/69148162-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/68820689-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-b4_g_essential_auto_145_kw_197_cv/ocasion/68727866-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-c40-electrico_recharge_extended_plus_auto_185_kw_252_cv/ocasion/68670475-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-b4_d_ultimate_dark_auto_145_kw_197_cv/ocasion/68572166-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_core_awd_auto_257_kw_350_cv/ocasion/68324330-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-recharge_single_extended_core_auto_185_kw_252_cv/ocasion/68227261-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t2_core_auto_95_kw_129_cv/ocasion/68227249-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_6_6kw_192_kw_261_cv/ocasion/67943932-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_6_6kw_192_kw_261_cv/ocasion/67943917-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_6_6kw_192_kw_261_cv/ocasion/67943908-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-b4_d_ultimate_dark_awd_auto_145_kw_197_cv/ocasion/67861486-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_core_awd_auto_257_kw_350_cv/ocasion/67825280-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_plus_dark_awd_auto_257_kw_350_cv/ocasion/67251836-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/67251830-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-v60-b4_d_essential_auto_145_kw_197_cv/ocasion/67251812-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_plus_dark_awd_auto_257_kw_350_cv/ocasion/66782482-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-ex30-twin_motor_ultra_awd_auto_315_kw_428_cv/ocasion/66750596-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_6_6kw_192_kw_261_cv/ocasion/66750590-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/66712925-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_phev_recharge_plus_bright_auto_155_kw_211_cv/ocasion/65889822-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-b4_d_plus_dark_auto_145_kw_197_cv/ocasion/65350044-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t5_recharge_phev_plus_dark_auto_193_kw_262_cv/ocasion/65100249-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/lynk_and_co-01-1_5_phev_6_6kw_192_kw_261_cv/ocasion/64896495-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_plus_dark_awd_auto_257_kw_350_cv/ocasion/64585803-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-c40-electrico_recharge_core_auto_175_kw_238_cv/ocasion/64585794-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-b4_d_ultimate_dark_awd_auto_145_kw_197_cv/ocasion/64585791-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-s90-t8_twin_recharge_core_bright_awd_at_335_kw_455_cv/ocasion/64512342-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-b3_g_core_auto_120_kw_163_cv/ocasion/64117201-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-s60-b4_g_core_fwd_auto_145_kw_197_cv/ocasion/63658732-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-v60-d3_momentum_110_kw_150_cv/ocasion/63354829-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t4_recharge_phev_core_auto_155_kw_211_cv/ocasion/62580073-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-t5_phev_recharge_plus_dark_auto_193_kw_262_cv/ocasion/62580070-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc40-recharge_ultimate_electrico_auto_185_kw_252_cv/ocasion/62580025-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-t6_recharge_core_awd_auto_257_kw_350_cv/ocasion/62001435-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-ex30-single_motor_extended_range_core_auto_200_kw_272_cv/ocasion/61679181-es/",
-"https://www.motorflash.com/coche-de_segunda_mano/volvo-xc60-b4_d_core_auto_145_kw_197_cv/ocasion/59715618-es/",
-
-    ]
-
-    # Directorio actual donde se ejecutará el script
-    directorio_actual = os.getcwd()
-    print(f"Los archivos se guardarán en: {directorio_actual}")
-
-    # Itera sobre las URLs y descarga cada una
-    for i, url in enumerate(urls_a_descargar):
-        # Genera un nombre de archivo único para cada página
-        nombre_archivo_salida = f"coches_elia_{i+1}.xml"
-        descargar_pagina(url, nombre_archivo_salida)
-        # Añade una pausa entre la descarga de cada página para ser más "amigable" con el servidor
-        time.sleep(2) # Pausa de 2 segundos entre cada URL
-        print("-" * 30) # Separador para mejor legibilidad en la consola
+    import argparse
+    import sys
+    from configuracion import aplicar_configuracion
+
+    parser = argparse.ArgumentParser(description="Descarga las páginas de los anuncios al almacén de páginas.")
+    parser.add_argument("--urls", help=f"Archivo con las URLs de los anuncios (por defecto {ARCHIVO_URLS}).")
+    parser.add_argument("--shard", type=Fragmento.desde_texto, default=Fragmento(1, 1),
+                        help="Descargar solo el fragmento K de N de los anuncios (p. ej. 2/4), por hash del ID.")
+    args = parser.parse_args()
+
+    aplicar_configuracion(sys.modules[__name__], "descarga")
+    descargar_al_almacen(leer_urls(args.urls or ARCHIVO_URLS), args.shard)